@@ -1,18 +1,25 @@
-"""Exam Seat Allocation System - Main Flask Application."""
-import os
+"""Exam Seat Allocation System - Main Flask Application.
+
+Importing this module does nothing but define functions. The module-level `app` used by
+run.py, `gunicorn app:app` and `flask --app app` is built by create_app() on first
+access (PEP 562 __getattr__). Database setup - tables, column and index migrations,
+search and counter triggers, the default admin - is init_db(): create_app runs it when
+AUTO_INIT_DB is on, and `flask --app app init-db` runs it on demand.
+"""
 from pathlib import Path
+import click
 from flask import Flask
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
 from config import Config
-from models import db, User
+from models import db, User, Exam, SeatAllocation
 
-# Ensure uploads directory exists
-Path(Config.UPLOAD_FOLDER).mkdir(parents=True, exist_ok=True)
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    Path(app.config['UPLOAD_FOLDER']).mkdir(parents=True, exist_ok=True)
+    app.logger.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
     CSRFProtect(app)
 
     db.init_app(app)
@@ -21,9 +28,8 @@ def create_app(config_class=Config):
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
 
-    @login_manager.user_loader
-    def load_user(user_id):
-        return User.query.get(int(user_id))
+    from utils.user_cache import init_user_cache
+    init_user_cache(login_manager)
 
     from routes.auth import auth_bp
     from routes.dashboard import dashboard_bp
@@ -34,6 +40,8 @@ def create_app(config_class=Config):
     from routes.timetable_generator import timetable_bp
     from routes.exam_schedule import exam_schedule_bp
     from routes.allocation import allocation_bp
+    from routes.admin import admin_bp
+    from routes.api import api_bp
 
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(dashboard_bp, url_prefix='/')
@@ -44,7 +52,48 @@ def create_app(config_class=Config):
     app.register_blueprint(timetable_bp, url_prefix='/timetable')
     app.register_blueprint(exam_schedule_bp, url_prefix='/exam-schedule')
     app.register_blueprint(allocation_bp, url_prefix='/allocation')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+    app.register_blueprint(api_bp, url_prefix='/api')
 
+    with app.app_context():
+        from utils.query_stats import init_query_stats
+        init_query_stats(app, db.engine)
+        from utils.profiling import init_profiling
+        init_profiling(app)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create missing tables, apply migrations and seed the default admin."""
+        init_db(app)
+        click.echo('Database initialised.')
+
+    @app.cli.command('archive-exams')
+    @click.option('--days', default=0, show_default=True,
+                  help='Only exams whose last date is more than this many days ago.')
+    @click.option('--exam-id', type=int, multiple=True, help='Archive these exams (repeatable) instead.')
+    @click.option('--dry-run', is_flag=True, help='List what would be archived.')
+    def archive_exams_command(days, exam_id, dry_run):
+        """Move finished exams' seat allocations into compressed per-exam archive files."""
+        from utils.allocation_archive import archive_exam, archive_path, finished_exams
+        with app.app_context():
+            exams = Exam.query.filter(Exam.id.in_(exam_id)).all() if exam_id else finished_exams(days)
+            for exam in exams:
+                if dry_run:
+                    count = SeatAllocation.query.filter_by(exam_id=exam.id).count()
+                    click.echo(f'{exam.id} {exam.name}: {count} seats')
+                    continue
+                moved = archive_exam(exam)
+                click.echo(f'{exam.id} {exam.name}: {moved} seats -> {archive_path(exam.id)}')
+            if not exams:
+                click.echo('Nothing to archive.')
+
+    if app.config.get('AUTO_INIT_DB'):
+        init_db(app)
+    return app
+
+
+def init_db(app):
+    """Create tables, run the in-place migrations, install triggers and seed the admin user."""
     with app.app_context():
         db.create_all()
         # Add Student.section and Exam defaults if missing (SQLite)
@@ -56,6 +105,9 @@ def create_app(config_class=Config):
                 if 'section' not in cols:
                     db.session.execute(text('ALTER TABLE students ADD COLUMN section VARCHAR(20)'))
                     db.session.commit()
+                db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_students_dept_roll '
+                                        'ON students (department_id, roll_number, id)'))
+                db.session.commit()
             if 'exams' in insp.get_table_names():
                 cols = [c['name'] for c in insp.get_columns('exams')]
                 if 'academic_year' not in cols:
@@ -67,17 +119,36 @@ def create_app(config_class=Config):
                 if 'default_end_time' not in cols:
                     db.session.execute(text('ALTER TABLE exams ADD COLUMN default_end_time TIME'))
                     db.session.commit()
+            if 'seat_allocations' in insp.get_table_names():
+                cols = [c['name'] for c in insp.get_columns('seat_allocations')]
+                if 'session' not in cols:
+                    db.session.execute(text('ALTER TABLE seat_allocations ADD COLUMN session VARCHAR(2)'))
+                    db.session.commit()
+                # Indexes declared on SeatAllocation; create_all only adds them to new tables.
+                db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_seat_allocations_exam_date '
+                                        'ON seat_allocations (exam_id, exam_date)'))
+                db.session.execute(text('CREATE INDEX IF NOT EXISTS ix_seat_allocations_student '
+                                        'ON seat_allocations (student_id)'))
+                db.session.commit()
         except Exception:
             db.session.rollback()
+        from utils.search import init_search
+        init_search(app)
+        from utils.student_counts import init_student_counts
+        init_student_counts(app)
         if not User.query.filter_by(user_id='ashwin').first():
             admin = User(user_id='ashwin', name='Administrator')
             admin.set_password('ashwin0211')
             db.session.add(admin)
             db.session.commit()
 
-    return app
 
-app = create_app()
+def __getattr__(name):
+    if name == 'app':
+        value = globals()['app'] = create_app()
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
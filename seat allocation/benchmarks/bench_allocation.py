@@ -0,0 +1,224 @@
+"""Allocation pipeline benchmark.
+
+Times each stage of a regenerate separately on a synthetic institution:
+
+  engine       allocate_seats on in-memory data
+  verify       verify_allocation on the engine output
+  persistence  delete + bulk insert + commit of the SeatAllocation rows
+  hall_info    build_hall_info (per-hall summaries used by view and PDFs)
+  pdf          overall PDF + per-hall seating and attendance PDFs
+  pdf_combined overall PDF + one combined seating and one combined attendance PDF
+  docx         overall Word sheet
+
+Usage (from the "seat allocation" directory):
+
+    python -m benchmarks.bench_allocation --students 6000 --departments 40
+    python -m benchmarks.bench_allocation --repeat 5 --output results/before.json
+
+Results are written as JSON (benchmarks/results/ by default) so runs can be
+compared across versions.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _summary(runs):
+    return {
+        'runs': [round(r, 6) for r in runs],
+        'min': round(min(runs), 6),
+        'median': round(statistics.median(runs), 6),
+    }
+
+
+def _timed(fn, repeat):
+    runs = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, runs
+
+
+def _make_app(db_path):
+    # Point the app at a throwaway SQLite file before anything imports config.
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    if str(APP_DIR) not in sys.path:
+        sys.path.insert(0, str(APP_DIR))
+    from config import Config
+    from app import create_app
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+        TESTING = True
+
+    return create_app(BenchConfig)
+
+
+def run_benchmark(args):
+    from benchmarks.synthetic import generate_institution, students_by_dept_subject, populate_database
+
+    inst = generate_institution(
+        departments=args.departments,
+        subjects_per_dept=args.subjects_per_dept,
+        students=args.students,
+        hall_capacities=tuple(args.hall_capacities),
+        seed=args.seed,
+    )
+    tmpdir = tempfile.mkdtemp(prefix='esal-bench-')
+    app = _make_app(Path(tmpdir) / 'bench.db')
+
+    from config import Config
+    from models import db, SeatAllocation
+    from utils.allocation_engine import allocate_seats
+    from utils.allocation_verifier import verify_allocation
+    from utils.bulk_writer import bulk_insert
+    from utils.pdf_generator import (
+        create_overall_allocation_pdf,
+        create_classroom_allocation_pdf,
+        create_attendance_sheet_pdf,
+        create_combined_seating_pdf,
+        create_combined_attendance_pdf,
+    )
+    from utils.word_generator import create_overall_allocation_docx
+    from routes.allocation import build_hall_info, _allocation_rows
+
+    timings = {}
+    pools = students_by_dept_subject(inst)
+
+    def engine():
+        return allocate_seats(pools, inst['halls'],
+                              capacity_per_bench=Config.STUDENTS_PER_BENCH,
+                              benches_per_hall=Config.BENCHES_PER_HALL)
+
+    (allocations, halls_sorted, _matrix, _seats), runs = _timed(engine, args.repeat)
+    timings['engine'] = _summary(runs)
+
+    report, runs = _timed(lambda: verify_allocation(
+        allocations, inst['halls'], pools,
+        capacity_per_bench=Config.STUDENTS_PER_BENCH,
+        benches_per_hall=Config.BENCHES_PER_HALL), args.repeat)
+    timings['verify'] = _summary(runs)
+
+    with app.app_context():
+        exam_id = populate_database(inst)
+        exam_date = inst['exam_date']
+        rows = _allocation_rows(exam_id, exam_date, allocations)
+
+        def persist():
+            SeatAllocation.query.filter_by(exam_id=exam_id, exam_date=exam_date).delete()
+            bulk_insert(SeatAllocation, rows)
+            db.session.commit()
+
+        _, runs = _timed(persist, args.repeat)
+        timings['persistence'] = _summary(runs)
+
+        def hall_info():
+            db.session.expunge_all()
+            return build_hall_info(allocations, halls_sorted)
+
+        info, runs = _timed(hall_info, args.repeat)
+        timings['hall_info'] = _summary(runs)
+
+    info = [h for h in info if h.get('seats')]
+    exam_name, date_str = 'Benchmark Exam', str(inst['exam_date'])
+
+    if not args.skip_pdf:
+        def pdfs():
+            create_overall_allocation_pdf(info, exam_name, date_str)
+            for hi in info:
+                create_classroom_allocation_pdf(hi, exam_name, date_str)
+                create_attendance_sheet_pdf(hi, exam_name, date_str, renderer=args.attendance_renderer)
+
+        _, runs = _timed(pdfs, args.repeat)
+        timings['pdf'] = _summary(runs)
+        timings['pdf']['per_hall_ms'] = round(min(runs) / max(len(info), 1) * 1000, 3)
+
+        def combined_pdfs():
+            create_overall_allocation_pdf(info, exam_name, date_str)
+            create_combined_seating_pdf(info, exam_name, date_str)
+            create_combined_attendance_pdf(info, exam_name, date_str, renderer=args.attendance_renderer)
+
+        _, runs = _timed(combined_pdfs, args.repeat)
+        timings['pdf_combined'] = _summary(runs)
+        timings['pdf_combined']['per_hall_ms'] = round(min(runs) / max(len(info), 1) * 1000, 3)
+
+        _, runs = _timed(lambda: create_overall_allocation_docx(info, exam_name, date_str), args.repeat)
+        timings['docx'] = _summary(runs)
+
+    return {
+        'benchmark': 'allocation',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            'departments': args.departments,
+            'subjects_per_dept': args.subjects_per_dept,
+            'students': args.students,
+            'hall_capacities': args.hall_capacities,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'attendance_renderer': args.attendance_renderer,
+        },
+        'counts': {
+            'students': len(inst['students']),
+            'halls': len(inst['halls']),
+            'placed': len(allocations),
+            'halls_used': len(info),
+        },
+        'quality': {'ok': report['ok'], **report['metrics']},
+        'timings': timings,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the seat allocation pipeline.')
+    parser.add_argument('--departments', type=int, default=20)
+    parser.add_argument('--subjects-per-dept', type=int, default=6)
+    parser.add_argument('--students', type=int, default=3000)
+    parser.add_argument('--hall-capacities', type=int, nargs='+', default=[30, 45, 60, 120])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-pdf', action='store_true', help='Skip the PDF/Word stages.')
+    parser.add_argument('--attendance-renderer', choices=('canvas', 'platypus'), default='canvas')
+    parser.add_argument('--output', help='JSON output path (default: benchmarks/results/allocation-<time>.json)')
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+    out = Path(args.output) if args.output else (
+        BENCH_DIR / 'results' / f"allocation-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+
+    for stage, t in result['timings'].items():
+        print(f"{stage:<12} min {t['min'] * 1000:10.1f} ms   median {t['median'] * 1000:10.1f} ms")
+    q = result['quality']
+    print(f"verifier ok={q['ok']} fill {q['fill_ratio'] * 100:.1f}% violations {q['violations_by_rule'] or 'none'}")
+    print(f"placed {result['counts']['placed']}/{result['counts']['students']} students "
+          f"in {result['counts']['halls_used']} halls -> {out}")
+
+
+if __name__ == '__main__':
+    main()
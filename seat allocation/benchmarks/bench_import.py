@@ -0,0 +1,155 @@
+"""Cold-start benchmark: what a fresh worker pays before it can serve a request.
+
+Each scenario runs in a new interpreter under `python -X importtime`, against a
+throwaway SQLite file:
+
+  import        import app (must not touch the database)
+  create_app    import app + create_app() with AUTO_INIT_DB off
+  init_db       import app + create_app() with AUTO_INIT_DB on, fresh database
+
+For every scenario the minimum and median wall time (measured inside the child, so
+interpreter start-up is excluded), the -X importtime total of top-level imports, the
+slowest imports one level down (what app itself pulls in) and which heavy libraries
+(pandas, ReportLab, python-docx, numpy, openpyxl) were loaded are reported.
+
+Usage (from the "seat allocation" directory):
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --repeat 10 --check       # compare with the baseline
+    python -m benchmarks.bench_import --save-baseline           # update the tracked baseline
+
+The baseline lives in benchmarks/baselines/import_time.json and is committed; runs go
+to benchmarks/results/. --check fails (exit 1) when a heavy library shows up where the
+baseline had none, or a scenario's median is more than --tolerance slower.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.bench_allocation import APP_DIR, BENCH_DIR, _git_revision, _summary
+
+BASELINE = BENCH_DIR / 'baselines' / 'import_time.json'
+HEAVY_MODULES = ('pandas', 'reportlab', 'docx', 'numpy', 'openpyxl')
+
+SCENARIOS = {
+    'import': ('0', 'import app'),
+    'create_app': ('0', 'import app; app.create_app()'),
+    'init_db': ('1', 'import app; app.create_app()'),
+}
+
+# "import time:  self [us] | cumulative | module" with the module indented by nesting depth.
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """(top-level [(module, cumulative_us)], their direct imports likewise, set of every imported module)."""
+    top, second, modules = [], [], set()
+    for line in stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        modules.add(m.group(4))
+        depth = len(m.group(3))
+        if depth == 1:
+            top.append((m.group(4), int(m.group(2))))
+        elif depth == 3:
+            second.append((m.group(4), int(m.group(2))))
+    return top, second, modules
+
+
+def run_once(code, auto_init_db):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{tmp}/import.db', AUTO_INIT_DB=auto_init_db,
+                   PYTHONDONTWRITEBYTECODE='1')
+        timed = ('import time as _t; _s = _t.perf_counter(); ' + code +
+                 '; print(_t.perf_counter() - _s)')
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', timed], cwd=APP_DIR, env=env,
+                              capture_output=True, text=True, check=True)
+    top, second, modules = parse_importtime(proc.stderr)
+    return float(proc.stdout.strip().splitlines()[-1]), top, second, modules
+
+
+def run_benchmark(args):
+    scenarios = {}
+    for name in args.scenarios:
+        auto_init_db, code = SCENARIOS[name]
+        walls, totals, second_runs, loaded = [], [], [], set()
+        for _ in range(args.repeat):
+            wall, top, second, modules = run_once(code, auto_init_db)
+            walls.append(wall)
+            totals.append(sum(us for _, us in top) / 1e6)
+            second_runs.append(dict(second))
+            loaded |= {m for m in HEAVY_MODULES if m in modules}
+        slowest = sorted(second_runs[-1].items(), key=lambda kv: kv[1], reverse=True)[:args.top]
+        scenarios[name] = {
+            'wall': _summary(walls),
+            'importtime_total': _summary(totals),
+            'slowest_imports_ms': {m: round(us / 1000, 1) for m, us in slowest},
+            'heavy_modules': sorted(loaded),
+        }
+        print(f"{name:11s} wall min {min(walls) * 1000:7.1f} ms  "
+              f"median {scenarios[name]['wall']['median'] * 1000:7.1f} ms  heavy: {', '.join(sorted(loaded)) or '-'}")
+    return {
+        'benchmark': 'import',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'python': sys.version.split()[0],
+        'params': {'repeat': args.repeat},
+        'scenarios': scenarios,
+    }
+
+
+def check(result, baseline, tolerance):
+    """Regressions of result against baseline, as messages."""
+    problems = []
+    for name, current in result['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        new_heavy = set(current['heavy_modules']) - set(base['heavy_modules'])
+        if new_heavy:
+            problems.append(f"{name}: now imports {', '.join(sorted(new_heavy))}")
+        if current['wall']['median'] > base['wall']['median'] * (1 + tolerance):
+            problems.append(f"{name}: median {current['wall']['median'] * 1000:.1f} ms vs baseline "
+                            f"{base['wall']['median'] * 1000:.1f} ms")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark application import and start-up time.')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8, help='Number of slowest second-level imports to keep.')
+    parser.add_argument('--check', action='store_true', help='Compare against the committed baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed median slowdown for --check, as a fraction (default 0.5).')
+    parser.add_argument('--save-baseline', action='store_true', help=f'Write the result to {BASELINE}.')
+    parser.add_argument('--output', help='JSON output path (default: benchmarks/results/import-<time>.json)')
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+    out = Path(args.output) if args.output else (
+        BENCH_DIR / 'results' / f"import-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f'-> {out}')
+    if args.save_baseline:
+        BASELINE.parent.mkdir(parents=True, exist_ok=True)
+        BASELINE.write_text(json.dumps(result, indent=2) + '\n')
+        print(f'-> {BASELINE}')
+    if args.check:
+        problems = check(result, json.loads(BASELINE.read_text()), args.tolerance)
+        for problem in problems:
+            print(f'REGRESSION {problem}')
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
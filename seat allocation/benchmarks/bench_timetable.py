@@ -0,0 +1,160 @@
+"""Timetable generator benchmark.
+
+Times generate_timetable for a growing number of departments with both solvers and,
+for reference, the original greedy loop that rescanned the whole unplaced list for every
+date (kept below as legacy_greedy). Checks that the queue-based greedy produces exactly
+the legacy schedule and reports the number of exam dates each solver needs.
+
+Usage (from the "seat allocation" directory):
+
+    python -m benchmarks.bench_timetable
+    python -m benchmarks.bench_timetable --departments 10 50 100 250 500 --subjects-per-dept 8
+    python -m benchmarks.bench_timetable --capacity 0.05   # head-count bound: many dates
+"""
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from benchmarks.bench_allocation import BENCH_DIR, _git_revision, _summary
+
+START = '01/06/2026'
+
+
+def synthetic_rows(departments, subjects_per_dept, shared=0.3, seed=0):
+    """department_code/subject_code rows; a `shared` fraction of subjects is common to several departments."""
+    rnd = random.Random(seed)
+    common = [f'C{k:04d}' for k in range(max(departments * subjects_per_dept // 4, 1))]
+    rows = []
+    for d in range(departments):
+        subjects = []
+        while len(subjects) < subjects_per_dept:
+            code = rnd.choice(common) if rnd.random() < shared else f'D{d:03d}S{len(subjects):02d}'
+            if code not in subjects:
+                subjects.append(code)
+        rows.extend({'department_code': f'D{d:03d}', 'subject_code': s} for s in subjects)
+    rnd.shuffle(rows)
+    return rows
+
+
+def synthetic_sizes(departments, seed=0):
+    """{dept_code: students}, 30-200 per department."""
+    rnd = random.Random(seed)
+    return {f'D{d:03d}': rnd.randint(30, 200) for d in range(departments)}
+
+
+def legacy_greedy(rows, start_date, excluded, sizes=None, capacity=None):
+    """The pre-queue greedy loop: every date rescans all unplaced exams (no date cap here)."""
+    sizes = sizes or {}
+    unplaced = [(r['department_code'].upper(), r['subject_code'].upper()) for r in rows]
+    schedule = []
+    current = start_date
+    while unplaced:
+        if current in excluded:
+            current += timedelta(days=1)
+            continue
+        depts = set()
+        subjects = defaultdict(int)
+        load = 0
+        still = []
+        for dept, subj in unplaced:
+            size = sizes.get(dept, 0)
+            if dept in depts or subjects[subj] >= 2 or (capacity and load and load + size > capacity):
+                still.append((dept, subj))
+                continue
+            schedule.append((current, dept, subj))
+            depts.add(dept)
+            subjects[subj] += 1
+            load += size
+        unplaced = still
+        current += timedelta(days=1)
+    return schedule
+
+
+def _timed(fn, repeat):
+    runs, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - start)
+    return result, runs
+
+
+def run_benchmark(args):
+    import sys
+    sys.path.insert(0, str(BENCH_DIR.parent))
+    from utils.timetable_generator import generate_timetable, lower_bound_days
+
+    # Weekends excluded, so the loop has to skip dates.
+    start = date(2026, 6, 1)
+    excluded = [(start + timedelta(days=i)).strftime('%d/%m/%Y')
+                for i in range(400) if (start + timedelta(days=i)).weekday() >= 5]
+    excluded_dates = {datetime.strptime(x, '%d/%m/%Y').date() for x in excluded}
+
+    sessions = ('FN', 'AN') if args.two_sessions else None
+    results = []
+    for n in args.departments:
+        rows = synthetic_rows(n, args.subjects_per_dept, args.shared, args.seed)
+        items = [(r['department_code'], r['subject_code']) for r in rows]
+        sizes, capacity = None, None
+        if args.capacity:
+            # A date seats this fraction of all students, and at least the largest department.
+            sizes = synthetic_sizes(n, args.seed)
+            capacity = max(int(sum(sizes.values()) * args.capacity), max(sizes.values()))
+        entry = {'departments': n, 'exams': len(rows), 'capacity': capacity,
+                 'lower_bound_days': lower_bound_days(items, sizes, capacity)}
+        for solver in ('greedy', 'dsatur'):
+            (schedule, _), runs = _timed(lambda: generate_timetable(
+                rows, START, excluded, solver=solver, dept_sizes=sizes, capacity=capacity,
+                sessions=sessions), args.repeat)
+            entry[solver] = {**_summary(runs), 'dates': len({e[0] for e in schedule})}
+            if solver == 'greedy':
+                greedy_schedule = schedule
+        if not args.skip_legacy and not args.two_sessions:
+            legacy, runs = _timed(lambda: legacy_greedy(rows, start, excluded_dates, sizes, capacity), args.repeat)
+            entry['legacy_greedy'] = {**_summary(runs), 'dates': len({e[0] for e in legacy})}
+            entry['greedy_matches_legacy'] = legacy == [e[:3] for e in greedy_schedule]
+        results.append(entry)
+        line = f"{n:5d} depts {len(rows):6d} exams  lb {entry['lower_bound_days']:3d}"
+        for key in ('legacy_greedy', 'greedy', 'dsatur'):
+            if key in entry:
+                line += f"  {key} {entry[key]['min'] * 1000:9.1f} ms / {entry[key]['dates']:3d} dates"
+        print(line)
+    return {
+        'benchmark': 'timetable',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': _git_revision(),
+        'params': {'subjects_per_dept': args.subjects_per_dept, 'shared': args.shared, 'capacity': args.capacity,
+                   'two_sessions': args.two_sessions,
+                   'seed': args.seed, 'repeat': args.repeat},
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark timetable generation.')
+    parser.add_argument('--departments', type=int, nargs='+', default=[10, 50, 100, 250, 500])
+    parser.add_argument('--subjects-per-dept', type=int, default=8)
+    parser.add_argument('--shared', type=float, default=0.3, help='Fraction of subjects shared between departments.')
+    parser.add_argument('--capacity', type=float,
+                        help='Limit each date to this fraction of all students (e.g. 0.1); default no limit.')
+    parser.add_argument('--two-sessions', action='store_true', help='Schedule FN and AN sessions on each date.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-legacy', action='store_true', help='Do not time the original greedy loop.')
+    parser.add_argument('--output', help='JSON output path (default: benchmarks/results/timetable-<time>.json)')
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+    out = Path(args.output) if args.output else (
+        BENCH_DIR / 'results' / f"timetable-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2))
+    print(f'-> {out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Query budgets for the busiest routes.
+
+Requests each route in CHECKS on synthetic institutions of increasing size under
+utils.query_stats.query_budget and fails (exit 1) when a route issues more SQL
+statements than its budget. Budgets are fixed numbers, independent of how many
+departments, students or halls there are, so a route that queries once per row
+(N+1) passes on the small institution and fails on the large one.
+
+Usage (from the "seat allocation" directory):
+
+    python -m benchmarks.query_budgets
+    python -m benchmarks.query_budgets --departments 5 80 --verbose
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_allocation import _make_app
+
+# (label, method, url template, form data template, budget); run in this order, as the
+# first view allocates and stores the seats that the later requests read.
+CHECKS = [
+    ('allocation.view (allocate)', 'GET', '/allocation/view/{exam_id}/{exam_date}', None, 15),
+    ('allocation.view (stored)', 'GET', '/allocation/view/{exam_id}/{exam_date}', None, 10),
+    ('allocation.update', 'POST', '/allocation/update/{exam_id}/{exam_date}', None, 10),
+    ('allocation.generate', 'GET', '/allocation/generate/{exam_id}/{exam_date}', None, 10),
+    ('students.index', 'GET', '/students/', None, 8),
+    ('students.delete_filtered', 'POST', '/students/delete-filtered', {'department': '{last_dept}'}, 5),
+]
+
+
+def run_checks(departments, students_per_dept, verbose=False):
+    """[(label, statements issued, budget, within budget)] for one synthetic institution."""
+    from benchmarks.synthetic import generate_institution, populate_database
+
+    inst = generate_institution(departments=departments, subjects_per_dept=2,
+                                students=departments * students_per_dept, seed=departments)
+    app = _make_app(Path(tempfile.mkdtemp(prefix='esal-queries-')) / 'queries.db')
+    app.config['WTF_CSRF_ENABLED'] = False
+    from utils.query_stats import query_budget, QueryBudgetExceeded
+
+    with app.app_context():
+        exam_id = populate_database(inst)
+        from models import User
+        from utils.user_cache import forget_user
+        # The login cache is per process; drop the admin of the previous institution.
+        forget_user(User.query.filter_by(user_id='ashwin').first().id)
+    params = {'exam_id': exam_id, 'exam_date': inst['exam_date'], 'last_dept': inst['departments'][-1].id}
+    client = app.test_client()
+    client.post('/auth/login', data={'user_id': 'ashwin', 'password': 'ashwin0211'})
+
+    results = []
+    for label, method, url, data, budget in CHECKS:
+        url = url.format(**params)
+        form = {k: v.format(**params) for k, v in data.items()} if data else None
+        within = True
+        try:
+            with query_budget(budget) as statements:
+                response = client.open(url, method=method, data=form)
+        except QueryBudgetExceeded as exc:
+            within = False
+            if verbose:
+                print(exc)
+        if response.status_code >= 400 or '/auth/login' in response.headers.get('Location', ''):
+            raise SystemExit(f'{label}: HTTP {response.status_code} for {url}')
+        results.append((label, len(statements), budget, within))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check SQL statement budgets of the busiest routes.')
+    parser.add_argument('--departments', type=int, nargs='+', default=[5, 60],
+                        help='Institution sizes to check (number of departments).')
+    parser.add_argument('--students-per-dept', type=int, default=60)
+    parser.add_argument('--verbose', action='store_true', help='Print the statements of a route over budget.')
+    args = parser.parse_args(argv)
+
+    failed = False
+    for departments in args.departments:
+        print(f'{departments} departments, {departments * args.students_per_dept} students')
+        for label, count, budget, within in run_checks(departments, args.students_per_dept, args.verbose):
+            failed |= not within
+            print(f"  {label:<28} {count:>5} / {budget:<4} {'ok' if within else 'OVER BUDGET'}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
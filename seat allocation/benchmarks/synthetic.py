@@ -0,0 +1,125 @@
+"""Synthetic institution generator for benchmarks.
+
+Builds plain in-memory objects shaped like the models (id, roll_number, name,
+hall_number, capacity, ...) so allocate_seats can be timed without a database,
+and can also write the same institution into the database for the
+persistence / hall_info / PDF phases.
+"""
+import random
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+
+DEFAULT_HALL_CAPACITIES = (30, 45, 60, 120)
+
+
+def generate_institution(departments=20, subjects_per_dept=6, students=3000,
+                         hall_capacities=DEFAULT_HALL_CAPACITIES, spare_seats=0.15, seed=0):
+    """
+    Return a dict with departments, subjects, students, halls and one exam day's schedules.
+
+    - students are spread unevenly over departments (one dominant department, like real data).
+    - every department writes one of its subjects on the exam day; every third pair of
+      departments shares a subject, exercising the max-2-departments-per-subject rule.
+    - halls cycle through hall_capacities until total seats exceed students * (1 + spare_seats).
+    """
+    rnd = random.Random(seed)
+    depts = [SimpleNamespace(id=i + 1, code=f'D{i + 1:03d}', name=f'Department {i + 1}')
+             for i in range(departments)]
+
+    subjects = []
+    subjects_by_dept = {}
+    for d in depts:
+        subjects_by_dept[d.id] = []
+        for j in range(subjects_per_dept):
+            s = SimpleNamespace(id=len(subjects) + 1, code=f'{d.code}S{j + 1:02d}', name=f'{d.name} Subject {j + 1}')
+            subjects.append(s)
+            subjects_by_dept[d.id].append(s)
+
+    weights = [rnd.uniform(0.6, 1.4) for _ in depts]
+    if weights:
+        weights[0] *= 2.5  # dominant department
+    total_w = sum(weights)
+    counts = [int(students * w / total_w) for w in weights]
+    if counts:
+        counts[0] += students - sum(counts)
+
+    student_list = []
+    for d, n in zip(depts, counts):
+        for k in range(n):
+            student_list.append(SimpleNamespace(
+                id=len(student_list) + 1, department_id=d.id,
+                roll_number=f'{d.code}{k + 1:04d}', name=f'Student {d.code}-{k + 1}',
+                academic_year='2024-25', section=None,
+            ))
+
+    halls = []
+    seats = 0
+    needed = students * (1 + spare_seats)
+    while seats < needed:
+        cap = hall_capacities[len(halls) % len(hall_capacities)]
+        halls.append(SimpleNamespace(
+            id=len(halls) + 1, hall_number=f'H{len(halls) + 1:04d}', capacity=cap,
+            building_name=f'Block {len(halls) % 4 + 1}', floor=str(len(halls) % 3),
+        ))
+        seats += cap
+
+    schedules = []
+    exam_day = date.today() + timedelta(days=30)
+    for i, d in enumerate(depts):
+        subj = subjects_by_dept[d.id][0]
+        if i % 6 == 1:
+            subj = subjects_by_dept[depts[i - 1].id][0]
+        schedules.append(SimpleNamespace(
+            department_id=d.id, subject_id=subj.id, exam_date=exam_day,
+            start_time=time(9, 30), end_time=time(12, 30), academic_year='2024-25',
+        ))
+
+    return {
+        'departments': depts,
+        'subjects': subjects,
+        'students': student_list,
+        'halls': halls,
+        'schedules': schedules,
+        'exam_date': exam_day,
+    }
+
+
+def students_by_dept_subject(inst):
+    """{(dept_id, subject_id): [student, ...]} exactly as run_allocation builds it."""
+    by_dept = {}
+    for s in inst['students']:
+        by_dept.setdefault(s.department_id, []).append(s)
+    pools = {}
+    for sch in inst['schedules']:
+        pools.setdefault((sch.department_id, sch.subject_id), []).extend(by_dept.get(sch.department_id, []))
+    return pools
+
+
+def populate_database(inst, exam_name='Benchmark Exam'):
+    """Write the institution into the current app's database; returns the Exam id.
+
+    Ids are written explicitly so engine output computed from the in-memory objects
+    maps 1:1 onto database rows. Must run inside an app context on an empty database.
+    """
+    from models import db, Department, Subject, Student, ExamHall, Exam, ExamSchedule
+    from utils.bulk_writer import bulk_insert
+
+    db.session.execute(Department.__table__.insert(), [
+        {'id': d.id, 'code': d.code, 'name': d.name, 'total_students': 0} for d in inst['departments']])
+    db.session.execute(Subject.__table__.insert(), [
+        {'id': s.id, 'code': s.code, 'name': s.name} for s in inst['subjects']])
+    db.session.execute(Student.__table__.insert(), [
+        {'id': s.id, 'roll_number': s.roll_number, 'name': s.name, 'department_id': s.department_id,
+         'academic_year': s.academic_year, 'section': s.section} for s in inst['students']])
+    db.session.execute(ExamHall.__table__.insert(), [
+        {'id': h.id, 'hall_number': h.hall_number, 'capacity': h.capacity,
+         'building_name': h.building_name, 'floor': h.floor} for h in inst['halls']])
+    exam = Exam(name=exam_name, academic_year='2024-25')
+    db.session.add(exam)
+    db.session.flush()
+    bulk_insert(ExamSchedule, [
+        {'exam_id': exam.id, 'department_id': s.department_id, 'subject_id': s.subject_id,
+         'exam_date': s.exam_date, 'start_time': s.start_time, 'end_time': s.end_time,
+         'academic_year': s.academic_year} for s in inst['schedules']])
+    db.session.commit()
+    return exam.id
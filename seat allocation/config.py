@@ -4,12 +4,50 @@ from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent
 
+
+def _database_url():
+    url = os.environ.get('DATABASE_URL', f'sqlite:///{BASE_DIR}/exam_allocation.db')
+    # Heroku-style URLs use the postgres:// scheme, which SQLAlchemy no longer accepts.
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'exam-seat-allocation-secret-key-2024')
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', f'sqlite:///{BASE_DIR}/exam_allocation.db')
+    SQLALCHEMY_DATABASE_URI = _database_url()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = BASE_DIR / 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     DEFAULT_HALL_CAPACITY = 45
     STUDENTS_PER_BENCH = 3
     BENCHES_PER_HALL = 15
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    # Check every generated allocation against the engine rules and log violations.
+    VERIFY_ALLOCATIONS = True
+    # Create tables, migrate and seed the admin when the app is created; with 0, run
+    # `flask --app app init-db` at deploy time instead.
+    AUTO_INIT_DB = os.environ.get('AUTO_INIT_DB', '1').lower() in ('1', 'true', 'yes')
+    # Finished exams' allocations moved out of seat_allocations by `flask --app app archive-exams`
+    # (utils/allocation_archive.py), one compressed .npz per exam.
+    ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR', BASE_DIR / 'archive'))
+    # Seconds a logged-in user is served from the per-process cache (utils/user_cache.py); 0 disables.
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    # User IDs allowed to see the admin pages (metrics, profiling); comma-separated in env.
+    ADMIN_USER_IDS = [u.strip() for u in os.environ.get('ADMIN_USER_IDS', 'ashwin').split(',') if u.strip()]
+    # Per-request SQL accounting (utils/query_stats.py): statements slower than SLOW_QUERY_MS
+    # are logged with their route, requests issuing more than QUERY_COUNT_WARN statements too.
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 200))
+    QUERY_COUNT_WARN = int(os.environ.get('QUERY_COUNT_WARN', 100))
+    QUERY_STATS_HEADERS = os.environ.get('QUERY_STATS_HEADERS', '').lower() in ('1', 'true', 'yes')
+    # Admin request profiling (?_profile=1 or ?_profile=sample, utils/profiling.py).
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1').lower() in ('1', 'true', 'yes')
+    PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles'))
+    PROFILE_KEEP = 20              # newest stats files kept on disk
+    PROFILE_MIN_INTERVAL = 10      # seconds between profiled requests
+    PROFILE_MAX_SECONDS = 30       # sampler stops after this long
+    PROFILE_SAMPLE_INTERVAL = 0.005
+    # Generated-timetable drafts not touched for this long are deleted.
+    TIMETABLE_DRAFT_TTL_HOURS = int(os.environ.get('TIMETABLE_DRAFT_TTL_HOURS', 72))
+    # Attendance sheets: 'canvas' (direct drawing, fast) or 'platypus' (table layout).
+    ATTENDANCE_PDF_RENDERER = os.environ.get('ATTENDANCE_PDF_RENDERER', 'canvas')
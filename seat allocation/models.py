@@ -1,11 +1,23 @@
 """Database models for Exam Seat Allocation System."""
+import hashlib
+import hmac
 from datetime import datetime, time
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+# Exam sessions within a day: forenoon and afternoon, told apart by start time.
+EXAM_SESSIONS = ('FN', 'AN')
+
+
+def exam_session(start_time):
+    """'FN' for exams starting before noon, else 'AN'."""
+    return 'FN' if start_time.hour < 12 else 'AN'
+
+
 class User(UserMixin, db.Model):
     """Admin user for authentication."""
     __tablename__ = 'users'
@@ -21,6 +33,18 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @property
+    def password_fingerprint(self):
+        """Short HMAC of the password hash under SECRET_KEY; changes whenever the password
+        (or the secret key) does, and reveals nothing about the hash in the session cookie."""
+        key = current_app.config['SECRET_KEY']
+        key = key.encode() if isinstance(key, str) else key
+        return hmac.new(key, self.password_hash.encode(), hashlib.sha256).hexdigest()[:16]
+
+    def get_id(self):
+        # Flask-Login session id; see utils/user_cache.py.
+        return f'{self.id}:{self.password_fingerprint}'
+
 
 class Department(db.Model):
     """Academic departments."""
@@ -46,7 +70,11 @@ class Student(db.Model):
     academic_year = db.Column(db.String(20), default='2024-25')  # For filtering by year
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    __table_args__ = (db.UniqueConstraint('roll_number', 'department_id', name='unique_roll_per_dept'),)
+    __table_args__ = (
+        db.UniqueConstraint('roll_number', 'department_id', name='unique_roll_per_dept'),
+        # Keyset order of the students listing.
+        db.Index('ix_students_dept_roll', 'department_id', 'roll_number', 'id'),
+    )
 
 
 class Subject(db.Model):
@@ -101,6 +129,10 @@ class ExamSchedule(db.Model):
     academic_year = db.Column(db.String(20), default='2024-25')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    @property
+    def session(self):
+        return exam_session(self.start_time)
+
 
 class SeatAllocation(db.Model):
     """Stored seat allocations per exam date."""
@@ -114,9 +146,28 @@ class SeatAllocation(db.Model):
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     bench_number = db.Column(db.Integer, nullable=False)
     position = db.Column(db.Integer, nullable=False)  # 1, 2, or 3 on bench
+    session = db.Column(db.String(2))  # FN/AN; NULL when the whole day was allocated together
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_seat_allocations_exam_date', 'exam_id', 'exam_date'),
+        db.Index('ix_seat_allocations_student', 'student_id'),
+    )
+
     student = db.relationship('Student', backref='allocations')
     hall = db.relationship('ExamHall', backref='allocations')
     department = db.relationship('Department', backref='allocations')
     subject = db.relationship('Subject', backref='allocations')
+
+
+class TimetableDraft(db.Model):
+    """In-progress timetable (uploaded rows, generated schedule) kept server-side.
+
+    The cookie session only holds the draft id; payload is JSON.
+    """
+    __tablename__ = 'timetable_drafts'
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,25 @@
+"""Admin-only diagnostics routes."""
+from flask import Blueprint, render_template, send_from_directory, current_app, abort
+from routes.auth import admin_required
+from utils.instrumentation import recent_runs
+from utils.query_stats import endpoint_stats
+from utils.profiling import list_profiles, PROFILE_SUFFIXES
+
+admin_bp = Blueprint('admin', __name__)
+
+
+@admin_bp.route('/metrics')
+@admin_required
+def metrics():
+    """Per-phase timings of recent allocation/generate runs and per-endpoint SQL counts."""
+    return render_template('admin/metrics.html', runs=recent_runs(), endpoints=endpoint_stats(),
+                           profiles=list_profiles())
+
+
+@admin_bp.route('/profiles/<path:name>')
+@admin_required
+def download_profile(name):
+    """Download a stored request profile (.prof for cProfile, .txt collapsed stacks)."""
+    if not name.endswith(PROFILE_SUFFIXES):
+        abort(404)
+    return send_from_directory(current_app.config['PROFILE_DIR'], name, as_attachment=True)
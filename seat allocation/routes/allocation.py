@@ -1,18 +1,21 @@
 """Seat allocation routes."""
+import re
 from datetime import date
 from io import BytesIO
-from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, send_file, current_app,
+                   Response, abort, stream_with_context)
 from flask_login import login_required
-from models import (db, Exam, ExamSchedule, ExamHall, Student, Department, Subject, SeatAllocation)
+from sqlalchemy import and_, or_
+from models import (db, Exam, ExamSchedule, ExamHall, Student, Department, Subject, SeatAllocation,
+                    EXAM_SESSIONS, exam_session)
 from collections import defaultdict
 from math import ceil
-from utils.allocation_engine import allocate_seats
-from utils.pdf_generator import (
-    create_overall_allocation_pdf,
-    create_classroom_allocation_pdf,
-    create_attendance_sheet_pdf,
-)
-from utils.word_generator import create_overall_allocation_docx
+from utils.allocation_engine import allocate_seats, repair_allocation
+from utils.allocation_archive import archived_hall_info, archived_export_rows, is_archived
+from utils.allocation_export import EXPORT_FORMATS, iter_csv, iter_ndjson, write_xlsx
+from utils.allocation_verifier import verify_allocation
+from utils.bulk_writer import bulk_insert
+from utils.instrumentation import PipelineMetrics, track_queries
 from config import Config
 
 allocation_bp = Blueprint('allocation', __name__)
@@ -32,12 +35,19 @@ def get_exams_by_date():
         if exam:
             by_date[(str(s.exam_date), exam.id, exam.name)].append(s)
 
-    result = []
-    seen_dates = set()
+    # A day with both FN and AN exams is allocated (and listed) per session; a day with a
+    # single session keeps session=None, i.e. the whole day is allocated together.
+    groups = []
     for (d, exam_id, exam_name), scheds in sorted(by_date.items(), key=lambda x: x[0][0]):
-        if (d, exam_id) in seen_dates:
-            continue
-        seen_dates.add((d, exam_id))
+        sessions = _ordered_sessions(s.session for s in scheds)
+        if len(sessions) > 1:
+            for sess in sessions:
+                groups.append((d, exam_id, exam_name, sess, sess, [s for s in scheds if s.session == sess]))
+        else:
+            groups.append((d, exam_id, exam_name, None, sessions[0], scheds))
+
+    result = []
+    for d, exam_id, exam_name, session, session_label, scheds in groups:
         dept_ids = list({s.department_id for s in scheds})
         students = Student.query.filter(
             Student.department_id.in_(dept_ids),
@@ -53,6 +63,8 @@ def get_exams_by_date():
             'exam_id': exam_id,
             'exam_name': exam_name,
             'exam_date': d,
+            'session': session,
+            'session_label': session_label,
             'departments_count': len(dept_ids),
             'total_students': total_students,
             'available_seats': total_seats,
@@ -64,18 +76,46 @@ def get_exams_by_date():
     return result
 
 
-def run_allocation(exam_id, exam_date_str):
-    """Generate seat allocation for given exam and date."""
-    from datetime import datetime
-    exam_date = datetime.strptime(exam_date_str, '%Y-%m-%d').date()
+def _ordered_sessions(labels):
+    """Distinct session labels in day order (FN before AN)."""
+    labels = set(labels)
+    return [x for x in EXAM_SESSIONS if x in labels] + sorted(x for x in labels if x not in EXAM_SESSIONS)
+
+
+def _sessions_on(exam_id, exam_date):
+    """Sessions (FN/AN) with exams on exam_date for this exam."""
+    times = db.session.query(ExamSchedule.start_time).filter_by(
+        exam_id=exam_id, exam_date=exam_date).distinct()
+    return _ordered_sessions(exam_session(t) for (t,) in times)
+
+
+def _parse_session(value):
+    value = (value or '').strip().upper()
+    return value if value in EXAM_SESSIONS else None
+
+
+def _session_filter(session):
+    """Stored rows of one session, or the whole-day rows (session NULL) for session=None."""
+    if session:
+        return SeatAllocation.session == session
+    return SeatAllocation.session.is_(None)
+
+
+def _load_allocation_inputs(exam_id, exam_date, session=None):
+    """Fetch halls and the (dept, subject) -> students pools for one exam date (and session).
+
+    Returns (halls, students_by_dept_subj, error_message).
+    """
     schedules = ExamSchedule.query.filter_by(
         exam_id=exam_id, exam_date=exam_date
     ).all()
+    if session:
+        schedules = [s for s in schedules if s.session == session]
     if not schedules:
-        return None, 'No schedules found for this date.'
+        return None, None, 'No schedules found for this date.'
     halls = ExamHall.query.order_by(ExamHall.hall_number).all()
     if not halls:
-        return None, 'No exam halls configured.'
+        return None, None, 'No exam halls configured.'
 
     # Detect definite subject conflicts: same subject scheduled for 3 or more
     # departments on the same date for this exam. We cannot completely avoid
@@ -91,43 +131,68 @@ def run_allocation(exam_id, exam_date_str):
             'For completely conflict-free rooms, consider adjusting the timetable.',
             'warning',
         )
+    # One query for every scheduled (department, academic year), not one per schedule row.
+    cohorts = {(s.department_id, s.academic_year) for s in schedules}
+    students_by_cohort = defaultdict(list)
+    for st in Student.query.filter(or_(*(
+        and_(Student.department_id == dept_id, Student.academic_year == year) for dept_id, year in cohorts
+    ))).order_by(Student.id):
+        students_by_cohort[(st.department_id, st.academic_year)].append(st)
     students_by_dept_subj = defaultdict(list)
     for s in schedules:
-        students = Student.query.filter(
-            Student.department_id == s.department_id,
-            Student.academic_year == s.academic_year
-        ).all()
         key = (s.department_id, s.subject_id)
-        students_by_dept_subj[key].extend(students)
+        students_by_dept_subj[key].extend(students_by_cohort[(s.department_id, s.academic_year)])
 
     if not students_by_dept_subj:
-        return None, 'No students found for the scheduled departments.'
+        return None, None, 'No students found for the scheduled departments.'
+    return halls, students_by_dept_subj, None
 
-    allocations, halls_sorted, hall_matrix, hall_seats = allocate_seats(
-        students_by_dept_subj,
-        halls,
+
+def _allocation_rows(exam_id, exam_date, allocations, session=None):
+    """SeatAllocation column dicts for bulk_insert."""
+    rows = []
+    for (hall_id, bench, pos, stu_tuple) in allocations:
+        st_id, roll, name, dept_id, subj_id = stu_tuple
+        rows.append({
+            'exam_id': exam_id, 'exam_date': exam_date, 'hall_id': hall_id,
+            'department_id': dept_id, 'subject_id': subj_id, 'student_id': st_id,
+            'bench_number': bench, 'position': pos, 'session': session,
+        })
+    return rows
+
+
+def _check_allocation(exam_id, exam_date, allocations, halls, students_by_dept_subj):
+    """Verify an allocation against the engine rules and log the outcome."""
+    if not current_app.config.get('VERIFY_ALLOCATIONS', True):
+        return None
+    report = verify_allocation(
+        allocations, halls, students_by_dept_subj,
         capacity_per_bench=Config.STUDENTS_PER_BENCH,
         benches_per_hall=Config.BENCHES_PER_HALL,
-        # Let each hall use its own configured capacity; 45-seat halls
-        # still behave exactly as before.
-        target_capacity=None,
     )
+    m = report['metrics']
+    log = current_app.logger.info if report['ok'] else current_app.logger.warning
+    log('Allocation exam=%s date=%s: %s/%s placed in %s halls, fill %.1f%%, violations %s',
+        exam_id, exam_date, m['students_placed'], m['students_expected'], m['halls_used'],
+        m['fill_ratio'] * 100, m['violations_by_rule'] or 'none')
+    return report
 
-    exam = Exam.query.get(exam_id)
-    SeatAllocation.query.filter_by(exam_id=exam_id, exam_date=exam_date).delete()
 
-    student_cache = {}
-    for (hall_id, bench, pos, stu_tuple) in allocations:
-        st_id, roll, name, dept_id, subj_id = stu_tuple
-        student_cache[st_id] = {'id': st_id, 'roll_number': roll, 'name': name}
-        sa = SeatAllocation(
-            exam_id=exam_id, exam_date=exam_date, hall_id=hall_id,
-            department_id=dept_id, subject_id=subj_id, student_id=st_id,
-            bench_number=bench, position=pos
-        )
-        db.session.add(sa)
-    db.session.commit()
+def _seat_rows(seats):
+    """[(bench, roll1, roll2, roll3), ...] for the Bench/Position view table."""
+    seat_grid = {}
+    for bench, pos, roll in seats:
+        if bench not in seat_grid:
+            seat_grid[bench] = {1: '', 2: '', 3: ''}
+        seat_grid[bench][pos] = roll
+    return [(b, seat_grid[b].get(1, ''), seat_grid[b].get(2, ''), seat_grid[b].get(3, '')) for b in sorted(seat_grid.keys())]
+
 
+def build_hall_info(allocations, halls_sorted, depts=None, subjs=None):
+    """Per-hall summary dicts (used by the view and the PDF/Word generators) from engine output.
+
+    depts/subjs map id -> object with code and name; looked up in the database when not given.
+    """
     hall_info_map = {}
     for h in halls_sorted:
         hall_info_map[h.id] = {
@@ -136,33 +201,167 @@ def run_allocation(exam_id, exam_date_str):
             'floor': h.floor or '', 'allocations': [], 'seats': [], 'students': []
         }
 
+    # One query each for the departments and subjects involved (not one per seat).
+    if depts is None:
+        dept_ids = {stu[3] for (_h, _b, _p, stu) in allocations}
+        depts = {d.id: d for d in Department.query.filter(Department.id.in_(dept_ids))} if dept_ids else {}
+    if subjs is None:
+        subj_ids = {stu[4] for (_h, _b, _p, stu) in allocations}
+        subjs = {s.id: s for s in Subject.query.filter(Subject.id.in_(subj_ids))} if subj_ids else {}
+
+    groups = {}
     for (hall_id, bench, pos, stu_tuple) in allocations:
         st_id, roll, name, dept_id, subj_id = stu_tuple
-        dept = Department.query.get(dept_id)
-        subj = Subject.query.get(subj_id)
+        dept = depts.get(dept_id)
+        subj = subjs.get(subj_id)
         info = hall_info_map[hall_id]
         info['seats'].append((bench, pos, roll))
         info['students'].append({'roll_number': roll, 'name': name})
         key = (dept.code if dept else '', subj.code if subj else '')
-        existing = next((a for a in info['allocations'] if (a.get('department_code') == key[0] and a.get('subject_code') == key[1])), None)
+        existing = groups.get((hall_id, key))
         if existing:
             existing['count'] += 1
             existing['roll_numbers'].append(roll)
         else:
-            info['allocations'].append({
+            existing = groups[(hall_id, key)] = {
                 'department_code': key[0], 'dept_name': dept.name if dept else '',
                 'subject_code': key[1], 'subject_name': subj.name if subj else '',
                 'count': 1, 'roll_numbers': [roll]
-            })
+            }
+            info['allocations'].append(existing)
 
     for a in hall_info_map.values():
+        a['seat_rows'] = _seat_rows(a['seats'])
         for al in a['allocations']:
             rn = al.get('roll_numbers', [])
             if rn:
                 rn_sorted = sorted(rn, key=lambda x: (len(x), x))
                 al['roll_range'] = f"{min(rn_sorted)} - {max(rn_sorted)}" if len(rn_sorted) > 1 else str(rn_sorted[0])
 
-    return list(hall_info_map.values()), None
+    return list(hall_info_map.values())
+
+
+def stored_hall_info(exam_id, exam_date, session=None):
+    """Hall info rebuilt from stored SeatAllocation rows, or None if nothing is stored.
+
+    Rows, students, halls, departments and subjects are fetched with a fixed number of
+    queries regardless of how many seats are allocated.
+    """
+    rows = db.session.query(
+        SeatAllocation.hall_id, SeatAllocation.bench_number, SeatAllocation.position,
+        SeatAllocation.student_id, Student.roll_number, Student.name,
+        SeatAllocation.department_id, SeatAllocation.subject_id,
+    ).join(Student, Student.id == SeatAllocation.student_id).filter(
+        SeatAllocation.exam_id == exam_id, SeatAllocation.exam_date == exam_date,
+        _session_filter(session),
+    ).order_by(SeatAllocation.id).all()
+    if not rows:
+        return None
+    allocations = [(h, b, p, (st_id, roll, name, d, s)) for h, b, p, st_id, roll, name, d, s in rows]
+    hall_ids = {r[0] for r in rows}
+    halls = ExamHall.query.filter(ExamHall.id.in_(hall_ids)).order_by(ExamHall.hall_number).all()
+    return build_hall_info(allocations, halls)
+
+
+def run_allocation(exam_id, exam_date_str, session=None):
+    """Generate seat allocation for given exam and date; session ('FN'/'AN') limits it to
+    the exams of that session, None allocates the whole day together."""
+    from datetime import datetime
+    exam_date = datetime.strptime(exam_date_str, '%Y-%m-%d').date()
+    metrics = PipelineMetrics('run_allocation', exam_id=exam_id, exam_date=exam_date, session=session)
+    with track_queries(metrics, db.engine):
+        with metrics.timer('fetch_students'):
+            halls, students_by_dept_subj, err = _load_allocation_inputs(exam_id, exam_date, session)
+        if err:
+            return None, err
+
+        with metrics.timer('engine'):
+            allocations, halls_sorted, hall_matrix, hall_seats = allocate_seats(
+                students_by_dept_subj,
+                halls,
+                capacity_per_bench=Config.STUDENTS_PER_BENCH,
+                benches_per_hall=Config.BENCHES_PER_HALL,
+                # Let each hall use its own configured capacity; 45-seat halls
+                # still behave exactly as before.
+                target_capacity=None,
+                metrics=metrics,
+            )
+
+        with metrics.timer('verify'):
+            _check_allocation(exam_id, exam_date, allocations, halls, students_by_dept_subj)
+
+        # Before the commit, which would expire the halls and reload them one by one.
+        with metrics.timer('hall_info'):
+            hall_info = build_hall_info(allocations, halls_sorted)
+
+        with metrics.timer('commit'):
+            stale = SeatAllocation.query.filter_by(exam_id=exam_id, exam_date=exam_date)
+            if session:
+                # The session's previous rows, and any whole-day rows it supersedes.
+                stale = stale.filter(db.or_(SeatAllocation.session == session, SeatAllocation.session.is_(None)))
+            stale.delete(synchronize_session=False)
+            bulk_insert(SeatAllocation, _allocation_rows(exam_id, exam_date, allocations, session))
+            db.session.commit()
+    metrics.finish(current_app.logger)
+    return hall_info, None
+
+
+def run_incremental_allocation(exam_id, exam_date_str, session=None):
+    """Repair the stored allocation for a date after students or halls changed.
+
+    Only the rows that change are deleted/inserted, so every other student keeps the
+    seat already printed for them. Falls back to a full run_allocation when nothing is
+    stored yet or the change cannot be absorbed without breaking the engine rules or
+    leaving students unseated that a full run would place.
+    Returns (hall_info, changes, error_message); changes is (added, removed) or None
+    when a full regeneration was done.
+    """
+    from datetime import datetime
+    exam_date = datetime.strptime(exam_date_str, '%Y-%m-%d').date()
+    stored = db.session.query(
+        SeatAllocation.id, SeatAllocation.hall_id, SeatAllocation.bench_number, SeatAllocation.position,
+        SeatAllocation.student_id, Student.roll_number, Student.name,
+        SeatAllocation.department_id, SeatAllocation.subject_id,
+    ).outerjoin(Student, Student.id == SeatAllocation.student_id).filter(
+        SeatAllocation.exam_id == exam_id, SeatAllocation.exam_date == exam_date,
+        _session_filter(session),
+    ).all()
+    if not stored:
+        hall_info, err = run_allocation(exam_id, exam_date_str, session)
+        return hall_info, None, err
+
+    halls, students_by_dept_subj, err = _load_allocation_inputs(exam_id, exam_date, session)
+    if err:
+        return None, None, err
+
+    existing = []
+    row_ids = {}
+    for row_id, hall_id, bench, pos, st_id, roll, name, dept_id, subj_id in stored:
+        entry = (hall_id, bench, pos, (st_id, roll, name, dept_id, subj_id))
+        existing.append(entry)
+        row_ids[(hall_id, bench, pos, st_id)] = row_id
+
+    repaired = repair_allocation(
+        existing,
+        students_by_dept_subj,
+        halls,
+        capacity_per_bench=Config.STUDENTS_PER_BENCH,
+        benches_per_hall=Config.BENCHES_PER_HALL,
+    )
+    if repaired is None:
+        hall_info, err = run_allocation(exam_id, exam_date_str, session)
+        return hall_info, None, err
+
+    allocations, added, removed = repaired
+    _check_allocation(exam_id, exam_date, allocations, halls, students_by_dept_subj)
+    halls_sorted = sorted(halls, key=lambda h: (h.hall_number or str(h.id)))
+    hall_info = build_hall_info(allocations, halls_sorted)
+    removed_ids = [row_ids[(h, b, p, stu[0])] for (h, b, p, stu) in removed]
+    if removed_ids:
+        SeatAllocation.query.filter(SeatAllocation.id.in_(removed_ids)).delete(synchronize_session=False)
+    bulk_insert(SeatAllocation, _allocation_rows(exam_id, exam_date, added, session))
+    db.session.commit()
+    return hall_info, (len(added), len(removed)), None
 
 
 @allocation_bp.route('/')
@@ -179,138 +378,220 @@ def _parse_exam_date(d):
     return datetime.strptime(str(d), '%Y-%m-%d').date()
 
 
+def _session_redirect(endpoint, exam_id, exam_date_obj, session):
+    """Redirect a whole-day request to the first session when the day has both FN and AN."""
+    if session:
+        return None
+    sessions = _sessions_on(exam_id, exam_date_obj)
+    if len(sessions) > 1:
+        args = {**request.args.to_dict(), 'session': sessions[0]}
+        return redirect(url_for(endpoint, exam_id=exam_id, exam_date=str(exam_date_obj), **args))
+    return None
+
+
+def _date_label(exam_date_obj, session):
+    """Date as printed on the PDFs/Word sheet, with the session when allocated per session."""
+    return f'{exam_date_obj} ({session})' if session else str(exam_date_obj)
+
+
 @allocation_bp.route('/view/<int:exam_id>/<exam_date>')
 @login_required
 def view(exam_id, exam_date):
     exam = Exam.query.get_or_404(exam_id)
     exam_date_obj = _parse_exam_date(exam_date)
-    allocations = SeatAllocation.query.filter_by(
-        exam_id=exam_id, exam_date=exam_date_obj
-    ).all()
-    if not allocations:
-        hall_info, err = run_allocation(exam_id, str(exam_date_obj))
+    session = _parse_session(request.args.get('session'))
+    redirect_response = _session_redirect('allocation.view', exam_id, exam_date_obj, session)
+    if redirect_response:
+        return redirect_response
+    hall_info = stored_hall_info(exam_id, exam_date_obj, session)
+    archived = False
+    if hall_info is None:
+        hall_info = archived_hall_info(exam, exam_date_obj, session)
+        archived = hall_info is not None
+    if hall_info is None:
+        hall_info, err = run_allocation(exam_id, str(exam_date_obj), session)
         if err:
             flash(err, 'danger')
             return redirect(url_for('allocation.index'))
+    return render_template('allocation/view.html', exam=exam, exam_date=exam_date, hall_info=hall_info,
+                           session=session, sessions=_sessions_on(exam_id, exam_date_obj), archived=archived)
+
+
+@allocation_bp.route('/update/<int:exam_id>/<exam_date>', methods=['POST'])
+@login_required
+def update(exam_id, exam_date):
+    """Re-seat only the students affected by student/hall changes since the last allocation."""
+    exam = Exam.query.get_or_404(exam_id)
+    exam_date_obj = _parse_exam_date(exam_date)
+    session = _parse_session(request.args.get('session'))
+    if is_archived(exam, exam_date_obj, session):
+        # With its seats moved to the archive the day would be allocated afresh,
+        # replacing the archived seating.
+        flash('This exam is archived; its seating can no longer be changed.', 'warning')
+        return redirect(url_for('allocation.view', exam_id=exam_id, exam_date=str(exam_date_obj), session=session))
+    if not session and len(_sessions_on(exam_id, exam_date_obj)) > 1:
+        flash('This date has forenoon and afternoon exams; update each session separately.', 'warning')
+        return redirect(url_for('allocation.view', exam_id=exam_id, exam_date=str(exam_date_obj)))
+    _hall_info, changes, err = run_incremental_allocation(exam_id, str(exam_date_obj), session)
+    if err:
+        flash(err, 'danger')
+        return redirect(url_for('allocation.index'))
+    if changes is None:
+        flash('The changes could not be absorbed into the existing seating, so the allocation was regenerated.', 'warning')
+    elif changes == (0, 0):
+        flash('Allocation is already up to date.', 'info')
     else:
-        hall_info = []
-        hall_ids = list({a.hall_id for a in allocations})
-        halls = {h.id: h for h in ExamHall.query.filter(ExamHall.id.in_(hall_ids)).all()}
-        for hid in hall_ids:
-            h = halls.get(hid)
-            if not h:
-                continue
-            hall_alloc = [a for a in allocations if a.hall_id == hid]
-            dept_groups = defaultdict(list)
-            for a in hall_alloc:
-                dept_groups[(a.department_id, a.subject_id)].append(a)
-            alloc_list = []
-            for (dept_id, subj_id), allocs in dept_groups.items():
-                dept = Department.query.get(dept_id)
-                subj = Subject.query.get(subj_id)
-                rolls = [a.student.roll_number for a in allocs if a.student]
-                alloc_list.append({
-                    'department_code': dept.code if dept else '',
-                    'subject_code': subj.code if subj else '',
-                    'count': len(allocs),
-                    'roll_range': f"{min(rolls)} - {max(rolls)}" if len(rolls) > 1 else (rolls[0] if rolls else '')
-                })
-            seats_raw = [(a.bench_number, a.position, a.student.roll_number if a.student else '') for a in hall_alloc]
-            seat_grid = {}
-            for bench, pos, roll in seats_raw:
-                if bench not in seat_grid:
-                    seat_grid[bench] = {1: '', 2: '', 3: ''}
-                seat_grid[bench][pos] = roll
-            seat_rows = [(b, seat_grid[b].get(1,''), seat_grid[b].get(2,''), seat_grid[b].get(3,'')) for b in sorted(seat_grid.keys())]
-            seats_for_pdf = [(b, pos, roll) for b, row in seat_grid.items() for pos, roll in row.items() if roll]
-            students = [{'roll_number': a.student.roll_number, 'name': a.student.name} for a in hall_alloc if a.student]
-            hall_info.append({
-                'hall_number': h.hall_number,
-                'capacity': h.capacity,
-                'building_name': h.building_name or '',
-                'floor': h.floor or '',
-                'allocations': alloc_list,
-                'seat_rows': seat_rows,
-                'seats': seats_for_pdf,
-                'students': students,
-            })
-    return render_template('allocation/view.html', exam=exam, exam_date=exam_date, hall_info=hall_info)
+        flash(f'Allocation updated: {changes[0]} seat(s) assigned, {changes[1]} seat(s) released. '
+              'All other students keep their seats.', 'success')
+    return redirect(url_for('allocation.view', exam_id=exam_id, exam_date=str(exam_date_obj), session=session))
 
 
 @allocation_bp.route('/generate/<int:exam_id>/<exam_date>')
 @login_required
 def generate(exam_id, exam_date):
+    # ReportLab and python-docx load on the first download, not at startup.
+    from utils.pdf_generator import (
+        create_overall_allocation_pdf,
+        create_classroom_allocation_pdf,
+        create_attendance_sheet_pdf,
+        create_combined_seating_pdf,
+        create_combined_attendance_pdf,
+        group_halls,
+        HALL_GROUPINGS,
+    )
+    from utils.word_generator import create_overall_allocation_docx
     exam = Exam.query.get_or_404(exam_id)
     exam_date_obj = _parse_exam_date(exam_date)
-    allocations = SeatAllocation.query.filter_by(
-        exam_id=exam_id, exam_date=exam_date_obj
-    ).all()
-    if not allocations:
-        hall_info, err = run_allocation(exam_id, str(exam_date_obj))
-        if err:
-            flash(err, 'danger')
-            return redirect(url_for('allocation.index'))
-        # Skip unallocated halls in downloads
-        hall_info = [h for h in hall_info if h.get('seats')]
-    else:
-        hall_ids = list({a.hall_id for a in allocations})
-        halls = {h.id: h for h in ExamHall.query.filter(ExamHall.id.in_(hall_ids)).all()}
-        hall_info = []
-        for hid in hall_ids:
-            h = halls.get(hid)
-            hall_alloc = [a for a in allocations if a.hall_id == hid]
-            dept_groups = defaultdict(list)
-            for a in hall_alloc:
-                dept_groups[(a.department_id, a.subject_id)].append(a)
-            alloc_list = []
-            for (dept_id, subj_id), allocs in dept_groups.items():
-                dept = Department.query.get(dept_id)
-                subj = Subject.query.get(subj_id)
-                rolls = [a.student.roll_number for a in allocs if a.student]
-                alloc_list.append({
-                    'department_code': dept.code if dept else '',
-                    'subject_code': subj.code if subj else '',
-                    'count': len(allocs),
-                    'roll_range': f"{min(rolls)} - {max(rolls)}" if len(rolls) > 1 else (rolls[0] if rolls else ''),
-                    'roll_numbers': rolls
-                })
-            seats = [(a.bench_number, a.position, a.student.roll_number if a.student else '') for a in hall_alloc]
-            students = [{'roll_number': a.student.roll_number, 'name': a.student.name} for a in hall_alloc if a.student]
-            hall_info.append({
-                'hall_number': h.hall_number,
-                'capacity': h.capacity,
-                'building_name': h.building_name or '',
-                'floor': h.floor or '',
-                'allocations': alloc_list,
-                'seats': seats,
-                'students': students,
-            })
+    session = _parse_session(request.args.get('session'))
+    redirect_response = _session_redirect('allocation.generate', exam_id, exam_date_obj, session)
+    if redirect_response:
+        return redirect_response
+    date_label = _date_label(exam_date_obj, session)
+    # layout=combined puts all seating sheets in one PDF and all attendance sheets in
+    # another (per building or floor with group=building|floor) instead of one PDF per hall.
+    combined = request.args.get('layout') == 'combined'
+    group_by = request.args.get('group') if request.args.get('group') in HALL_GROUPINGS else None
+    metrics = PipelineMetrics('generate', exam_id=exam_id, exam_date=exam_date_obj, session=session,
+                              layout='combined' if combined else 'per_hall', group=group_by)
+    with track_queries(metrics, db.engine), metrics.timer('hall_info'):
+        hall_info, err = _generate_hall_info(exam, exam_date_obj, session)
+    if err:
+        flash(err, 'danger')
+        return redirect(url_for('allocation.index'))
 
     from zipfile import ZipFile
+    renderer = current_app.config.get('ATTENDANCE_PDF_RENDERER', 'canvas')
     zip_buffer = BytesIO()
     try:
         with ZipFile(zip_buffer, 'w') as zf:
-            overall = create_overall_allocation_pdf(hall_info, exam.name, str(exam_date_obj))
-            zf.writestr('overall_allocation.pdf', overall.getvalue())
+            with metrics.timer('overall_pdf'):
+                overall = create_overall_allocation_pdf(hall_info, exam.name, date_label)
+                zf.writestr('overall_allocation.pdf', overall.getvalue())
             try:
-                overall_docx = create_overall_allocation_docx(hall_info, exam.name, str(exam_date_obj))
-                zf.writestr('overall_allocation.docx', overall_docx.getvalue())
+                with metrics.timer('overall_docx'):
+                    overall_docx = create_overall_allocation_docx(hall_info, exam.name, date_label)
+                    zf.writestr('overall_allocation.docx', overall_docx.getvalue())
             except Exception:
                 # If Word generation fails, still provide PDFs and inform the user.
                 flash('Word file generation failed. PDF files were generated successfully.', 'warning')
-            for hi in hall_info:
-                room_pdf = create_classroom_allocation_pdf(hi, exam.name, str(exam_date_obj))
-                zf.writestr(f"hall_{hi['hall_number']}_seating.pdf", room_pdf.getvalue())
-                att_pdf = create_attendance_sheet_pdf(hi, exam.name, str(exam_date_obj))
-                zf.writestr(f"hall_{hi['hall_number']}_attendance.pdf", att_pdf.getvalue())
+            if combined:
+                for label, halls in group_halls(hall_info, group_by):
+                    name = _file_slug(label)
+                    with metrics.timer('seating_pdfs'):
+                        zf.writestr(f'seating_{name}.pdf',
+                                    create_combined_seating_pdf(halls, exam.name, date_label).getvalue())
+                    with metrics.timer('attendance_pdfs'):
+                        zf.writestr(f'attendance_{name}.pdf', create_combined_attendance_pdf(
+                            halls, exam.name, date_label, renderer=renderer).getvalue())
+                    metrics.incr('halls', len(halls))
+            for hi in ([] if combined else hall_info):
+                with metrics.timer('seating_pdfs'):
+                    room_pdf = create_classroom_allocation_pdf(hi, exam.name, date_label)
+                    zf.writestr(f"hall_{hi['hall_number']}_seating.pdf", room_pdf.getvalue())
+                with metrics.timer('attendance_pdfs'):
+                    att_pdf = create_attendance_sheet_pdf(hi, exam.name, date_label, renderer=renderer)
+                    zf.writestr(f"hall_{hi['hall_number']}_attendance.pdf", att_pdf.getvalue())
+                metrics.incr('halls')
         zip_buffer.seek(0)
+        metrics.incr('zip_bytes', zip_buffer.getbuffer().nbytes)
+        metrics.finish(current_app.logger)
         return send_file(
             zip_buffer,
             mimetype='application/zip',
             as_attachment=True,
-            download_name=f'allocation_{exam.name}_{str(exam_date_obj)}.zip'
+            download_name=f"allocation_{exam.name}_{exam_date_obj}{'_' + session if session else ''}.zip"
         )
     except Exception:
         # Catch any unexpected error and avoid showing a raw error page.
         flash('An error occurred while generating the allocation files. Please try again.', 'danger')
         return redirect(url_for('allocation.index'))
+
+
+def export_rows(exam_id, exam_date, session=None, batch_size=1000):
+    """Stored allocation rows for the data export, in EXPORT_COLUMNS order.
+
+    Streamed in batches through a server-side cursor (stream_results; a named cursor on
+    PostgreSQL) so memory stays flat however many seats are stored. session None
+    exports every row of the date.
+    """
+    query = db.session.query(
+        ExamHall.hall_number, ExamHall.building_name, ExamHall.floor, SeatAllocation.session,
+        SeatAllocation.bench_number, SeatAllocation.position, Student.roll_number, Student.name,
+        Department.code, Subject.code, Subject.name,
+    ).join(ExamHall, ExamHall.id == SeatAllocation.hall_id
+    ).join(Student, Student.id == SeatAllocation.student_id
+    ).join(Department, Department.id == SeatAllocation.department_id
+    ).join(Subject, Subject.id == SeatAllocation.subject_id
+    ).filter(SeatAllocation.exam_id == exam_id, SeatAllocation.exam_date == exam_date)
+    if session:
+        query = query.filter(SeatAllocation.session == session)
+    query = query.order_by(SeatAllocation.session, ExamHall.hall_number,
+                           SeatAllocation.bench_number, SeatAllocation.position)
+    for row in query.yield_per(batch_size):
+        yield tuple(row)
+
+
+@allocation_bp.route('/export/<int:exam_id>/<exam_date>')
+@login_required
+def export(exam_id, exam_date):
+    """Stored (or archived) allocation as data: ?format=csv (default), ndjson or xlsx; optional ?session=FN|AN."""
+    exam = Exam.query.get_or_404(exam_id)
+    exam_date_obj = _parse_exam_date(exam_date)
+    session = _parse_session(request.args.get('session'))
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        abort(400)
+    mimetype, ext = EXPORT_FORMATS[fmt]
+    download_name = f"allocation_{_file_slug(exam.name)}_{exam_date_obj}{'_' + session if session else ''}.{ext}"
+    rows = export_rows(exam_id, exam_date_obj, session)
+    stored = db.session.query(SeatAllocation.id).filter(
+        SeatAllocation.exam_id == exam_id, SeatAllocation.exam_date == exam_date_obj,
+        SeatAllocation.session == session if session else db.true()).first()
+    if stored is None:
+        rows = archived_export_rows(exam, exam_date_obj, session) or []
+    if fmt == 'xlsx':
+        # A zip container cannot be streamed row by row; openpyxl's write-only mode keeps
+        # rows in a temp file instead of memory, and the file is streamed from disk.
+        return send_file(write_xlsx(rows), mimetype=mimetype, as_attachment=True, download_name=download_name)
+    chunks = iter_csv(rows) if fmt == 'csv' else iter_ndjson(rows)
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{download_name}"'})
+
+
+def _file_slug(label):
+    """File-name-safe form of a hall group label."""
+    return re.sub(r'[^A-Za-z0-9]+', '_', label).strip('_').lower() or 'halls'
+
+
+def _generate_hall_info(exam, exam_date_obj, session=None):
+    """Hall info for the download bundle: stored allocation if any, then the archive, else a fresh run."""
+    hall_info = stored_hall_info(exam.id, exam_date_obj, session)
+    if hall_info is None:
+        hall_info = archived_hall_info(exam, exam_date_obj, session)
+    if hall_info is None:
+        hall_info, err = run_allocation(exam.id, str(exam_date_obj), session)
+        if err:
+            return None, err
+        # Skip unallocated halls in downloads
+        hall_info = [h for h in hall_info if h.get('seats')]
+    return hall_info, None
@@ -0,0 +1,241 @@
+"""Read-only JSON API for allocations and seat lookups (ERP, notice-board displays).
+
+    GET /api/exams/<exam_id>/dates
+    GET /api/exams/<exam_id>/dates/<date>/halls[?session=FN|AN]
+    GET /api/exams/<exam_id>/dates/<date>/seats[?session=&hall=&after=&limit=]
+    GET /api/students/<roll_number>/seats[?exam_id=&department=]
+    GET /api/search?q=[&type=students|subjects&limit=]
+
+Seat lists are compact (a "fields" list plus one array per seat) and keyset-paginated
+on SeatAllocation.id: pass the previous page's "next" value as ?after=.
+
+Every response carries a strong ETag derived from the allocation version of what it
+covers: row count, max id, id sum and newest created_at of the SeatAllocation rows. An
+update adds or removes rows; a regenerate rewrites them with a new created_at (SQLite
+may hand out the same ids again after a full delete). Clients poll with If-None-Match
+and get a 304 without the payload being built. Edits to students or halls alone do not
+change the version; they show up after the next allocation run or update. Search
+results are not cached.
+"""
+import hashlib
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user
+from sqlalchemy import func
+
+from models import (db, Exam, ExamSchedule, ExamHall, Student, Department, Subject, SeatAllocation,
+                    exam_session)
+from routes.allocation import _ordered_sessions, _parse_session
+from utils.search import search_students, search_subjects, STUDENT_FIELDS, SUBJECT_FIELDS
+
+api_bp = Blueprint('api', __name__)
+
+API_VERSION = 1
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 2000
+MAX_SEARCH_RESULTS = 50
+SEAT_FIELDS = ['id', 'hall', 'session', 'bench', 'position', 'roll_number', 'name', 'department', 'subject']
+
+
+@api_bp.before_request
+def _require_login():
+    if not current_user.is_authenticated:
+        return jsonify(error='authentication required'), 401
+
+
+def _allocation_version(*criteria):
+    """(count, max id, sum of ids, newest created_at) of the SeatAllocation rows matching criteria."""
+    return db.session.query(
+        func.count(SeatAllocation.id), func.max(SeatAllocation.id), func.sum(SeatAllocation.id),
+        func.max(SeatAllocation.created_at),
+    ).filter(*criteria).one()
+
+
+def _etag(*version):
+    """Strong ETag for this URL (path + query) at the given version."""
+    raw = f'{API_VERSION}|{request.full_path}|{version}'
+    return hashlib.sha1(raw.encode()).hexdigest()[:32]
+
+
+def _not_modified(etag):
+    """304 response if the client already has etag, else None."""
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+
+def _json(payload, etag):
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        abort(400, description='date must be YYYY-MM-DD')
+
+
+def _int_arg(name, default=None, maximum=None):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        abort(400, description=f'{name} must be an integer')
+    if number < 0:
+        abort(400, description=f'{name} must not be negative')
+    return min(number, maximum) if maximum else number
+
+
+@api_bp.errorhandler(400)
+@api_bp.errorhandler(404)
+def _json_error(err):
+    return jsonify(error=err.description), err.code
+
+
+@api_bp.route('/exams/<int:exam_id>/dates')
+def exam_dates(exam_id):
+    """Scheduled dates of an exam with their sessions and stored seat counts."""
+    schedule_version = db.session.query(func.count(ExamSchedule.id), func.max(ExamSchedule.id)).filter(
+        ExamSchedule.exam_id == exam_id).one()
+    etag = _etag(tuple(_allocation_version(SeatAllocation.exam_id == exam_id)), tuple(schedule_version))
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+
+    exam = db.session.get(Exam, exam_id) or abort(404, description='exam not found')
+    times = db.session.query(ExamSchedule.exam_date, ExamSchedule.start_time).filter(
+        ExamSchedule.exam_id == exam_id).distinct()
+    sessions = {}
+    for d, t in times:
+        sessions.setdefault(d, set()).add(exam_session(t))
+    seats = dict(db.session.query(SeatAllocation.exam_date, func.count(SeatAllocation.id)).filter(
+        SeatAllocation.exam_id == exam_id).group_by(SeatAllocation.exam_date).all())
+    return _json({
+        'exam': {'id': exam.id, 'name': exam.name},
+        'dates': [{'date': d.isoformat(), 'sessions': _ordered_sessions(s), 'seats': seats.get(d, 0)}
+                  for d, s in sorted(sessions.items())],
+    }, etag)
+
+
+@api_bp.route('/exams/<int:exam_id>/dates/<exam_date>/halls')
+def exam_halls(exam_id, exam_date):
+    """Halls used on a date with their seat counts."""
+    exam_date = _parse_date(exam_date)
+    criteria = [SeatAllocation.exam_id == exam_id, SeatAllocation.exam_date == exam_date]
+    session = _parse_session(request.args.get('session'))
+    if session:
+        criteria.append(SeatAllocation.session == session)
+    etag = _etag(tuple(_allocation_version(*criteria)))
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+
+    rows = db.session.query(
+        ExamHall.hall_number, ExamHall.building_name, ExamHall.floor, ExamHall.capacity,
+        func.count(SeatAllocation.id),
+    ).join(SeatAllocation, SeatAllocation.hall_id == ExamHall.id).filter(*criteria).group_by(
+        ExamHall.id, ExamHall.hall_number, ExamHall.building_name, ExamHall.floor, ExamHall.capacity,
+    ).order_by(ExamHall.hall_number).all()
+    return _json({
+        'fields': ['hall', 'building', 'floor', 'capacity', 'seats'],
+        'halls': [list(r) for r in rows],
+    }, etag)
+
+
+@api_bp.route('/exams/<int:exam_id>/dates/<exam_date>/seats')
+def exam_seats(exam_id, exam_date):
+    """Seat map of a date (or one hall with ?hall=), keyset-paginated on seat id."""
+    exam_date = _parse_date(exam_date)
+    criteria = [SeatAllocation.exam_id == exam_id, SeatAllocation.exam_date == exam_date]
+    session = _parse_session(request.args.get('session'))
+    if session:
+        criteria.append(SeatAllocation.session == session)
+    hall_number = request.args.get('hall')
+    if hall_number:
+        hall = ExamHall.query.filter_by(hall_number=hall_number).first() or abort(404, description='hall not found')
+        criteria.append(SeatAllocation.hall_id == hall.id)
+    after = _int_arg('after', 0)
+    limit = _int_arg('limit', DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE) or DEFAULT_PAGE_SIZE
+
+    etag = _etag(tuple(_allocation_version(*criteria)))
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+
+    rows = db.session.query(
+        SeatAllocation.id, ExamHall.hall_number, SeatAllocation.session, SeatAllocation.bench_number,
+        SeatAllocation.position, Student.roll_number, Student.name, Department.code, Subject.code,
+    ).join(ExamHall, ExamHall.id == SeatAllocation.hall_id
+    ).join(Student, Student.id == SeatAllocation.student_id
+    ).join(Department, Department.id == SeatAllocation.department_id
+    ).join(Subject, Subject.id == SeatAllocation.subject_id
+    ).filter(*criteria, SeatAllocation.id > after).order_by(SeatAllocation.id).limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return _json({
+        'fields': SEAT_FIELDS,
+        'seats': [list(r) for r in rows],
+        'next': rows[-1][0] if more else None,
+    }, etag)
+
+
+@api_bp.route('/students/<roll_number>/seats')
+def student_seats(roll_number):
+    """Where a student sits: every stored seat, optionally for one exam or department code."""
+    students = Student.query.filter_by(roll_number=roll_number)
+    department = request.args.get('department')
+    if department:
+        students = students.join(Department).filter(Department.code == department)
+    student_ids = [s.id for s in students.with_entities(Student.id)]
+    if not student_ids:
+        abort(404, description='student not found')
+    criteria = [SeatAllocation.student_id.in_(student_ids)]
+    exam_id = _int_arg('exam_id')
+    if exam_id is not None:
+        criteria.append(SeatAllocation.exam_id == exam_id)
+
+    etag = _etag(tuple(_allocation_version(*criteria)))
+    cached = _not_modified(etag)
+    if cached:
+        return cached
+
+    rows = db.session.query(
+        SeatAllocation.exam_id, Exam.name, SeatAllocation.exam_date, SeatAllocation.session,
+        ExamHall.hall_number, ExamHall.building_name, ExamHall.floor, SeatAllocation.bench_number,
+        SeatAllocation.position, Department.code, Subject.code,
+    ).join(Exam, Exam.id == SeatAllocation.exam_id
+    ).join(ExamHall, ExamHall.id == SeatAllocation.hall_id
+    ).join(Department, Department.id == SeatAllocation.department_id
+    ).join(Subject, Subject.id == SeatAllocation.subject_id
+    ).filter(*criteria).order_by(SeatAllocation.exam_date, SeatAllocation.session, SeatAllocation.id).all()
+    return _json({
+        'roll_number': roll_number,
+        'fields': ['exam_id', 'exam', 'date', 'session', 'hall', 'building', 'floor', 'bench', 'position',
+                   'department', 'subject'],
+        'seats': [[r[0], r[1], r[2].isoformat(), *r[3:]] for r in rows],
+    }, etag)
+
+
+@api_bp.route('/search')
+def search():
+    """Prefix matches for students (roll number, name, section) and subjects (code, name)."""
+    q = request.args.get('q', '')
+    limit = _int_arg('limit', 10, MAX_SEARCH_RESULTS) or 10
+    kind = request.args.get('type')
+    if kind not in (None, '', 'students', 'subjects'):
+        abort(400, description='type must be students or subjects')
+    payload = {'q': q}
+    if kind != 'subjects':
+        payload['students'] = {'fields': STUDENT_FIELDS, 'results': [list(r) for r in search_students(q, limit)]}
+    if kind != 'students':
+        payload['subjects'] = {'fields': SUBJECT_FIELDS, 'results': [list(r) for r in search_subjects(q, limit)]}
+    return jsonify(payload)
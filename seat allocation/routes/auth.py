@@ -1,10 +1,27 @@
 """Authentication routes."""
-from flask import Blueprint, render_template, redirect, url_for, flash, request
-from flask_login import login_user, logout_user, login_required
+from functools import wraps
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, current_app
+from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
 
 auth_bp = Blueprint('auth', __name__)
 
+
+def is_admin(user):
+    """True if user is listed in ADMIN_USER_IDS."""
+    return bool(getattr(user, 'is_authenticated', False)) and user.user_id in current_app.config.get('ADMIN_USER_IDS', [])
+
+
+def admin_required(view):
+    """login_required plus a 403 for users not listed in ADMIN_USER_IDS."""
+    @wraps(view)
+    @login_required
+    def wrapped(*args, **kwargs):
+        if not is_admin(current_user):
+            abort(403)
+        return view(*args, **kwargs)
+    return wrapped
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
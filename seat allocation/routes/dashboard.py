@@ -1,9 +1,10 @@
 """Admin dashboard routes."""
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request
 from flask_login import login_required
 from models import Department, Student, ExamHall, Subject, Exam, ExamSchedule
 from sqlalchemy import func
 from datetime import date
+from utils.search import search_students, search_subjects
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -40,3 +41,10 @@ def index():
         total_halls=total_halls,
         total_subjects=total_subjects,
         upcoming_exams=upcoming_list)
+
+@dashboard_bp.route('/search')
+@login_required
+def search():
+    q = request.args.get('q', '').strip()
+    return render_template('dashboard/search.html', q=q,
+        students=search_students(q, 50), subjects=search_subjects(q, 20))
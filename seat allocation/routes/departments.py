@@ -17,18 +17,13 @@ def add():
     if request.method == 'POST':
         name = request.form.get('name', '').strip()
         code = request.form.get('code', '').strip().upper()
-        total_students = request.form.get('total_students', 0)
-        try:
-            total_students = int(total_students)
-        except ValueError:
-            total_students = 0
         if not name or not code:
             flash('Name and code are required.', 'danger')
             return render_template('departments/add.html')
         if Department.query.filter_by(code=code).first():
             flash(f'Department with code {code} already exists.', 'danger')
             return render_template('departments/add.html')
-        dept = Department(name=name, code=code, total_students=total_students)
+        dept = Department(name=name, code=code, total_students=0)
         db.session.add(dept)
         db.session.commit()
         flash(f'Department {name} added successfully.', 'success')
@@ -46,10 +41,6 @@ def edit(id):
             flash(f'Department code {code} already in use.', 'danger')
             return render_template('departments/edit.html', department=dept)
         dept.code = code
-        try:
-            dept.total_students = int(request.form.get('total_students', 0))
-        except ValueError:
-            pass
         db.session.commit()
         flash('Department updated successfully.', 'success')
         return redirect(url_for('departments.index'))
@@ -2,8 +2,11 @@
 from datetime import datetime, date, time
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required
+from sqlalchemy import or_
 from models import db, Exam, ExamSchedule, Department, Subject, SeatAllocation
 from utils.excel_parser import parse_schedule_file
+from utils.bulk_writer import bulk_insert
+from utils.allocation_archive import delete_archive
 
 exam_schedule_bp = Blueprint('exam_schedule', __name__)
 
@@ -24,7 +27,8 @@ def _parse_time(val):
 @login_required
 def index():
     exams = Exam.query.order_by(Exam.id.desc()).all()
-    return render_template('exam_schedule/index.html', exams=exams)
+    years = sorted({e.academic_year for e in exams if e.academic_year}, reverse=True)
+    return render_template('exam_schedule/index.html', exams=exams, years=years)
 
 @exam_schedule_bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -93,7 +97,7 @@ def import_schedule():
         db.session.flush()
         dept_map = {d.code.upper(): d.id for d in Department.query.all()}
         subj_map = {s.code.upper(): s.id for s in Subject.query.all()}
-        added = 0
+        rows = []
         first_times_set = False
         for r in records:
             dept_id = dept_map.get(r['department_code'])
@@ -104,11 +108,10 @@ def import_schedule():
                 exam.default_start_time = r['start_time']
                 exam.default_end_time = r['end_time']
                 first_times_set = True
-            s = ExamSchedule(exam_id=exam.id, department_id=dept_id, subject_id=subj_id,
-                exam_date=r['exam_date'], start_time=r['start_time'], end_time=r['end_time'],
-                academic_year=year)
-            db.session.add(s)
-            added += 1
+            rows.append({'exam_id': exam.id, 'department_id': dept_id, 'subject_id': subj_id,
+                'exam_date': r['exam_date'], 'start_time': r['start_time'], 'end_time': r['end_time'],
+                'academic_year': year})
+        added = bulk_insert(ExamSchedule, rows)
         db.session.commit()
         flash(f'Imported {added} schedule entries for "{exam_name}".', 'success')
         return redirect(url_for('exam_schedule.detail', exam_id=exam.id))
@@ -139,19 +142,35 @@ def clear_entries(exam_id):
     SeatAllocation.query.filter_by(exam_id=exam_id).delete()
     ExamSchedule.query.filter_by(exam_id=exam_id).delete()
     db.session.commit()
+    delete_archive(exam_id)
     flash('All schedule entries and allocations for this exam have been cleared. You can add new entries or re-import.', 'warning')
     return redirect(url_for('exam_schedule.detail', exam_id=exam_id))
 
 @exam_schedule_bp.route('/delete-all', methods=['POST'])
 @login_required
 def delete_all():
-    exam_id = request.form.get('exam_id')
-    if exam_id:
-        SeatAllocation.query.filter_by(exam_id=exam_id).delete()
-        ExamSchedule.query.filter_by(exam_id=exam_id).delete()
-        Exam.query.filter_by(id=exam_id).delete()
+    """Delete the posted exams (exam_id, repeatable) and/or every exam of an academic_year."""
+    exam_ids = [int(x) for x in request.form.getlist('exam_id') if x.isdigit()]
+    year = request.form.get('academic_year', '').strip()
+    criteria = []
+    if exam_ids:
+        criteria.append(Exam.id.in_(exam_ids))
+    if year:
+        criteria.append(Exam.academic_year == year)
+    if criteria:
+        # One transaction, one DELETE per table whatever the number of exams.
+        selected = db.select(Exam.id).where(or_(*criteria)).scalar_subquery()
+        deleted_ids = [exam_id for (exam_id,) in db.session.execute(db.select(Exam.id).where(or_(*criteria)))]
+        SeatAllocation.query.filter(SeatAllocation.exam_id.in_(selected)).delete(synchronize_session=False)
+        ExamSchedule.query.filter(ExamSchedule.exam_id.in_(selected)).delete(synchronize_session=False)
+        count = Exam.query.filter(or_(*criteria)).delete(synchronize_session=False)
         db.session.commit()
-        flash('Exam and all its schedules have been deleted.', 'warning')
+        for exam_id in deleted_ids:
+            delete_archive(exam_id)
+        if year and not exam_ids:
+            flash(f'Deleted {count} exam(s) of {year} with all their schedules and allocations.', 'warning')
+        else:
+            flash('Exam and all its schedules have been deleted.', 'warning')
     return redirect(url_for('exam_schedule.index'))
 
 @exam_schedule_bp.route('/add-entry/<int:exam_id>', methods=['POST'])
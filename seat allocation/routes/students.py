@@ -1,36 +1,101 @@
 """Student management routes."""
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required
+from sqlalchemy import func, tuple_
+
 from models import db, Student, Department, SeatAllocation
 from utils.excel_parser import parse_students_file
+from utils.bulk_writer import bulk_insert
 
 students_bp = Blueprint('students', __name__)
 
-@students_bp.route('/')
-@login_required
-def index():
-    dept_id = request.args.get('department')
-    year_filter = request.args.get('academic_year', '')
-    section_filter = request.args.get('section', '')
-    query = Student.query
+PAGE_SIZES = (50, 100, 200, 500)
+DEFAULT_PAGE_SIZE = 100
+# Counts stop here; larger result sets show as "10000+".
+COUNT_LIMIT = 10000
+# Keyset order of the listing (ix_students_dept_roll).
+LIST_ORDER = (Student.department_id, Student.roll_number, Student.id)
+
+
+def _filter_students(query, dept_id, year_filter, section_filter):
     if dept_id:
         query = query.filter(Student.department_id == dept_id)
     if year_filter:
         query = query.filter(Student.academic_year == year_filter)
     if section_filter:
         query = query.filter(Student.section == section_filter)
-    students = query.order_by(Student.roll_number).all()
+    return query
+
+
+def _page_cursor(student):
+    """Opaque-enough position of a row in LIST_ORDER: "<department_id>.<id>.<roll_number>"."""
+    return f'{student.department_id}.{student.id}.{student.roll_number}'
+
+
+def _parse_cursor(value):
+    """(department_id, roll_number, id) from _page_cursor, or None if missing or malformed."""
+    if not value:
+        return None
+    parts = value.split('.', 2)
+    if len(parts) != 3 or not parts[0].isdigit() or not parts[1].isdigit():
+        return None
+    return int(parts[0]), parts[2], int(parts[1])
+
+
+def _capped_count(query):
+    """Number of rows in query, counting at most COUNT_LIMIT + 1 of them."""
+    capped = query.with_entities(Student.id).order_by(None).limit(COUNT_LIMIT + 1).subquery()
+    return db.session.query(func.count()).select_from(capped).scalar()
+
+
+@students_bp.route('/')
+@login_required
+def index():
+    dept_id = request.args.get('department')
+    year_filter = request.args.get('academic_year', '')
+    section_filter = request.args.get('section', '')
+    per_page = request.args.get('per_page', DEFAULT_PAGE_SIZE, type=int)
+    if per_page not in PAGE_SIZES:
+        per_page = DEFAULT_PAGE_SIZE
+    after = _parse_cursor(request.args.get('after'))
+    before = None if after else _parse_cursor(request.args.get('before'))
+
+    query = _filter_students(Student.query, dept_id, year_filter, section_filter)
+    page = query
+    if after:
+        page = page.filter(tuple_(*LIST_ORDER) > after).order_by(*LIST_ORDER)
+    elif before:
+        page = page.filter(tuple_(*LIST_ORDER) < before).order_by(*(c.desc() for c in LIST_ORDER))
+    else:
+        page = page.order_by(*LIST_ORDER)
+    students = page.limit(per_page + 1).all()
+    more = len(students) > per_page
+    students = students[:per_page]
+    if before:
+        students.reverse()
+    # Going backwards, "more" means there is an earlier page; a later one exists since we came from it.
+    has_next = bool(students) and (more if not before else True)
+    has_prev = bool(students) and (more if before else bool(after))
+
     departments = Department.query.order_by(Department.code).all()
     years = db.session.query(Student.academic_year).distinct().all()
     years = [y[0] for y in years if y[0]]
     sections = db.session.query(Student.section).distinct().filter(Student.section.isnot(None), Student.section != '').all()
     sections = [s[0] for s in sections if s[0]]
-    filtered_count = len(students)
+    filtered_count = _capped_count(query)
     filters_applied = bool(dept_id or year_filter or section_filter)
+    params = {k: v for k, v in (('department', dept_id), ('academic_year', year_filter),
+                                ('section', section_filter)) if v}
+    if per_page != DEFAULT_PAGE_SIZE:
+        params['per_page'] = per_page
+    next_url = url_for('students.index', after=_page_cursor(students[-1]), **params) if has_next else None
+    prev_url = url_for('students.index', before=_page_cursor(students[0]), **params) if has_prev else None
     return render_template('students/index.html',
         students=students, departments=departments, years=years, sections=sections,
         selected_dept=dept_id, selected_year=year_filter, selected_section=section_filter,
-        filtered_count=filtered_count, filters_applied=filters_applied)
+        filtered_count=filtered_count, count_capped=filtered_count > COUNT_LIMIT, count_limit=COUNT_LIMIT,
+        filters_applied=filters_applied, per_page=per_page, page_sizes=PAGE_SIZES,
+        next_url=next_url, prev_url=prev_url, first_url=url_for('students.index', **params) if has_prev else None)
 
 @students_bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -54,7 +119,6 @@ def add():
             return render_template('students/add.html', departments=departments)
         s = Student(roll_number=roll, name=name, department_id=dept_id, section=section, academic_year=year)
         db.session.add(s)
-        dept.total_students = Student.query.filter_by(department_id=dept_id).count() + 1
         db.session.commit()
         flash('Student added successfully.', 'success')
         return redirect(url_for('students.index'))
@@ -82,19 +146,18 @@ def import_students():
         except ValueError as e:
             flash(str(e), 'danger')
             return render_template('students/import.html', departments=departments)
-        added = 0
+        # One query for existing rolls instead of one lookup per imported row
+        seen = {roll for (roll,) in db.session.query(Student.roll_number).filter_by(department_id=dept.id)}
+        rows = []
         skipped = 0
         for r in records:
-            if Student.query.filter_by(roll_number=r['roll_number'], department_id=dept_id).first():
+            if r['roll_number'] in seen:
                 skipped += 1
                 continue
-            row_section = r.get('section') or section
-            s = Student(roll_number=r['roll_number'], name=r['name'],
-                department_id=dept_id, section=row_section, academic_year=year)
-            db.session.add(s)
-            added += 1
-        db.session.commit()
-        dept.total_students = Student.query.filter_by(department_id=dept_id).count()
+            seen.add(r['roll_number'])
+            rows.append({'roll_number': r['roll_number'], 'name': r['name'],
+                'department_id': dept.id, 'section': r.get('section') or section, 'academic_year': year})
+        added = bulk_insert(Student, rows)
         db.session.commit()
         flash(f'Imported {added} students. Skipped {skipped} duplicates.', 'success')
         return redirect(url_for('students.index'))
@@ -106,24 +169,15 @@ def delete_filtered():
     dept_id = request.form.get('department')
     year_filter = request.form.get('academic_year', '')
     section_filter = request.form.get('section', '')
-    query = Student.query
-    if dept_id:
-        query = query.filter(Student.department_id == dept_id)
-    if year_filter:
-        query = query.filter(Student.academic_year == year_filter)
-    if section_filter:
-        query = query.filter(Student.section == section_filter)
-    to_delete = query.all()
-    count = len(to_delete)
+    query = _filter_students(Student.query, dept_id, year_filter, section_filter)
+    count = query.count()
     if count == 0:
         flash('No students match the current filters.', 'info')
         return redirect(url_for('students.index'))
-    student_ids = [s.id for s in to_delete]
-    SeatAllocation.query.filter(SeatAllocation.student_id.in_(student_ids)).delete(synchronize_session=False)
-    for s in to_delete:
-        db.session.delete(s)
-    for dept in Department.query.all():
-        dept.total_students = Student.query.filter_by(department_id=dept.id).count()
+    # Set-based: one DELETE per table, one commit.
+    selected = query.with_entities(Student.id).scalar_subquery()
+    SeatAllocation.query.filter(SeatAllocation.student_id.in_(selected)).delete(synchronize_session=False)
+    query.delete(synchronize_session=False)
     db.session.commit()
     flash(f'Deleted {count} student(s) matching the applied filters.', 'warning')
     params = {}
@@ -144,8 +198,6 @@ def delete_all():
         return redirect(url_for('students.index'))
     SeatAllocation.query.delete()
     Student.query.delete()
-    for dept in Department.query.all():
-        dept.total_students = 0
     db.session.commit()
     flash(f'All {count} students have been deleted.', 'warning')
     return redirect(url_for('students.index'))
@@ -154,12 +206,8 @@ def delete_all():
 @login_required
 def delete(id):
     s = Student.query.get_or_404(id)
-    dept_id = s.department_id
     SeatAllocation.query.filter_by(student_id=id).delete()
     db.session.delete(s)
-    dept = Department.query.get(dept_id)
-    if dept:
-        dept.total_students = Student.query.filter_by(department_id=dept_id).count() - 1
     db.session.commit()
     flash('Student deleted.', 'success')
     return redirect(url_for('students.index'))
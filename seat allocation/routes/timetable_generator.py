@@ -1,28 +1,81 @@
-"""Exam Timetable Generator: generate conflict-free timetable, then feed to scheduling."""
-from datetime import datetime, date, time
+"""Exam Timetable Generator: generate conflict-free timetable, then feed to scheduling.
+
+Work in progress (uploaded rows, generated schedule) lives in a server-side TimetableDraft;
+the cookie session only carries the draft id.
+"""
+import json
+import uuid
+from datetime import datetime, date, time, timedelta
 from io import BytesIO
-from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, session
-from flask_login import login_required
-from models import db, Exam, ExamSchedule, Department, Subject
+from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, session, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import func
+from models import db, Exam, ExamSchedule, Department, Subject, Student, ExamHall, TimetableDraft, exam_session
 from utils.excel_parser import parse_timetable_subjects_file
-from utils.timetable_generator import generate_timetable, subject_counts_per_department
-from utils.pdf_generator import create_master_timetable_pdf
-import pandas as pd
+from utils.timetable_generator import generate_timetable, subject_counts_per_department, dates_over_capacity
+from utils.bulk_writer import bulk_insert
 
 timetable_bp = Blueprint('timetable_generator', __name__)
 
-SESSION_KEYS = {
-    'rows': 'timetable_rows',
-    'exam_name': 'timetable_exam_name',
-    'academic_year': 'timetable_academic_year',
-    'start_date': 'timetable_start_date',
-    'time_str': 'timetable_time_str',
-    'excluded': 'timetable_excluded',
-    'schedule': 'timetable_schedule',
-    'subject_names': 'timetable_subject_names',
+DRAFT_SESSION_KEY = 'timetable_draft_id'
+# Fields of the TimetableDraft payload.
+DRAFT_KEYS = {
+    'rows': 'rows',
+    'exam_name': 'exam_name',
+    'academic_year': 'academic_year',
+    'start_date': 'start_date',
+    'time_str': 'time_str',
+    'excluded': 'excluded',
+    'schedule': 'schedule',
+    'subject_names': 'subject_names',
+    'counts': 'counts',
+    'session_times': 'session_times',
 }
 
 
+def _draft_record():
+    """The current user's TimetableDraft named in the session, or None."""
+    draft_id = session.get(DRAFT_SESSION_KEY)
+    if not draft_id:
+        return None
+    record = TimetableDraft.query.get(draft_id)
+    if record is None or record.user_id != current_user.id:
+        return None
+    return record
+
+
+def _load_draft():
+    """Payload dict of the current draft ({} if there is none)."""
+    record = _draft_record()
+    if record is None:
+        return {}
+    # Drafts saved before the payload used plain field names carry a 'timetable_' prefix.
+    return {k.removeprefix('timetable_'): v for k, v in json.loads(record.payload).items()}
+
+
+def _save_draft(draft):
+    """Store draft server-side, creating the row (and purging expired ones) if needed."""
+    record = _draft_record()
+    now = datetime.utcnow()
+    if record is None:
+        ttl = current_app.config.get('TIMETABLE_DRAFT_TTL_HOURS', 72)
+        TimetableDraft.query.filter(TimetableDraft.updated_at < now - timedelta(hours=ttl)).delete()
+        record = TimetableDraft(id=uuid.uuid4().hex, user_id=current_user.id, created_at=now)
+        db.session.add(record)
+    record.payload = json.dumps(draft)
+    record.updated_at = now
+    db.session.commit()
+    session[DRAFT_SESSION_KEY] = record.id
+
+
+def _discard_draft():
+    record = _draft_record()
+    if record is not None:
+        db.session.delete(record)
+        db.session.commit()
+    session.pop(DRAFT_SESSION_KEY, None)
+
+
 def _normalize_academic_year(year_str):
     """Normalize academic year to match Student.academic_year format (e.g. 2024-25)."""
     if not year_str or not isinstance(year_str, str):
@@ -56,6 +109,28 @@ def _parse_time_for_display(t_str):
     return None, s
 
 
+def _end_time(start):
+    """Exams are assumed to last 3 hours."""
+    return time((start.hour + 3) % 24, start.minute)
+
+
+def _entry_session(item):
+    """Session label of a stored schedule entry (date_iso, dept, code, name[, session])."""
+    return item[4] if len(item) > 4 else None
+
+
+def _capacity_inputs(academic_year):
+    """({dept_code: students in academic_year}, total exam hall seats), two aggregate queries."""
+    year = _normalize_academic_year(academic_year)
+    sizes = dict(db.session.query(Department.code, func.count(Student.id))
+                 .join(Student, Student.department_id == Department.id)
+                 .filter(Student.academic_year == year)
+                 .group_by(Department.code).all())
+    default_cap = current_app.config.get('DEFAULT_HALL_CAPACITY', 45)
+    capacity = db.session.query(func.sum(func.coalesce(ExamHall.capacity, default_cap))).scalar() or 0
+    return {k.upper(): v for k, v in sizes.items()}, int(capacity)
+
+
 @timetable_bp.route('/')
 @login_required
 def index():
@@ -66,7 +141,7 @@ def index():
 @timetable_bp.route('/import', methods=['POST'])
 @login_required
 def import_file():
-    """Parse uploaded Excel and store in session; redirect to generate form."""
+    """Parse uploaded Excel and store it as a new draft; redirect to generate form."""
     exam_name = (request.form.get('exam_name') or '').strip()
     academic_year = (request.form.get('academic_year') or '').strip() or '2024-2025'
     file = request.files.get('file')
@@ -90,10 +165,14 @@ def import_file():
         flash('No valid rows found. Ensure columns: department_code, subject_code.', 'danger')
         return redirect(url_for('timetable_generator.index'))
     counts = subject_counts_per_department(rows)
-    session[SESSION_KEYS['rows']] = rows
-    session[SESSION_KEYS['exam_name']] = exam_name
-    session[SESSION_KEYS['academic_year']] = academic_year
-    session['timetable_counts'] = counts
+    # A new upload starts a new draft; any earlier one for this browser is dropped.
+    _discard_draft()
+    _save_draft({
+        DRAFT_KEYS['rows']: rows,
+        DRAFT_KEYS['exam_name']: exam_name,
+        DRAFT_KEYS['academic_year']: academic_year,
+        DRAFT_KEYS['counts']: counts,
+    })
     return redirect(url_for('timetable_generator.generate_form'))
 
 
@@ -101,27 +180,40 @@ def import_file():
 @login_required
 def generate_form():
     """Step 2: Start date, timing, excluded dates; then run generator."""
+    draft = _load_draft()
     if request.method == 'GET':
-        rows = session.get(SESSION_KEYS['rows'])
+        rows = draft.get(DRAFT_KEYS['rows'])
         if not rows:
             flash('Please upload an Excel file first.', 'warning')
             return redirect(url_for('timetable_generator.index'))
-        counts = session.get('timetable_counts', subject_counts_per_department(rows))
+        counts = draft.get(DRAFT_KEYS['counts']) or subject_counts_per_department(rows)
+        academic_year = draft.get(DRAFT_KEYS['academic_year'], '2024-2025')
+        dept_sizes, capacity = _capacity_inputs(academic_year)
         return render_template('timetable_generator/generate.html',
-            exam_name=session.get(SESSION_KEYS['exam_name'], ''),
-            academic_year=session.get(SESSION_KEYS['academic_year'], '2024-2025'),
-            counts=counts)
+            exam_name=draft.get(DRAFT_KEYS['exam_name'], ''),
+            academic_year=academic_year,
+            counts=counts,
+            dept_sizes=dept_sizes,
+            capacity=capacity)
 
     # POST: run generator
-    rows = session.get(SESSION_KEYS['rows'])
+    rows = draft.get(DRAFT_KEYS['rows'])
     if not rows:
         flash('Session expired. Please upload the file again.', 'danger')
         return redirect(url_for('timetable_generator.index'))
 
     start_date_str = (request.form.get('start_date') or '').strip()
     time_str = (request.form.get('exam_time') or '').strip()
+    fn_time_str = (request.form.get('fn_time') or '').strip()
     excluded_raw = request.form.getlist('excluded_date')
     excluded = [x.strip() for x in excluded_raw if x.strip()]
+    solver = request.form.get('solver') or 'dsatur'
+    dept_sizes, capacity = None, None
+    if request.form.get('respect_capacity'):
+        dept_sizes, capacity = _capacity_inputs(draft.get(DRAFT_KEYS['academic_year'], '2024-2025'))
+        if not dept_sizes or not capacity:
+            flash('No students or exam halls found for this academic year; hall capacity was not applied.', 'warning')
+            dept_sizes, capacity = None, None
 
     if not start_date_str:
         flash('Starting date (dd/mm/yyyy) is required.', 'danger')
@@ -130,30 +222,50 @@ def generate_form():
         flash('Exam timing (HH:mm) is required.', 'danger')
         return redirect(url_for('timetable_generator.generate_form'))
 
+    # One session per day labelled by its start time, or FN + AN when a forenoon time is given.
+    time_obj, time_str = _parse_time_for_display(time_str)
+    if fn_time_str:
+        fn_obj, fn_time_str = _parse_time_for_display(fn_time_str)
+        if not fn_obj or not time_obj or exam_session(fn_obj) != 'FN' or exam_session(time_obj) != 'AN':
+            flash('For two sessions per day the forenoon timing must be before 12:00 and the exam timing after.', 'danger')
+            return redirect(url_for('timetable_generator.generate_form'))
+        session_times = {'FN': fn_time_str, 'AN': time_str}
+    else:
+        session_times = {exam_session(time_obj) if time_obj else 'AN': time_str}
+
     try:
-        schedule, _ = generate_timetable(rows, start_date_str, excluded)
+        schedule, _ = generate_timetable(rows, start_date_str, excluded, solver=solver,
+                                         dept_sizes=dept_sizes, capacity=capacity,
+                                         sessions=tuple(session_times))
     except ValueError as e:
         flash(str(e), 'danger')
         return redirect(url_for('timetable_generator.generate_form'))
+    over = dates_over_capacity(schedule, dept_sizes, capacity)
+    if over:
+        flash('These sessions seat more students than the ' + str(capacity) + ' available seats '
+              '(a single department exceeds hall capacity): '
+              + ', '.join(f"{d.strftime('%d.%m.%Y')} {sess} ({n})" for d, sess, n in over), 'warning')
 
     # Resolve subject names from DB
     subj_codes = list({s[2] for s in schedule})
     subjects = Subject.query.filter(Subject.code.in_(subj_codes)).all()
     subject_names = {s.code: s.name for s in subjects}
 
-    # Store schedule as list of (date_iso, dept, code, name) for PDF/Excel (ISO string for session serialization)
+    # Store schedule as list of (date_iso, dept, code, name, session) for PDF/Excel (ISO string for JSON)
     schedule_with_names = []
-    for d, dept, code in schedule:
+    for d, dept, code, exam_sess in schedule:
         name = subject_names.get(code, '')
         date_iso = d.isoformat() if hasattr(d, 'isoformat') else str(d)
-        schedule_with_names.append((date_iso, dept, code, name))
-
-    session[SESSION_KEYS['schedule']] = schedule_with_names
-    session[SESSION_KEYS['exam_name']] = session.get(SESSION_KEYS['exam_name'], '')
-    session[SESSION_KEYS['academic_year']] = session.get(SESSION_KEYS['academic_year'], '2024-2025')
-    session[SESSION_KEYS['start_date']] = start_date_str
-    session[SESSION_KEYS['time_str']] = time_str
-    session[SESSION_KEYS['subject_names']] = subject_names
+        schedule_with_names.append((date_iso, dept, code, name, exam_sess))
+
+    draft[DRAFT_KEYS['schedule']] = schedule_with_names
+    draft[DRAFT_KEYS['exam_name']] = draft.get(DRAFT_KEYS['exam_name'], '')
+    draft[DRAFT_KEYS['academic_year']] = draft.get(DRAFT_KEYS['academic_year'], '2024-2025')
+    draft[DRAFT_KEYS['start_date']] = start_date_str
+    draft[DRAFT_KEYS['time_str']] = time_str
+    draft[DRAFT_KEYS['session_times']] = session_times
+    draft[DRAFT_KEYS['subject_names']] = subject_names
+    _save_draft(draft)
     return redirect(url_for('timetable_generator.result'))
 
 
@@ -161,19 +273,23 @@ def generate_form():
 @login_required
 def result():
     """Step 3: Show generated timetable and buttons (Excel, PDF, Make Scheduling)."""
-    schedule = session.get(SESSION_KEYS['schedule'])
+    draft = _load_draft()
+    schedule = draft.get(DRAFT_KEYS['schedule'])
     if not schedule:
-        flash('No generated timetable in session. Please generate again.', 'warning')
+        flash('No generated timetable found. Please generate again.', 'warning')
         return redirect(url_for('timetable_generator.index'))
-    exam_name = session.get(SESSION_KEYS['exam_name'], '')
-    academic_year = session.get(SESSION_KEYS['academic_year'], '')
-    time_str = session.get(SESSION_KEYS['time_str'], '')
-    schedule_display = [( _format_date_for_display(d), dept, code, name) for d, dept, code, name in schedule]
+    exam_name = draft.get(DRAFT_KEYS['exam_name'], '')
+    academic_year = draft.get(DRAFT_KEYS['academic_year'], '')
+    session_times = draft.get(DRAFT_KEYS['session_times']) or {}
+    time_str = ', '.join(f'{k} {v}' for k, v in session_times.items()) or draft.get(DRAFT_KEYS['time_str'], '')
+    schedule_display = [(_format_date_for_display(item[0]), item[1], item[2], item[3], _entry_session(item))
+                        for item in schedule]
     return render_template('timetable_generator/result.html',
         schedule=schedule_display,
         exam_name=exam_name,
         academic_year=academic_year,
-        time_str=time_str)
+        time_str=time_str,
+        show_sessions=len(session_times) > 1)
 
 
 def _format_date_for_display(d):
@@ -206,18 +322,18 @@ def _normalize_date(d):
     return d
 
 
-def _schedule_to_excel_bytes():
-    """Build Excel (BytesIO) from session schedule."""
-    schedule = session.get(SESSION_KEYS['schedule'], [])
+def _schedule_to_excel_bytes(schedule):
+    """Build Excel (BytesIO) from the draft's schedule."""
     if not schedule:
         return None
-    date_set = set()
+    # One column per (date, session); the session is only shown when a day has several.
+    slot_set = set()
     for s in schedule:
-        d = _normalize_date(s[0])
-        date_set.add(d)
-    dates = sorted([x for x in date_set if hasattr(x, 'year')], key=lambda x: x)
-    if not dates and date_set:
-        dates = sorted(date_set, key=str)
+        slot_set.add((_normalize_date(s[0]), _entry_session(s) or ''))
+    dates = sorted([x for x in slot_set if hasattr(x[0], 'year')])
+    if not dates and slot_set:
+        dates = sorted(slot_set, key=str)
+    multi_session = len({sess for _, sess in slot_set}) > 1
     depts = []
     seen = set()
     for s in schedule:
@@ -228,15 +344,17 @@ def _schedule_to_excel_bytes():
     for s in schedule:
         d_raw, dept, code = s[0], s[1], s[2]
         name = s[3] if len(s) > 3 else ''
-        d_norm = _normalize_date(d_raw)
+        d_norm = (_normalize_date(d_raw), _entry_session(s) or '')
         grid[(dept, d_norm)] = f"{code} - {name}" if name else code
     rows = []
-    rows.append(['DEPT'] + [_format_date_for_display(d) for d in dates])
+    rows.append(['DEPT'] + [f"{_format_date_for_display(d)} {sess}" if multi_session else _format_date_for_display(d)
+                            for d, sess in dates])
     for dept in depts:
         row = [dept]
         for d in dates:
             row.append(grid.get((dept, d), '-'))
         rows.append(row)
+    import pandas as pd
     df = pd.DataFrame(rows[1:], columns=rows[0])
     buf = BytesIO()
     df.to_excel(buf, index=False, engine='openpyxl')
@@ -247,14 +365,15 @@ def _schedule_to_excel_bytes():
 @timetable_bp.route('/download-excel')
 @login_required
 def download_excel():
-    schedule = session.get(SESSION_KEYS['schedule'])
+    draft = _load_draft()
+    schedule = draft.get(DRAFT_KEYS['schedule'])
     if not schedule:
         flash('No timetable to download.', 'warning')
         return redirect(url_for('timetable_generator.index'))
-    buf = _schedule_to_excel_bytes()
+    buf = _schedule_to_excel_bytes(schedule)
     if not buf:
         return redirect(url_for('timetable_generator.result'))
-    exam_name = session.get(SESSION_KEYS['exam_name'], 'timetable').replace(' ', '_')
+    exam_name = draft.get(DRAFT_KEYS['exam_name'], 'timetable').replace(' ', '_')
     return send_file(buf, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
         as_attachment=True, download_name=f'master_timetable_{exam_name}.xlsx')
 
@@ -262,14 +381,17 @@ def download_excel():
 @timetable_bp.route('/download-pdf')
 @login_required
 def download_pdf():
-    schedule = session.get(SESSION_KEYS['schedule'])
+    draft = _load_draft()
+    schedule = draft.get(DRAFT_KEYS['schedule'])
     if not schedule:
         flash('No timetable to download.', 'warning')
         return redirect(url_for('timetable_generator.index'))
-    exam_name = session.get(SESSION_KEYS['exam_name'], '')
-    academic_year = session.get(SESSION_KEYS['academic_year'], '')
-    time_str = session.get(SESSION_KEYS['time_str'], '')
-    buf = create_master_timetable_pdf(schedule, exam_name, academic_year, time_str)
+    exam_name = draft.get(DRAFT_KEYS['exam_name'], '')
+    academic_year = draft.get(DRAFT_KEYS['academic_year'], '')
+    time_str = draft.get(DRAFT_KEYS['time_str'], '')
+    from utils.pdf_generator import create_master_timetable_pdf
+    buf = create_master_timetable_pdf(schedule, exam_name, academic_year, time_str,
+                                      session_times=draft.get(DRAFT_KEYS['session_times']))
     return send_file(buf, mimetype='application/pdf', as_attachment=True,
         download_name=f'master_timetable_{exam_name.replace(" ", "_")}.pdf')
 
@@ -278,24 +400,25 @@ def download_pdf():
 @login_required
 def make_scheduling():
     """Create Exam + ExamSchedule from generated timetable; redirect to exam schedule detail."""
-    schedule = session.get(SESSION_KEYS['schedule'])
+    draft = _load_draft()
+    schedule = draft.get(DRAFT_KEYS['schedule'])
     if not schedule:
-        flash('No generated timetable in session. Please generate again.', 'danger')
+        flash('No generated timetable found. Please generate again.', 'danger')
         return redirect(url_for('timetable_generator.index'))
 
-    exam_name = session.get(SESSION_KEYS['exam_name'], 'Generated Exam')
-    academic_year = _normalize_academic_year(session.get(SESSION_KEYS['academic_year'], '2024-2025'))
-    time_str = session.get(SESSION_KEYS['time_str'], '13:15')
+    exam_name = draft.get(DRAFT_KEYS['exam_name'], 'Generated Exam')
+    academic_year = _normalize_academic_year(draft.get(DRAFT_KEYS['academic_year'], '2024-2025'))
+    time_str = draft.get(DRAFT_KEYS['time_str'], '13:15')
     time_obj, _ = _parse_time_for_display(time_str)
     if not time_obj:
         time_obj = time(13, 15)
-    # Assume 3 hours duration
-    from datetime import timedelta
-    end_h = time_obj.hour + 3
-    end_m = time_obj.minute
-    if end_h >= 24:
-        end_h -= 24
-    end_time = time(end_h, end_m)
+    end_time = _end_time(time_obj)
+    # Start time per session (FN/AN); entries without a known session use the exam timing.
+    session_starts = {}
+    for label, t_str in (draft.get(DRAFT_KEYS['session_times']) or {}).items():
+        t_obj, _ = _parse_time_for_display(t_str)
+        if t_obj:
+            session_starts[label] = t_obj
 
     dept_map = {d.code.upper(): d.id for d in Department.query.all()}
     subj_map = {s.code.upper(): s.id for s in Subject.query.all()}
@@ -303,7 +426,7 @@ def make_scheduling():
     exam = Exam(name=exam_name, academic_year=academic_year, default_start_time=time_obj, default_end_time=end_time)
     db.session.add(exam)
     db.session.flush()
-    added = 0
+    rows = []
     for item in schedule:
         d, dept_code, subj_code = item[0], item[1], item[2]
         dept_id = dept_map.get(dept_code)
@@ -313,12 +436,11 @@ def make_scheduling():
         exam_date = _normalize_date(d)
         if not hasattr(exam_date, 'year'):
             continue
-        es = ExamSchedule(exam_id=exam.id, department_id=dept_id, subject_id=subj_id,
-            exam_date=exam_date, start_time=time_obj, end_time=end_time, academic_year=academic_year)
-        db.session.add(es)
-        added += 1
+        start = session_starts.get(_entry_session(item), time_obj)
+        rows.append({'exam_id': exam.id, 'department_id': dept_id, 'subject_id': subj_id,
+            'exam_date': exam_date, 'start_time': start, 'end_time': _end_time(start), 'academic_year': academic_year})
+    added = bulk_insert(ExamSchedule, rows)
     db.session.commit()
-    session.pop(SESSION_KEYS['schedule'], None)
-    session.pop(SESSION_KEYS['rows'], None)
+    _discard_draft()
     flash(f'Timetable transferred to Exam Schedule. Created exam "{exam_name}" with {added} schedule entries.', 'success')
     return redirect(url_for('exam_schedule.detail', exam_id=exam.id))
@@ -0,0 +1,258 @@
+"""Columnar archive of finished exams' seat allocations.
+
+archive_exam moves every SeatAllocation row of an exam into ARCHIVE_DIR/exam_<id>.npz
+(numpy.savez_compressed) and deletes the rows, so seat_allocations only holds current
+exams. The file is self-contained: besides the seat columns it stores the halls,
+students, departments and subjects the seats refer to, so it still renders after those
+rows are edited or deleted.
+
+Layout: one row per seat, ordered as stored (by SeatAllocation id), as parallel arrays
+
+    date (int32 ordinal)  session (int8, -1 = whole day)  bench (int16)  position (int8)
+    hall / student / department / subject (int32 index into the lookup tables below)
+
+plus lookup tables hall_id, hall_number, hall_building, hall_floor, hall_capacity,
+student_id, student_roll, student_name, department_id, department_code,
+department_name, subject_id, subject_code, subject_name, and a JSON "meta" string (exam
+id, name, created_at, archived_at, row count). Strings are fixed-width unicode arrays,
+so the file loads without pickle.
+
+archived_hall_info rebuilds the same hall_info the view and PDF generators use from
+stored rows. Archiving an exam again (new rows stored after an earlier archive) merges
+them: the new rows replace the archived ones of the same date and session.
+"""
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+from types import SimpleNamespace
+
+from flask import current_app
+from sqlalchemy import func
+
+from models import db, Exam, ExamSchedule, ExamHall, Student, Department, Subject, SeatAllocation, EXAM_SESSIONS
+
+ARCHIVE_VERSION = 1
+
+# lookup table -> its columns, in the order of the tuples in a decoded row
+_TABLES = {
+    'hall': ('id', 'number', 'building', 'floor', 'capacity'),
+    'student': ('id', 'roll', 'name'),
+    'department': ('id', 'code', 'name'),
+    'subject': ('id', 'code', 'name'),
+}
+
+
+def archive_path(exam_id):
+    return Path(current_app.config['ARCHIVE_DIR']) / f'exam_{exam_id}.npz'
+
+
+def _exam_stamp(exam):
+    """Identifies the exam row, so an archive is not shown for a later exam reusing the id."""
+    return exam.created_at.isoformat() if exam.created_at else None
+
+
+def _stored_rows(exam_id):
+    """Denormalised seat rows of an exam from the database, in SeatAllocation id order:
+    (date, session, hall, bench, position, student, department, subject) with the last
+    four as tuples in _TABLES column order."""
+    query = db.session.query(
+        SeatAllocation.exam_date, SeatAllocation.session, SeatAllocation.bench_number, SeatAllocation.position,
+        ExamHall.id, ExamHall.hall_number, ExamHall.building_name, ExamHall.floor, ExamHall.capacity,
+        Student.id, Student.roll_number, Student.name,
+        Department.id, Department.code, Department.name,
+        Subject.id, Subject.code, Subject.name,
+    ).join(ExamHall, ExamHall.id == SeatAllocation.hall_id
+    ).join(Student, Student.id == SeatAllocation.student_id
+    ).join(Department, Department.id == SeatAllocation.department_id
+    ).join(Subject, Subject.id == SeatAllocation.subject_id
+    ).filter(SeatAllocation.exam_id == exam_id).order_by(SeatAllocation.id)
+    for r in query.yield_per(5000):
+        yield (r[0], r[1], (r[4], r[5], r[6] or '', r[7] or '', r[8] or 0), r[2], r[3],
+               (r[9], r[10], r[11]), (r[12], r[13], r[14]), (r[15], r[16], r[17]))
+
+
+def _encode(rows):
+    """npz member arrays for decoded rows."""
+    import numpy as np
+
+    tables = {name: {} for name in _TABLES}
+    cols = {k: [] for k in ('date', 'session', 'bench', 'position', 'hall', 'student', 'department', 'subject')}
+    for d, session, hall, bench, pos, student, dept, subj in rows:
+        cols['date'].append(d.toordinal())
+        cols['session'].append(EXAM_SESSIONS.index(session) if session in EXAM_SESSIONS else -1)
+        cols['bench'].append(bench)
+        cols['position'].append(pos)
+        for name, value in (('hall', hall), ('student', student), ('department', dept), ('subject', subj)):
+            cols[name].append(tables[name].setdefault(value, len(tables[name])))
+    arrays = {
+        'date': np.array(cols['date'], dtype=np.int32),
+        'session': np.array(cols['session'], dtype=np.int8),
+        'bench': np.array(cols['bench'], dtype=np.int16),
+        'position': np.array(cols['position'], dtype=np.int8),
+    }
+    for name, columns in _TABLES.items():
+        arrays[name] = np.array(cols[name], dtype=np.int32)
+        values = list(tables[name])  # insertion order == index
+        for i, column in enumerate(columns):
+            data = [v[i] for v in values]
+            if column in ('id', 'capacity'):
+                arrays[f'{name}_{column}'] = np.array(data, dtype=np.int32)
+            else:
+                arrays[f'{name}_{column}'] = np.array([str(x) for x in data], dtype=str)
+    return arrays
+
+
+def _write(path, arrays, meta):
+    import numpy as np
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.npz.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+@lru_cache(maxsize=8)
+def _load(path, mtime_ns):
+    """(meta, arrays) of an archive file; cached per file version."""
+    import numpy as np
+
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files}
+    meta = json.loads(str(arrays.pop('meta')))
+    return meta, arrays
+
+
+def read_archive(exam_id):
+    """(meta, arrays) for an exam's archive, or None if there is none."""
+    path = archive_path(exam_id)
+    try:
+        return _load(str(path), path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return None
+
+
+def _decode(arrays, mask=None):
+    """Rows (as from _stored_rows) of an archive, optionally only where mask is true."""
+    import numpy as np
+
+    index = np.flatnonzero(mask) if mask is not None else range(len(arrays['date']))
+    lookups = {name: list(zip(*(arrays[f'{name}_{c}'].tolist() for c in columns)))
+               for name, columns in _TABLES.items()}
+    rows = []
+    for i in index:
+        s = int(arrays['session'][i])
+        rows.append((date.fromordinal(int(arrays['date'][i])), EXAM_SESSIONS[s] if s >= 0 else None,
+                     lookups['hall'][arrays['hall'][i]], int(arrays['bench'][i]), int(arrays['position'][i]),
+                     lookups['student'][arrays['student'][i]], lookups['department'][arrays['department'][i]],
+                     lookups['subject'][arrays['subject'][i]]))
+    return rows
+
+
+def _exam_arrays(exam):
+    """Arrays of the exam's archive, or None if it has none (or it belongs to an earlier exam with this id)."""
+    archive = read_archive(exam.id)
+    if archive is None or archive[0].get('exam_created_at') != _exam_stamp(exam):
+        return None
+    return archive[1]
+
+
+def archived_hall_info(exam, exam_date, session=None):
+    """Hall info for one date (and session) of an archived exam, or None if not archived."""
+    from routes.allocation import build_hall_info
+
+    arrays = _exam_arrays(exam)
+    if arrays is None:
+        return None
+    session_code = EXAM_SESSIONS.index(session) if session in EXAM_SESSIONS else -1
+    mask = (arrays['date'] == exam_date.toordinal()) & (arrays['session'] == session_code)
+    if not mask.any():
+        return None
+    rows = _decode(arrays, mask)
+    halls, depts, subjs, allocations = {}, {}, {}, []
+    for _d, _s, hall, bench, pos, student, dept, subj in rows:
+        halls[hall[0]] = SimpleNamespace(id=hall[0], hall_number=hall[1], building_name=hall[2],
+                                         floor=hall[3], capacity=hall[4])
+        depts[dept[0]] = SimpleNamespace(id=dept[0], code=dept[1], name=dept[2])
+        subjs[subj[0]] = SimpleNamespace(id=subj[0], code=subj[1], name=subj[2])
+        allocations.append((hall[0], bench, pos, (student[0], student[1], student[2], dept[0], subj[0])))
+    halls_sorted = sorted(halls.values(), key=lambda h: h.hall_number)
+    return build_hall_info(allocations, halls_sorted, depts=depts, subjs=subjs)
+
+
+def archived_export_rows(exam, exam_date, session=None):
+    """Archived seats of one date in EXPORT_COLUMNS order, sorted like export_rows (every
+    session when session is None), or None if that date is not archived."""
+    arrays = _exam_arrays(exam)
+    if arrays is None:
+        return None
+    mask = arrays['date'] == exam_date.toordinal()
+    if session in EXAM_SESSIONS:
+        mask &= arrays['session'] == EXAM_SESSIONS.index(session)
+    if not mask.any():
+        return None
+    rows = [(hall[1], hall[2], hall[3], s, bench, pos, student[1], student[2], dept[1], subj[1], subj[2])
+            for _d, s, hall, bench, pos, student, dept, subj in _decode(arrays, mask)]
+    rows.sort(key=lambda r: (r[3] or '', r[0], r[4], r[5]))
+    return rows
+
+
+def archived_dates(exam):
+    """[(date, session)] stored in an exam's archive."""
+    arrays = _exam_arrays(exam)
+    if arrays is None:
+        return []
+    pairs = set(zip(arrays['date'].tolist(), arrays['session'].tolist()))
+    return sorted((date.fromordinal(d), EXAM_SESSIONS[s] if s >= 0 else None) for d, s in pairs)
+
+
+def is_archived(exam, exam_date, session=None):
+    """True if the exam's archive holds seats of exam_date (of session, when given)."""
+    return any(d == exam_date and (session is None or s == session) for d, s in archived_dates(exam))
+
+
+def archive_exam(exam):
+    """Move an exam's stored allocation into its archive file; returns the number of rows moved."""
+    rows = list(_stored_rows(exam.id))
+    if not rows:
+        return 0
+    arrays = _exam_arrays(exam)
+    if arrays is not None:
+        replaced = {(d, s) for d, s, *_ in rows}
+        kept = [r for r in _decode(arrays) if (r[0], r[1]) not in replaced]
+        rows = kept + rows
+    path = archive_path(exam.id)
+    meta = {
+        'version': ARCHIVE_VERSION, 'exam_id': exam.id, 'exam_name': exam.name,
+        'exam_created_at': _exam_stamp(exam), 'archived_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': len(rows),
+    }
+    _write(path, _encode(rows), meta)
+    # The file is complete on disk before the rows go.
+    moved = SeatAllocation.query.filter_by(exam_id=exam.id).delete(synchronize_session=False)
+    db.session.commit()
+    return moved
+
+
+def finished_exams(days=0):
+    """Exams with stored allocations whose last scheduled (or allocated) date is more than days ago."""
+    cutoff = date.today() - timedelta(days=days)
+    last_scheduled = dict(db.session.query(ExamSchedule.exam_id, func.max(ExamSchedule.exam_date))
+                          .group_by(ExamSchedule.exam_id).all())
+    last_allocated = db.session.query(SeatAllocation.exam_id, func.max(SeatAllocation.exam_date)
+                                      ).group_by(SeatAllocation.exam_id).all()
+    exam_ids = [exam_id for exam_id, last in last_allocated
+                if max(last, last_scheduled.get(exam_id) or last) < cutoff]
+    return Exam.query.filter(Exam.id.in_(exam_ids)).order_by(Exam.id).all() if exam_ids else []
+
+
+def delete_archive(exam_id):
+    """Remove an exam's archive file (when the exam or its allocations are deleted)."""
+    archive_path(exam_id).unlink(missing_ok=True)
@@ -1,12 +1,66 @@
 """Seat allocation engine - strict two-dept pairing, saturation, and overflow rules."""
 from collections import defaultdict
 from math import ceil
+from time import perf_counter
+
+from utils.instrumentation import NULL_METRICS
 
 # Historical default layout: 15 benches × 3 positions = 45 seats.
 TARGET_CAPACITY = 45
 
 
-def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benches_per_hall=15, target_capacity=None):
+def _hall_layout(hall, capacity_per_bench, benches_per_hall, target_capacity=None):
+    """Return (capacity, benches) for a hall.
+
+    Historical behaviour: 45-seat halls keep exactly benches_per_hall benches; other
+    capacities get ceil(capacity / capacity_per_bench) benches. target_capacity is an
+    optional global cap kept for backward compatibility.
+    """
+    hall_capacity = getattr(hall, "capacity", TARGET_CAPACITY) or TARGET_CAPACITY
+    if hall_capacity == TARGET_CAPACITY:
+        benches = benches_per_hall
+    else:
+        benches = max(1, ceil(hall_capacity / capacity_per_bench))
+    capacity = hall_capacity
+    if target_capacity is not None:
+        capacity = min(capacity, target_capacity)
+    return capacity, benches
+
+
+def _subject_conflict(hall_subject_dept, dept_id, subj_id):
+    """True if subj_id is already written in this hall by a different department."""
+    if subj_id not in hall_subject_dept:
+        return False
+    return hall_subject_dept[subj_id] != dept_id
+
+
+def _adjacent_same_subject(hall_matrix, subj_id, bench, pos):
+    adj = []
+    if pos == 1:
+        adj.append((bench, 2))
+    elif pos == 2:
+        adj.extend([(bench, 1), (bench, 3)])
+    else:
+        adj.append((bench, 2))
+    for (b, p) in adj:
+        if (b, p) in hall_matrix:
+            _, s = hall_matrix[(b, p)]
+            if s == subj_id:
+                return True
+    return False
+
+
+def _find_valid_seat(hall_matrix, subj_id, benches_count, per_bench):
+    """First free (bench, position) in bench order with no same-subject neighbour."""
+    for b in range(1, benches_count + 1):
+        for p in range(1, per_bench + 1):
+            if (b, p) not in hall_matrix and not _adjacent_same_subject(hall_matrix, subj_id, b, p):
+                return b, p
+    return None
+
+
+def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benches_per_hall=15, target_capacity=None,
+                   metrics=None):
     """
     Allocate students to halls with strict rules:
 
@@ -26,9 +80,12 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
 
     students_by_dept_subject: { (dept_id, subject_id): [Student, ...] }
     halls: [ExamHall, ...]
+    metrics: optional PipelineMetrics; receives engine.phase1/engine.phase2 timings and
+      seats_placed, seat_search_probes and pool_reinserts counters.
     Returns: list of (hall_id, bench, position, student_tuple)
     """
     STUDS_PER_BENCH = capacity_per_bench
+    metrics = metrics or NULL_METRICS
 
     # Build mutable queues per (dept, subject) - we pop from these
     pools = {}
@@ -52,33 +109,14 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
     def get_dept_remaining(dept_id):
         return sum(len(pools.get(k, [])) for k in keys_by_dept.get(dept_id, []))
 
-    def subject_conflict_in_hall(hall_subject_dept, dept_id, subj_id):
-        if subj_id not in hall_subject_dept:
-            return False
-        return hall_subject_dept[subj_id] != dept_id
-
-    def get_adjacent_same_subject(hall_matrix, subj_id, bench, pos):
-        adj = []
-        if pos == 1:
-            adj.append((bench, 2))
-        elif pos == 2:
-            adj.extend([(bench, 1), (bench, 3)])
-        else:
-            adj.append((bench, 2))
-        for (b, p) in adj:
-            if (b, p) in hall_matrix:
-                _, s = hall_matrix[(b, p)]
-                if s == subj_id:
-                    return True
-        return False
-
     def find_valid_seat(hall_matrix, subj_id, benches_count):
-        used = set(hall_matrix.keys())
-        for b in range(1, benches_count + 1):
-            for p in range(1, STUDS_PER_BENCH + 1):
-                if (b, p) not in used and not get_adjacent_same_subject(hall_matrix, subj_id, b, p):
-                    return b, p
-        return None
+        seat = _find_valid_seat(hall_matrix, subj_id, benches_count, STUDS_PER_BENCH)
+        # Seats examined by the bench-order scan (all of them when nothing fits).
+        if seat is None:
+            metrics.incr('seat_search_probes', benches_count * STUDS_PER_BENCH)
+        else:
+            metrics.incr('seat_search_probes', (seat[0] - 1) * STUDS_PER_BENCH + seat[1])
+        return seat
 
     def pop_student(dept_id, subj_id):
         key = (dept_id, subj_id)
@@ -101,22 +139,12 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
     dominant_pair_idx = 0
 
     # Phase 1: Two-dept paired halls - fill each towards its target capacity
+    phase_start = perf_counter()
     hall_idx = 0
     while hall_idx < len(halls_sorted) and count_remaining() > 0:
         hall = halls_sorted[hall_idx]
         hid = hall.id
-        # Compute effective capacity and benches per hall.
-        hall_capacity = getattr(hall, "capacity", TARGET_CAPACITY) or TARGET_CAPACITY
-        # Historical behaviour: for 45-seat halls we keep exactly 15 benches.
-        if hall_capacity == TARGET_CAPACITY:
-            benches_for_hall = benches_per_hall
-        else:
-            benches_for_hall = max(1, ceil(hall_capacity / STUDS_PER_BENCH))
-        capacity = hall_capacity
-        # Optional global cap (kept for backward compatibility). In the new flow we normally
-        # call allocate_seats without a target_capacity so each hall can use its full capacity.
-        if target_capacity is not None:
-            capacity = min(capacity, target_capacity)
+        capacity, benches_for_hall = _hall_layout(hall, STUDS_PER_BENCH, benches_per_hall, target_capacity)
         target = capacity
         hall_seats[hid] = []
         hall_matrix[hid] = {}
@@ -155,7 +183,7 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
                 keys = keys_primary + keys_other
 
             for (dept_id, subj_id) in keys:
-                if subject_conflict_in_hall(hall_subject_dept, dept_id, subj_id):
+                if _subject_conflict(hall_subject_dept, dept_id, subj_id):
                     continue
                 stu = pop_student(dept_id, subj_id)
                 if stu is None:
@@ -164,6 +192,7 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
                 if seat:
                     bench, pos = seat
                     allocations.append((hid, bench, pos, stu))
+                    metrics.incr('seats_placed')
                     hall_seats[hid].append((bench, pos))
                     hall_matrix[hid][(bench, pos)] = (dept_id, subj_id)
                     if subj_id not in hall_subject_dept:
@@ -172,6 +201,7 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
                     break
                 else:
                     pools[(dept_id, subj_id)].insert(0, stu)
+                    metrics.incr('pool_reinserts')
 
             if not placed_this_round and len(hall_matrix[hid]) < target:
                 # Exhaustion: add another dept to fill remaining seats
@@ -182,7 +212,7 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
                         continue
                     can_add = False
                     for (dept_id, subj_id) in d_keys:
-                        if not subject_conflict_in_hall(hall_subject_dept, dept_id, subj_id):
+                        if not _subject_conflict(hall_subject_dept, dept_id, subj_id):
                             can_add = True
                             break
                     if can_add:
@@ -194,18 +224,14 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
 
         hall_idx += 1
 
+    metrics.add_time('engine.phase1', perf_counter() - phase_start)
+
     # Phase 2: Overflow - remaining students into final hall(s)
+    phase_start = perf_counter()
     while hall_idx < len(halls_sorted) and count_remaining() > 0:
         hall = halls_sorted[hall_idx]
         hid = hall.id
-        hall_capacity = getattr(hall, "capacity", TARGET_CAPACITY) or TARGET_CAPACITY
-        if hall_capacity == TARGET_CAPACITY:
-            benches_for_hall = benches_per_hall
-        else:
-            benches_for_hall = max(1, ceil(hall_capacity / STUDS_PER_BENCH))
-        capacity = hall_capacity
-        if target_capacity is not None:
-            capacity = min(capacity, target_capacity)
+        capacity, benches_for_hall = _hall_layout(hall, STUDS_PER_BENCH, benches_per_hall, target_capacity)
         if hid not in hall_matrix:
             hall_matrix[hid] = {}
             hall_seats[hid] = []
@@ -223,7 +249,7 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
             placed_this_round = False
             keys = get_keys_for_depts(allowed)
             for (dept_id, subj_id) in keys:
-                if subject_conflict_in_hall(hall_subject_dept, dept_id, subj_id):
+                if _subject_conflict(hall_subject_dept, dept_id, subj_id):
                     continue
                 stu = pop_student(dept_id, subj_id)
                 if stu is None:
@@ -232,6 +258,7 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
                 if seat:
                     bench, pos = seat
                     allocations.append((hid, bench, pos, stu))
+                    metrics.incr('seats_placed')
                     hall_seats[hid].append((bench, pos))
                     hall_matrix[hid][(bench, pos)] = (dept_id, subj_id)
                     if subj_id not in hall_subject_dept:
@@ -240,9 +267,12 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
                     break
                 else:
                     pools[(dept_id, subj_id)].insert(0, stu)
+                    metrics.incr('pool_reinserts')
 
         hall_idx += 1
 
+    metrics.add_time('engine.phase2', perf_counter() - phase_start)
+
     for h in halls_sorted:
         if h.id not in hall_seats:
             hall_seats[h.id] = []
@@ -250,3 +280,123 @@ def allocate_seats(students_by_dept_subject, halls, capacity_per_bench=3, benche
             hall_matrix[h.id] = {}
 
     return allocations, halls_sorted, hall_matrix, hall_seats
+
+
+def repair_allocation(existing, students_by_dept_subject, halls, capacity_per_bench=3, benches_per_hall=15):
+    """
+    Incrementally repair an existing allocation after a small change, keeping every
+    still-valid seat exactly where it is (printed seating sheets stay correct).
+
+    existing: list of (hall_id, bench, position, student_tuple) as returned by allocate_seats.
+    students_by_dept_subject / halls: the *current* inputs, as for allocate_seats.
+
+    - Seats of students no longer scheduled (deleted, or moved to another subject) are freed.
+    - Seats in halls no longer offered are freed and their students re-placed.
+    - New or displaced students are placed into free seats, preferring halls that already
+      hold their department, then halls with a single department (restoring the pairing),
+      then empty halls. Subject adjacency and the no-shared-subject-across-departments rule
+      are enforced exactly as in allocate_seats; students with no valid seat stay unplaced.
+
+    Returns (allocations, added, removed) where allocations is the full new allocation and
+    added/removed are the entries that changed, or None if the delta would leave a changed
+    hall with a single department or seat fewer students than allocate_seats (caller
+    should run a full allocate_seats instead).
+    """
+    wanted = {}
+    for (dept_id, subj_id), students in students_by_dept_subject.items():
+        for s in students:
+            wanted[s.id] = (s.id, s.roll_number, s.name, dept_id, subj_id)
+
+    halls_sorted = sorted(halls, key=lambda h: (h.hall_number or str(h.id)))
+    layout = {h.id: _hall_layout(h, capacity_per_bench, benches_per_hall) for h in halls_sorted}
+    hall_matrix = {h.id: {} for h in halls_sorted}
+
+    kept = []
+    removed = []
+    placed_ids = set()
+    for entry in existing:
+        hall_id, bench, pos, stu = entry
+        want = wanted.get(stu[0])
+        if (hall_id not in layout or want is None or stu[0] in placed_ids
+                or (want[3], want[4]) != (stu[3], stu[4])
+                or bench > layout[hall_id][1] or pos > capacity_per_bench
+                or len(hall_matrix[hall_id]) >= layout[hall_id][0]):
+            removed.append(entry)
+            continue
+        kept.append(entry)
+        placed_ids.add(stu[0])
+        hall_matrix[hall_id][(bench, pos)] = (stu[3], stu[4])
+
+    pending = [stu for sid, stu in wanted.items() if sid not in placed_ids]
+    if not pending and not removed:
+        return list(kept), [], []
+
+    hall_subject_dept = {}
+    hall_depts = {}
+    for hid, matrix in hall_matrix.items():
+        hall_subject_dept[hid] = {s: d for (d, s) in matrix.values()}
+        hall_depts[hid] = {d for (d, _s) in matrix.values()}
+    touched = {entry[0] for entry in removed if entry[0] in hall_matrix}
+
+    def candidate_halls(dept_id):
+        # Same department first (touched halls before untouched), then single-dept halls
+        # that need a partner, then (exhaustion) any hall with room, and only then an
+        # empty hall, which would otherwise start out as a single-department room.
+        ranked = []
+        for order, h in enumerate(halls_sorted):
+            hid = h.id
+            if len(hall_matrix[hid]) >= layout[hid][0]:
+                continue
+            depts = hall_depts[hid]
+            if dept_id in depts:
+                rank = 0 if hid in touched else 1
+            elif len(depts) == 1:
+                rank = 2
+            elif depts:
+                rank = 3
+            else:
+                rank = 4
+            ranked.append((rank, order, hid))
+        ranked.sort()
+        return [hid for _r, _o, hid in ranked]
+
+    added = []
+    for stu in pending:
+        dept_id, subj_id = stu[3], stu[4]
+        for hid in candidate_halls(dept_id):
+            if _subject_conflict(hall_subject_dept[hid], dept_id, subj_id):
+                continue
+            seat = _find_valid_seat(hall_matrix[hid], subj_id, layout[hid][1], capacity_per_bench)
+            if not seat:
+                continue
+            bench, pos = seat
+            hall_matrix[hid][(bench, pos)] = (dept_id, subj_id)
+            hall_subject_dept[hid].setdefault(subj_id, dept_id)
+            hall_depts[hid].add(dept_id)
+            touched.add(hid)
+            added.append((hid, bench, pos, stu))
+            break
+        # Students with no valid seat stay unplaced, as in allocate_seats.
+
+    # Anti-single-department must still hold for every hall we changed. A hall opened
+    # only for leftovers of one department is given back (those students stay unplaced,
+    # like allocate_seats' leftovers); any other single-department hall needs a full run.
+    all_depts = {stu[3] for stu in wanted.values()}
+    if len(all_depts) > 1:
+        for hid in touched:
+            if len(hall_depts[hid]) != 1:
+                continue
+            if any(entry[0] == hid for entry in kept):
+                return None
+            added = [entry for entry in added if entry[0] != hid]
+
+    # Never seat fewer students than a fresh run would: when some are left over (given
+    # back above or with no valid seat), check whether allocate_seats fits more of them.
+    seated = len(kept) + len(added)
+    if seated < len(wanted):
+        fresh, _halls, _matrix, _seats = allocate_seats(students_by_dept_subject, halls, capacity_per_bench,
+                                                        benches_per_hall)
+        if len(fresh) > seated:
+            return None
+
+    return kept + added, added, removed
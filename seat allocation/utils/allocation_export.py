@@ -0,0 +1,63 @@
+"""Streaming writers for seat allocation data exports (CSV, NDJSON, XLSX).
+
+Each writer takes an iterable of row tuples in EXPORT_COLUMNS order and never holds
+more than one chunk of output in memory: CSV and NDJSON are yielded in chunks of
+CHUNK_ROWS rows, XLSX goes through openpyxl's write-only mode into a temporary file.
+"""
+import csv
+import json
+import tempfile
+from io import StringIO
+
+EXPORT_COLUMNS = ('hall', 'building', 'floor', 'session', 'bench', 'position', 'roll_number', 'name',
+                  'department', 'subject_code', 'subject_name')
+
+# format -> (mimetype, file extension)
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+CHUNK_ROWS = 1000
+
+
+def iter_csv(rows):
+    """CSV text chunks, header first."""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if n % CHUNK_ROWS == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def iter_ndjson(rows):
+    """One JSON object per line, in chunks."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def write_xlsx(rows, title='Allocation'):
+    """Workbook in a rewound temporary file (caller streams and closes it)."""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=title[:31])
+    ws.append(list(EXPORT_COLUMNS))
+    for row in rows:
+        ws.append(list(row))
+    out = tempfile.TemporaryFile()
+    wb.save(out)
+    out.seek(0)
+    return out
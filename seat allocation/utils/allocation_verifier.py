@@ -0,0 +1,138 @@
+"""Allocation verifier - checks an allocation against the rules documented in allocate_seats.
+
+One linear pass over the seats fills a flat per-hall seat array (index = (bench-1) * per_bench
++ pos-1), so adjacency, duplicate and capacity checks are O(1) per seat; a second pass over
+the halls (not the seats) derives fill ratios, department mix and saturation.
+"""
+from collections import defaultdict
+
+from utils.allocation_engine import _hall_layout
+
+# Rule names used in violations and metrics['violations_by_rule'].
+ERROR_RULES = (
+    'unknown_hall',         # seat in a hall that was not offered
+    'seat_out_of_range',    # bench/position outside the hall's bench layout
+    'duplicate_seat',       # two students on the same (bench, position)
+    'duplicate_student',    # one student seated twice
+    'over_capacity',        # more students than the hall's capacity
+    'same_subject_adjacent',  # malpractice rule: same subject side by side on a bench
+    'shared_subject',       # same subject written by two departments in one hall
+    'single_department',    # anti-single-department rule
+)
+WARNING_RULES = (
+    'saturation',           # hall left partly empty while a later hall is used
+    'unplaced',             # students left without a seat while seats were free
+)
+
+
+def verify_allocation(allocations, halls, students_by_dept_subject=None,
+                      capacity_per_bench=3, benches_per_hall=15, max_violations=50):
+    """
+    Check allocate_seats output.
+
+    allocations: [(hall_id, bench, position, (student_id, roll, name, dept_id, subject_id)), ...]
+    halls: the halls offered to the engine.
+    students_by_dept_subject: optional engine input, used to count unplaced students.
+
+    Returns {'ok', 'violations', 'metrics'}; 'ok' is False only for ERROR_RULES.
+    At most max_violations detailed entries are kept; counts are always complete.
+    """
+    per_bench = capacity_per_bench
+    halls_sorted = sorted(halls, key=lambda h: (h.hall_number or str(h.id)))
+    hall_index = {h.id: i for i, h in enumerate(halls_sorted)}
+    capacities = []
+    slots = []
+    for h in halls_sorted:
+        capacity, benches = _hall_layout(h, per_bench, benches_per_hall)
+        capacities.append(capacity)
+        slots.append([None] * (benches * per_bench))
+    filled = [0] * len(halls_sorted)
+    hall_subject_dept = [dict() for _ in halls_sorted]
+    hall_dept_counts = [defaultdict(int) for _ in halls_sorted]
+
+    counts = defaultdict(int)
+    violations = []
+
+    def violate(rule, hall_id=None, **detail):
+        counts[rule] += 1
+        if len(violations) < max_violations:
+            entry = {'rule': rule, 'severity': 'error' if rule in ERROR_RULES else 'warning'}
+            if hall_id is not None:
+                entry['hall_id'] = hall_id
+            entry.update(detail)
+            violations.append(entry)
+
+    seen_students = set()
+    for hall_id, bench, pos, stu in allocations:
+        student_id, dept_id, subj_id = stu[0], stu[3], stu[4]
+        if student_id in seen_students:
+            violate('duplicate_student', hall_id, student_id=student_id)
+        seen_students.add(student_id)
+
+        i = hall_index.get(hall_id)
+        if i is None:
+            violate('unknown_hall', hall_id, student_id=student_id)
+            continue
+        row = slots[i]
+        idx = (bench - 1) * per_bench + (pos - 1)
+        if bench < 1 or not 1 <= pos <= per_bench or idx >= len(row):
+            violate('seat_out_of_range', hall_id, bench=bench, position=pos)
+            continue
+        if row[idx] is not None:
+            violate('duplicate_seat', hall_id, bench=bench, position=pos)
+            continue
+        row[idx] = (dept_id, subj_id)
+        filled[i] += 1
+        hall_dept_counts[i][dept_id] += 1
+
+        # Each adjacent pair is reported once: when its second seat is filled.
+        if pos > 1 and row[idx - 1] is not None and row[idx - 1][1] == subj_id:
+            violate('same_subject_adjacent', hall_id, bench=bench, position=pos)
+        if pos < per_bench and row[idx + 1] is not None and row[idx + 1][1] == subj_id:
+            violate('same_subject_adjacent', hall_id, bench=bench, position=pos)
+
+        first_dept = hall_subject_dept[i].setdefault(subj_id, dept_id)
+        if first_dept != dept_id:
+            violate('shared_subject', hall_id, subject_id=subj_id)
+
+    all_depts = set()
+    for dc in hall_dept_counts:
+        all_depts.update(dc)
+
+    used = [i for i in range(len(halls_sorted)) if filled[i]]
+    last_used = used[-1] if used else -1
+    dept_mix = defaultdict(int)
+    free_seats = 0
+    for i, h in enumerate(halls_sorted):
+        free_seats += max(capacities[i] - filled[i], 0)
+        if not filled[i]:
+            continue
+        n_depts = len(hall_dept_counts[i])
+        dept_mix[n_depts] += 1
+        if filled[i] > capacities[i]:
+            violate('over_capacity', h.id, seated=filled[i], capacity=capacities[i])
+        if n_depts == 1 and len(all_depts) > 1:
+            violate('single_department', h.id)
+        if i < last_used and filled[i] < capacities[i]:
+            violate('saturation', h.id, seated=filled[i], capacity=capacities[i])
+
+    expected = None
+    if students_by_dept_subject is not None:
+        expected = sum(len(v) for v in students_by_dept_subject.values())
+        unplaced = expected - len(seen_students)
+        if unplaced > 0 and free_seats > 0:
+            violate('unplaced', None, students=unplaced, free_seats=free_seats)
+
+    used_capacity = sum(capacities[i] for i in used)
+    metrics = {
+        'students_expected': expected,
+        'students_placed': len(seen_students),
+        'halls_offered': len(halls_sorted),
+        'halls_used': len(used),
+        'seats_used_capacity': used_capacity,
+        'fill_ratio': round(sum(filled) / used_capacity, 4) if used_capacity else 0.0,
+        'departments_per_hall': {str(k): v for k, v in sorted(dept_mix.items())},
+        'violations_by_rule': dict(counts),
+    }
+    ok = not any(counts[r] for r in ERROR_RULES)
+    return {'ok': ok, 'violations': violations, 'metrics': metrics}
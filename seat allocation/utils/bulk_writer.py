@@ -0,0 +1,76 @@
+"""Bulk row writes: COPY FROM STDIN on PostgreSQL, executemany everywhere else."""
+import csv
+from io import StringIO
+
+from models import db
+
+# Marker written for NULL values in the COPY stream.
+_COPY_NULL = '\\N'
+
+
+def _insert_columns(table):
+    """Columns we write explicitly (everything except the integer primary key)."""
+    return [c for c in table.columns if not c.primary_key]
+
+
+def _fill_defaults(columns, rows):
+    """Apply Python-side column defaults the ORM would normally set (created_at, academic_year, ...).
+
+    Callable defaults are evaluated once per batch so every row gets the same timestamp.
+    """
+    defaults = {}
+    for col in columns:
+        if col.default is None:
+            continue
+        if col.default.is_callable:
+            defaults[col.name] = col.default.arg(None)
+        elif col.default.is_scalar:
+            defaults[col.name] = col.default.arg
+    filled = []
+    for row in rows:
+        full = {c.name: row.get(c.name, defaults.get(c.name)) for c in columns}
+        filled.append(full)
+    return filled
+
+
+def _copy_rows(connection, table, columns, rows):
+    """Stream rows into PostgreSQL with COPY ... FROM STDIN (CSV)."""
+    buf = StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([_COPY_NULL if row[c.name] is None else row[c.name] for c in columns])
+    buf.seek(0)
+
+    preparer = connection.dialect.identifier_preparer
+    col_list = ', '.join(preparer.quote(c.name) for c in columns)
+    sql = (
+        f"COPY {preparer.format_table(table)} ({col_list}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '{_COPY_NULL}')"
+    )
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(sql, buf)
+    finally:
+        cursor.close()
+
+
+def bulk_insert(model, rows):
+    """
+    Insert many rows for model inside the current db.session transaction.
+
+    rows: list of dicts keyed by column name (missing columns get their model defaults).
+    On PostgreSQL (psycopg2) rows are streamed with COPY FROM STDIN; other databases
+    (SQLite) use a single executemany INSERT. The caller is responsible for commit.
+    Returns the number of rows written.
+    """
+    if not rows:
+        return 0
+    table = model.__table__
+    columns = _insert_columns(table)
+    rows = _fill_defaults(columns, rows)
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql' and connection.dialect.driver == 'psycopg2':
+        _copy_rows(connection, table, columns, rows)
+    else:
+        connection.execute(table.insert(), rows)
+    return len(rows)
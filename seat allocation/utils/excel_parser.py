@@ -1,5 +1,8 @@
-"""Excel/CSV file parsing utilities."""
-import pandas as pd
+"""Excel/CSV file parsing utilities.
+
+pandas is imported inside the parsers, so importing this module (every import route
+does) stays cheap until a file is actually uploaded.
+"""
 from io import BytesIO
 
 
@@ -8,6 +11,7 @@ def parse_excel_file(file_content, filename):
     Parse Excel or CSV file and return a list of dicts.
     Handles .csv, .xlsx, .xls files.
     """
+    import pandas as pd
     try:
         if filename.endswith('.csv'):
             df = pd.read_csv(BytesIO(file_content), encoding='utf-8')
@@ -27,6 +31,7 @@ def parse_excel_file(file_content, filename):
 
 def parse_students_file(file_content, filename, required_columns=None):
     """Parse student import file. Expected columns: roll_number, name (or roll, name)."""
+    import pandas as pd
     records = parse_excel_file(file_content, filename)
     if not records:
         raise ValueError("File is empty or has no valid data")
@@ -50,6 +55,7 @@ def parse_students_file(file_content, filename, required_columns=None):
 
 def parse_subjects_file(file_content, filename):
     """Parse subject import file. Expected: name, code (or subject_name, subject_code)."""
+    import pandas as pd
     records = parse_excel_file(file_content, filename)
     normalized = []
     for r in records:
@@ -63,6 +69,7 @@ def parse_subjects_file(file_content, filename):
 
 def parse_halls_file(file_content, filename):
     """Parse exam hall import file. Expected: hall_number, capacity, building_name, floor."""
+    import pandas as pd
     records = parse_excel_file(file_content, filename)
     normalized = []
     for r in records:
@@ -91,6 +98,7 @@ def parse_timetable_subjects_file(file_content, filename):
     Do NOT drop duplicates - each row is one subject per department.
     Expected columns: department_code, subject_code (or departmentcode, subjectcode).
     """
+    import pandas as pd
     records = parse_excel_file(file_content, filename)
     normalized = []
     for r in records:
@@ -107,6 +115,7 @@ def parse_schedule_file(file_content, filename):
     Parse exam schedule file.
     Expected columns: subject_code, department_code, exam_date, start_time, end_time
     """
+    import pandas as pd
     records = parse_excel_file(file_content, filename)
     normalized = []
     for r in records:
@@ -0,0 +1,107 @@
+"""Lightweight pipeline instrumentation: phase timers, counters and a per-thread query count."""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import event
+
+# Most recent finished runs, newest last (shown on the admin metrics page).
+RECENT_RUNS = deque(maxlen=50)
+_recent_lock = threading.Lock()
+
+
+class PipelineMetrics:
+    """Timers and counters for one run of a pipeline (an allocation, a PDF bundle, ...).
+
+    Usage:
+        metrics = PipelineMetrics('run_allocation', exam_id=3)
+        with metrics.timer('engine'):
+            ...
+        metrics.incr('seats_placed')
+        metrics.finish(app.logger)
+    """
+
+    def __init__(self, name, **context):
+        self.name = name
+        self.context = context
+        self.started_at = datetime.now()
+        self.timers = {}
+        self.counters = {}
+        self._start = time.perf_counter()
+        self.total = None
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        self.timers[name] = self.timers.get(name, 0.0) + seconds
+
+    def incr(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'context': {k: str(v) for k, v in self.context.items()},
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_ms': round((self.total or 0.0) * 1000, 2),
+            'timers_ms': {k: round(v * 1000, 2) for k, v in self.timers.items()},
+            'counters': dict(self.counters),
+        }
+
+    def finish(self, logger=None):
+        """Stop the clock, keep the run for the metrics page and log it as one JSON line."""
+        self.total = time.perf_counter() - self._start
+        data = self.as_dict()
+        with _recent_lock:
+            RECENT_RUNS.append(data)
+        if logger is not None:
+            logger.info('pipeline-metrics %s', json.dumps(data, sort_keys=True))
+        return data
+
+
+class _NullMetrics:
+    """Drop-in stand-in used when a caller does not collect metrics."""
+
+    @contextmanager
+    def timer(self, name):
+        yield
+
+    def add_time(self, name, seconds):
+        pass
+
+    def incr(self, name, n=1):
+        pass
+
+
+NULL_METRICS = _NullMetrics()
+
+
+@contextmanager
+def track_queries(metrics, engine, counter='queries'):
+    """Count SQL statements issued by the current thread on engine while the block runs."""
+    thread_id = threading.get_ident()
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread_id:
+            metrics.incr(counter)
+
+    event.listen(engine, 'before_cursor_execute', _count)
+    try:
+        yield metrics
+    finally:
+        event.remove(engine, 'before_cursor_execute', _count)
+
+
+def recent_runs():
+    """Snapshot of RECENT_RUNS, newest first."""
+    with _recent_lock:
+        return list(reversed(RECENT_RUNS))
@@ -1,38 +1,117 @@
 """PDF generation for seat allocation documents."""
+import re
 from datetime import datetime, date
 from io import BytesIO
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import getFont, stringWidth
+from reportlab.pdfgen import canvas
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import xml.sax.saxutils as saxutils
 
+# Styles are built once at import and shared by every document: getSampleStyleSheet() and
+# the ParagraphStyle/TableStyle objects below used to be rebuilt for each PDF, i.e. a few
+# hundred times per allocation bundle. ReportLab only reads them while laying out, so one
+# instance can serve all documents (and threads).
+_SAMPLE = getSampleStyleSheet()
+
+STYLES = {
+    'heading': _SAMPLE['Heading2'],
+    'normal': _SAMPLE['Normal'],
+    'overall_title': ParagraphStyle('CustomTitle', parent=_SAMPLE['Heading1'], fontSize=14,
+                                    alignment=TA_CENTER, spaceAfter=8),
+    'overall_sub': ParagraphStyle('SubTitle', parent=_SAMPLE['Normal'], fontSize=10,
+                                  alignment=TA_CENTER, spaceAfter=12),
+    'master_title': ParagraphStyle('MasterTitle', parent=_SAMPLE['Heading1'], fontSize=14,
+                                   alignment=TA_CENTER, spaceAfter=4),
+    'master_sub': ParagraphStyle('MasterSub', parent=_SAMPLE['Normal'], fontSize=9,
+                                 alignment=TA_CENTER, spaceAfter=2),
+    'master_cell': ParagraphStyle('MasterCell', parent=_SAMPLE['Normal'], fontSize=6, alignment=TA_CENTER,
+                                  leading=7, leftIndent=0, rightIndent=0, spaceBefore=1, spaceAfter=1),
+    'master_header': ParagraphStyle('MasterHeader', parent=_SAMPLE['Normal'], fontSize=7,
+                                    alignment=TA_CENTER, textColor=colors.whitesmoke),
+}
+
+TABLE_STYLES = {
+    # Overall sheet; hall/building/floor SPANs are added per document.
+    'overall': TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]),
+    # Bench | Pos 1 | Pos 2 | Pos 3 (45-seat halls).
+    'seating_bench': TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2980b9')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]),
+    # Seat No | Roll Number (other capacities).
+    'seating_seat_no': TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2980b9')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]),
+    'attendance': TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#27ae60')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+        ('ALIGN', (1, 0), (1, -1), 'CENTER'),
+        ('ALIGN', (2, 0), (2, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]),
+    'master': TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 1), colors.HexColor('#2c3e50')),
+        ('TEXTCOLOR', (0, 0), (-1, 1), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 1), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ('LEFTPADDING', (0, 0), (-1, -1), 3),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 2), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ]),
+}
+
+OVERALL_COL_WIDTHS = [0.8*inch, 1.2*inch, 0.9*inch, 1*inch, 0.9*inch, 1.8*inch]
+BENCH_COL_WIDTHS = [0.6*inch, 1.4*inch, 1.4*inch, 1.4*inch]
+SEAT_NO_COL_WIDTHS = [0.9 * inch, 2.6 * inch]
+ATTENDANCE_COL_WIDTHS = [0.5*inch, 1.2*inch, 2.5*inch, 2*inch]
+ATTENDANCE_HEADER = ['S.No', 'Roll Number', 'Name', 'Signature']
+
 
 def create_overall_allocation_pdf(allocations_by_hall, exam_name, exam_date):
     """Overall seating allocation - single compact table: Hall | Department | Subject Code | No. Students | Roll Range."""
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=14,
-        alignment=TA_CENTER,
-        spaceAfter=8
-    )
-    sub_style = ParagraphStyle(
-        'SubTitle',
-        parent=styles['Normal'],
-        fontSize=10,
-        alignment=TA_CENTER,
-        spaceAfter=12
-    )
 
     story = []
-    story.append(Paragraph("EXAM SEATING ALLOCATION", title_style))
-    story.append(Paragraph(f"<b>Exam:</b> {exam_name} | <b>Date:</b> {exam_date}", sub_style))
+    story.append(Paragraph("EXAM SEATING ALLOCATION", STYLES['overall_title']))
+    story.append(Paragraph(f"<b>Exam:</b> {exam_name} | <b>Date:</b> {exam_date}", STYLES['overall_sub']))
     story.append(Spacer(1, 0.2*inch))
 
     # Table: Hall Number | Building Name | Floor Name | Department | No. Students | Roll Number Range
@@ -55,20 +134,8 @@ def create_overall_allocation_pdf(allocations_by_hall, exam_name, exam_date):
                 rolls
             ])
 
-    col_widths = [0.8*inch, 1.2*inch, 0.9*inch, 1*inch, 0.9*inch, 1.8*inch]
-    t = Table(data, colWidths=col_widths)
-    style_cmds = [
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 6),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 1), (-1, -1), 4),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]
+    t = Table(data, colWidths=OVERALL_COL_WIDTHS, style=TABLE_STYLES['overall'])
+    style_cmds = []
 
     # Merge repeated hall number, building, and floor cells for consecutive rows of same hall
     # Row 0 is header; start scanning from row 1.
@@ -98,7 +165,8 @@ def create_overall_allocation_pdf(allocations_by_hall, exam_name, exam_date):
             style_cmds.append(('SPAN', (2, start_row), (2, end_row)))
             style_cmds.append(('VALIGN', (2, start_row), (2, end_row), 'MIDDLE'))
 
-    t.setStyle(TableStyle(style_cmds))
+    if style_cmds:
+        t.setStyle(style_cmds)
     story.append(t)
     doc.build(story)
     buffer.seek(0)
@@ -114,22 +182,25 @@ def create_classroom_allocation_pdf(hall_info, exam_name, exam_date):
     """
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.4*inch, bottomMargin=0.4*inch)
-    styles = getSampleStyleSheet()
+    doc.build(_seating_story(hall_info, exam_name, exam_date))
+    buffer.seek(0)
+    return buffer
+
 
+def _seating_story(hall_info, exam_name, exam_date):
+    """Flowables of one hall's seating sheet."""
     story = []
     story.append(Paragraph(
         f"<b>HALL {hall_info['hall_number']}</b> | {hall_info.get('building_name', '')} | Floor: {hall_info.get('floor', '')}",
-        styles['Heading2']
+        STYLES['heading']
     ))
-    story.append(Paragraph(f"Exam: {exam_name} | Date: {exam_date}", styles['Normal']))
+    story.append(Paragraph(f"Exam: {exam_name} | Date: {exam_date}", STYLES['normal']))
     story.append(Spacer(1, 0.15*inch))
 
     seats = hall_info.get('seats', [])
     if not seats:
-        story.append(Paragraph("No allocation data.", styles['Normal']))
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        story.append(Paragraph("No allocation data.", STYLES['normal']))
+        return story
     capacity = hall_info.get("capacity") or 45
 
     if capacity == 45:
@@ -145,18 +216,7 @@ def create_classroom_allocation_pdf(hall_info, exam_name, exam_date):
             row = seat_map[b]
             data.append([str(b), row.get(1, ''), row.get(2, ''), row.get(3, '')])
 
-        t = Table(data, colWidths=[0.6*inch, 1.4*inch, 1.4*inch, 1.4*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2980b9')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        story.append(t)
+        story.append(Table(data, colWidths=BENCH_COL_WIDTHS, style=TABLE_STYLES['seating_bench']))
     else:
         # Seat-number list for non-45 halls.
         seats_sorted = sorted(seats, key=lambda x: (x[0], x[1]))
@@ -168,40 +228,39 @@ def create_classroom_allocation_pdf(hall_info, exam_name, exam_date):
                 continue
             rows.append([str(seat_no), str(roll)])
 
-        t = Table(rows, colWidths=[0.9 * inch, 2.6 * inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2980b9')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('TOPPADDING', (0, 0), (-1, -1), 3),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        story.append(t)
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+        story.append(Table(rows, colWidths=SEAT_NO_COL_WIDTHS, style=TABLE_STYLES['seating_seat_no']))
+    return story
 
 
-def create_attendance_sheet_pdf(hall_info, exam_name, exam_date):
-    """Attendance sheet with separate pages per department within the same hall."""
+ATTENDANCE_RENDERERS = ('canvas', 'platypus')
+
+
+def create_attendance_sheet_pdf(hall_info, exam_name, exam_date, renderer='canvas'):
+    """Attendance sheet with separate pages per department within the same hall.
+
+    renderer 'canvas' draws the fixed grid straight onto the page (see _draw_attendance);
+    'platypus' lays it out as Platypus Tables. Both produce the same pages.
+    """
+    if renderer == 'canvas':
+        return _canvas_attendance_pdf([hall_info], exam_name, exam_date)
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch)
-    styles = getSampleStyleSheet()
+    doc.build(_attendance_story(hall_info, exam_name, exam_date))
+    buffer.seek(0)
+    return buffer
 
-    story = []
+
+def _attendance_sections(hall_info):
+    """One hall's attendance pages as [(heading markup, rows)], a section per department/subject.
+
+    rows are [S.No, Roll Number, Name, ''] lists; None when the hall has no students.
+    """
     hall_num = hall_info['hall_number']
     students = hall_info.get('students', [])
     allocations = hall_info.get('allocations', [])
 
     if not students and not allocations:
-        story.append(Paragraph(f"<b>ATTENDANCE SHEET - HALL {hall_num}</b>", styles['Heading2']))
-        story.append(Paragraph("No students.", styles['Normal']))
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        return [(f"<b>ATTENDANCE SHEET - HALL {hall_num}</b>", None)]
 
     # Build students grouped by department from allocations (dept_code + subject_code as key)
     # allocations have department_code, roll_numbers; we need roll -> name from students
@@ -216,75 +275,227 @@ def create_attendance_sheet_pdf(hall_info, exam_name, exam_date):
 
     # If no allocation breakdown, treat all students as one "department" page
     if not dept_rolls and students:
-        story.append(Paragraph(
-            f"<b>ATTENDANCE SHEET - HALL {hall_num}</b>",
-            styles['Heading2']
-        ))
-        story.append(Paragraph(f"Exam: {exam_name} | Date: {exam_date}", styles['Normal']))
-        story.append(Spacer(1, 0.2*inch))
-        data = [['S.No', 'Roll Number', 'Name', 'Signature']]
-        for i, entry in enumerate(students, 1):
-            data.append([
-                str(i),
-                str(entry.get('roll_number', '')),
-                str(entry.get('name', '')),
-                ''
-            ])
-        t = Table(data, colWidths=[0.5*inch, 1.2*inch, 2.5*inch, 2*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#27ae60')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 0), (2, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        story.append(t)
-        doc.build(story)
-        buffer.seek(0)
-        return buffer
+        rows = [[str(i), str(entry.get('roll_number', '')), str(entry.get('name', '')), '']
+                for i, entry in enumerate(students, 1)]
+        return [(f"<b>ATTENDANCE SHEET - HALL {hall_num}</b>", rows)]
 
     # Separate page per department (dept_code + subject for label)
+    sections = []
     for (dept_code, subj_code), rolls in dept_rolls.items():
         if not rolls:
             continue
-        story.append(Paragraph(
-            f"<b>HALL {hall_num} – Department: {dept_code} | Subject: {subj_code}</b>",
-            styles['Heading2']
-        ))
-        story.append(Paragraph(f"Exam: {exam_name} | Date: {exam_date}", styles['Normal']))
+        rows = [[str(i), roll, roll_to_name.get(roll, ''), '']
+                for i, roll in enumerate(sorted(map(str, rolls), key=lambda x: (len(x), x)), 1)]
+        sections.append((f"<b>HALL {hall_num} – Department: {dept_code} | Subject: {subj_code}</b>", rows))
+    return sections
+
+
+def _attendance_story(hall_info, exam_name, exam_date):
+    """Flowables of one hall's attendance sheet: a page per department/subject."""
+    story = []
+    for heading, rows in _attendance_sections(hall_info):
+        if story:
+            story.append(PageBreak())
+        story.append(Paragraph(heading, STYLES['heading']))
+        if rows is None:
+            story.append(Paragraph("No students.", STYLES['normal']))
+            continue
+        story.append(Paragraph(f"Exam: {exam_name} | Date: {exam_date}", STYLES['normal']))
         story.append(Spacer(1, 0.2*inch))
-        data = [['S.No', 'Roll Number', 'Name', 'Signature']]
-        for i, roll in enumerate(sorted(rolls, key=lambda x: (len(str(x)), str(x))), 1):
-            data.append([
-                str(i),
-                str(roll),
-                roll_to_name.get(str(roll), ''),
-                ''
-            ])
-        t = Table(data, colWidths=[0.5*inch, 1.2*inch, 2.5*inch, 2*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#27ae60')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-            ('ALIGN', (1, 0), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 0), (2, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        story.append(t)
-        story.append(PageBreak())
-
-    if story and isinstance(story[-1], PageBreak):
-        story.pop()  # remove trailing page break
+        story.append(Table([ATTENDANCE_HEADER] + rows, colWidths=ATTENDANCE_COL_WIDTHS,
+                           style=TABLE_STYLES['attendance']))
+    return story
+
+
+# Canvas fast path for attendance sheets. The grid has fixed rows, so instead of Platypus
+# measuring and styling every cell, the geometry below reproduces what SimpleDocTemplate +
+# Table produce for TABLE_STYLES['attendance'] (1in side margins, 0.5in top/bottom, 6pt
+# frame padding, 18pt rows = 12pt leading + 3pt padding, table centred in the frame) and
+# the rows are drawn with one text object and one line path per page.
+_ATT_FRAME_PAD = 6
+_ATT_TOP = A4[1] - 0.5*inch - _ATT_FRAME_PAD
+_ATT_BOTTOM = 0.5*inch + _ATT_FRAME_PAD
+_ATT_FRAME_X = inch + _ATT_FRAME_PAD
+_ATT_FRAME_W = A4[0] - 2*inch - 2*_ATT_FRAME_PAD
+_ATT_ROW_H = 18
+_ATT_BASELINE = 5  # bottomPadding + leading - fontSize
+_ATT_FONT_SIZE = 10
+_ATT_CELL_PAD = 6
+_ATT_TABLE_X = _ATT_FRAME_X + (_ATT_FRAME_W - sum(ATTENDANCE_COL_WIDTHS)) / 2
+_ATT_COL_X = [_ATT_TABLE_X + sum(ATTENDANCE_COL_WIDTHS[:i]) for i in range(len(ATTENDANCE_COL_WIDTHS) + 1)]
+# (x, centred) of each text column: S.No and Roll Number centred, Name and Signature left.
+_ATT_TEXT_X = [
+    (_ATT_COL_X[0] + ATTENDANCE_COL_WIDTHS[0] / 2, True),
+    (_ATT_COL_X[1] + ATTENDANCE_COL_WIDTHS[1] / 2, True),
+    (_ATT_COL_X[2] + _ATT_CELL_PAD, False),
+    (_ATT_COL_X[3] + _ATT_CELL_PAD, False),
+]
+_ATT_HEADER_BG = colors.HexColor('#27ae60')
+_HELVETICA_WIDTHS = getFont('Helvetica').widths  # per character code, in 1/1000 em
+_PRINTABLE_ASCII = re.compile(r'[ -~]*').fullmatch
+
+
+def _canvas_attendance_pdf(hall_infos, exam_name, exam_date):
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    first = True
+    for hi in hall_infos:
+        for heading, rows in _attendance_sections(hi):
+            if not first:
+                c.showPage()
+            first = False
+            _draw_attendance(c, heading, rows, exam_name, exam_date)
+    if first:
+        _draw_paragraph(c, Paragraph("No allocation data.", STYLES['normal']), _ATT_TOP)
+    c.save()
+    buffer.seek(0)
+    return buffer
+
+
+def _draw_paragraph(c, para, y):
+    """Draw para with its top at y in the frame; return the y below it."""
+    _w, h = para.wrapOn(c, _ATT_FRAME_W, y - _ATT_BOTTOM)
+    para.drawOn(c, _ATT_FRAME_X, y - h)
+    return y - h
+
+
+def _draw_attendance(c, heading, rows, exam_name, exam_date):
+    """One attendance section: heading, exam line and the grid, continued on new pages."""
+    heading_style, normal_style = STYLES['heading'], STYLES['normal']
+    y = _draw_paragraph(c, Paragraph(heading, heading_style), _ATT_TOP)
+    y -= max(heading_style.spaceAfter, normal_style.spaceBefore)
+    if rows is None:
+        _draw_paragraph(c, Paragraph("No students.", normal_style), y)
+        return
+    y = _draw_paragraph(c, Paragraph(f"Exam: {exam_name} | Date: {exam_date}", normal_style), y)
+    y -= 0.2*inch
+
+    table = [ATTENDANCE_HEADER] + rows
+    start = 0
+    while start < len(table):
+        fit = max(int((y - _ATT_BOTTOM) // _ATT_ROW_H), 1)
+        _draw_attendance_rows(c, table[start:start + fit], y, header=start == 0)
+        start += fit
+        if start < len(table):
+            c.showPage()
+            y = _ATT_TOP
+
+
+def _draw_attendance_rows(c, rows, top, header):
+    """Grid rows with their top edge at top; the first row is the header when header is set.
+
+    Body cells are written as raw text operators (Canvas.addLiteral): going through
+    PDFTextObject costs several number-formatting and escaping calls per cell, which was
+    most of the render time. Cells with characters outside printable ASCII take the normal
+    text-object path so ReportLab handles their encoding.
+    """
+    if header:
+        c.setFillColor(_ATT_HEADER_BG)
+        c.rect(_ATT_COL_X[0], top - _ATT_ROW_H, _ATT_COL_X[-1] - _ATT_COL_X[0], _ATT_ROW_H, stroke=0, fill=1)
+        text = c.beginText()
+        text.setFont('Helvetica-Bold', _ATT_FONT_SIZE)
+        text.setFillColor(colors.whitesmoke)
+        y = top - _ATT_ROW_H + _ATT_BASELINE
+        for value, (x, centred) in zip(rows[0], _ATT_TEXT_X):
+            if centred:
+                x -= stringWidth(value, 'Helvetica-Bold', _ATT_FONT_SIZE) / 2
+            text.setTextOrigin(x, y)
+            text.textOut(value)
+        c.drawText(text)
+        body, y = rows[1:], y - _ATT_ROW_H
+    else:
+        body, y = rows, top - _ATT_ROW_H + _ATT_BASELINE
+
+    # Selecting the font through a (empty) text object registers it with the document;
+    # the font is text state, so it stays in effect for the raw text objects below.
+    c.setFillColor(colors.black)
+    text = c.beginText()
+    text.setFont('Helvetica', _ATT_FONT_SIZE)
+    c.drawText(text)
+    ops, other = ['BT'], []
+    for row in body:
+        for value, (x, centred) in zip(row, _ATT_TEXT_X):
+            if not value:
+                continue
+            if not _PRINTABLE_ASCII(value):
+                other.append((x, y, value, centred))
+                continue
+            if centred:
+                x -= sum(_HELVETICA_WIDTHS[ord(ch)] for ch in value) * _ATT_FONT_SIZE / 2000
+            literal = value.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            ops.append(f'1 0 0 1 {x:.2f} {y:.2f} Tm ({literal}) Tj')
+        y -= _ATT_ROW_H
+    ops.append('ET')
+    c.addLiteral(' '.join(ops))
+    if other:
+        text = c.beginText()
+        text.setFont('Helvetica', _ATT_FONT_SIZE)
+        for x, y, value, centred in other:
+            if centred:
+                x -= stringWidth(value, 'Helvetica', _ATT_FONT_SIZE) / 2
+            text.setTextOrigin(x, y)
+            text.textOut(value)
+        c.drawText(text)
+
+    bottom = top - len(rows) * _ATT_ROW_H
+    x0, x1 = _ATT_COL_X[0], _ATT_COL_X[-1]
+    c.setStrokeColor(colors.grey)
+    c.setLineWidth(0.5)
+    path = [f'{x0:.2f} {top - i * _ATT_ROW_H:.2f} m {x1:.2f} {top - i * _ATT_ROW_H:.2f} l'
+            for i in range(len(rows) + 1)]
+    path += [f'{x:.2f} {bottom:.2f} m {x:.2f} {top:.2f} l' for x in _ATT_COL_X]
+    c.addLiteral(' '.join(path) + ' S')
+
+
+# Combined mode: all halls in one document (and one doc.build), for printing offices that
+# want a file per building rather than a ZIP of per-hall PDFs. Page content is the same as
+# the per-hall PDFs; every hall starts on a new page.
+HALL_GROUPINGS = ('building', 'floor')
+
+
+def group_halls(hall_infos, group_by=None):
+    """Split halls for combined PDFs: [(label, [hall_info, ...])] in first-seen order.
+
+    group_by None keeps one group ('All halls'); 'building' groups on building_name and
+    'floor' on (building_name, floor).
+    """
+    if group_by not in HALL_GROUPINGS:
+        return [('All halls', list(hall_infos))] if hall_infos else []
+    groups = {}
+    for hi in hall_infos:
+        building = hi.get('building_name') or 'No building'
+        label = building if group_by == 'building' else f"{building} - Floor {hi.get('floor') or '-'}"
+        groups.setdefault(label, []).append(hi)
+    return list(groups.items())
+
+
+def _combined_pdf(hall_infos, exam_name, exam_date, story_fn, margin):
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=margin, bottomMargin=margin)
+    story = []
+    for hi in hall_infos:
+        if story:
+            story.append(PageBreak())
+        story.extend(story_fn(hi, exam_name, exam_date))
+    if not story:
+        story.append(Paragraph("No allocation data.", STYLES['normal']))
     doc.build(story)
     buffer.seek(0)
     return buffer
 
 
+def create_combined_seating_pdf(hall_infos, exam_name, exam_date):
+    """Seating sheets of all given halls in one PDF, one hall per page (or more for big halls)."""
+    return _combined_pdf(hall_infos, exam_name, exam_date, _seating_story, 0.4*inch)
+
+
+def create_combined_attendance_pdf(hall_infos, exam_name, exam_date, renderer='canvas'):
+    """Attendance sheets of all given halls in one PDF."""
+    if renderer == 'canvas':
+        return _canvas_attendance_pdf(hall_infos, exam_name, exam_date)
+    return _combined_pdf(hall_infos, exam_name, exam_date, _attendance_story, 0.5*inch)
+
+
 def _fmt_date_dd_mm_yyyy(d):
     """Format date as DD.MM.YYYY for master timetable."""
     if isinstance(d, date):
@@ -292,18 +503,35 @@ def _fmt_date_dd_mm_yyyy(d):
     return str(d)
 
 
-def create_master_timetable_pdf(schedule_list, exam_name, academic_year, exam_time_str, subject_name_map=None):
+def _session_for_time_str(time_str):
+    """'FN' or 'AN' for a start time like "09:30", "13:15" or "01:15 PM" (AN if unreadable)."""
+    m = re.match(r'\s*(\d{1,2})[:.](\d{2})\s*([AaPp][Mm])?', str(time_str or ''))
+    if not m:
+        return 'AN'
+    hour = int(m.group(1))
+    if m.group(3):
+        hour = hour % 12 + (12 if m.group(3).lower() == 'pm' else 0)
+    return 'FN' if hour < 12 else 'AN'
+
+
+def create_master_timetable_pdf(schedule_list, exam_name, academic_year, exam_time_str, subject_name_map=None,
+                                session_times=None):
     """
-    schedule_list: list of (date, dept_code, subject_code) or (date, dept_code, subject_code, subject_name).
+    schedule_list: list of (date, dept_code, subject_code), (date, dept_code, subject_code, subject_name)
+        or (date, dept_code, subject_code, subject_name, session).
     exam_name: e.g. UG - IV YEAR - MODEL EXAMINATION.
     academic_year: e.g. 2024-2025 (ODD SEMESTER).
     exam_time_str: e.g. "13:15 - 16:15" or "01:15 PM to 04:15 PM".
     subject_name_map: { subject_code: subject_name } optional.
+    session_times: { 'FN': '09:30', 'AN': '13:15' } optional; default one session named
+        after exam_time_str. One column per (date, session).
     Output: MASTER TIME TABLE style PDF (like sample).
     """
     subject_name_map = subject_name_map or {}
-    # Build (dept, date) -> (code, name); normalize dates for sorting
-    grid = {}  # (dept_code, date) -> (subject_code, subject_name)
+    session_times = session_times or {_session_for_time_str(exam_time_str): exam_time_str}
+    default_session = next(iter(session_times))
+    # Build (dept, (date, session)) -> (code, name); normalize dates for sorting
+    grid = {}  # (dept_code, (date, session)) -> (subject_code, subject_name)
     depts_order = []
     dates_order = []
     seen_depts = set()
@@ -330,7 +558,7 @@ def create_master_timetable_pdf(schedule_list, exam_name, academic_year, exam_ti
         else:
             d, dept, code = item[0], item[1], item[2]
             name = subject_name_map.get(code, '')
-        d = _norm_d(d)
+        d = (_norm_d(d), (item[4] if len(item) > 4 else None) or default_session)
         grid[(dept, d)] = (code, name)
         if dept not in seen_depts:
             seen_depts.add(dept)
@@ -338,35 +566,28 @@ def create_master_timetable_pdf(schedule_list, exam_name, academic_year, exam_ti
         if d not in seen_dates_set:
             seen_dates_set.add(d)
             dates_order.append(d)
-    dates_order.sort(key=lambda x: (x.isoformat() if hasattr(x, 'isoformat') else str(x)))
+    dates_order.sort(key=lambda x: (x[0].isoformat() if hasattr(x[0], 'isoformat') else str(x[0]), x[1]))
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=0.4*inch, bottomMargin=0.4*inch)
-    styles = getSampleStyleSheet()
 
     def _escape(s):
         return saxutils.escape(str(s)) if s else ''
 
-    title_style = ParagraphStyle('MasterTitle', parent=styles['Heading1'], fontSize=14, alignment=TA_CENTER, spaceAfter=4)
-    sub_style = ParagraphStyle('MasterSub', parent=styles['Normal'], fontSize=9, alignment=TA_CENTER, spaceAfter=2)
-    cell_style = ParagraphStyle(
-        'MasterCell', parent=styles['Normal'],
-        fontSize=6, alignment=TA_CENTER, leading=7,
-        leftIndent=0, rightIndent=0, spaceBefore=1, spaceAfter=1,
-    )
-    header_style = ParagraphStyle(
-        'MasterHeader', parent=styles['Normal'],
-        fontSize=7, alignment=TA_CENTER, textColor=colors.whitesmoke,
-    )
+    title_style = STYLES['master_title']
+    sub_style = STYLES['master_sub']
+    cell_style = STYLES['master_cell']
+    header_style = STYLES['master_header']
     story = []
     story.append(Paragraph("MASTER TIME TABLE", title_style))
     story.append(Paragraph(_escape(f"ACADEMIC YEAR {academic_year}"), sub_style))
     story.append(Paragraph(_escape(exam_name), sub_style))
-    story.append(Paragraph(_escape(f"EXAM TIME: AN - From {exam_time_str}"), sub_style))
+    story.append(Paragraph(_escape("EXAM TIME: " + " | ".join(
+        f"{label} - From {t}" for label, t in session_times.items())), sub_style))
     story.append(Spacer(1, 0.15*inch))
 
     col_widths = [0.95*inch] + [1.35*inch] * len(dates_order)
-    header_row0 = [Paragraph(_escape('DEPT'), header_style)] + [Paragraph(_escape(_fmt_date_dd_mm_yyyy(d)), header_style) for d in dates_order]
-    header_row1 = [Paragraph('', header_style)] + [Paragraph('AN', header_style) for _ in dates_order]
+    header_row0 = [Paragraph(_escape('DEPT'), header_style)] + [Paragraph(_escape(_fmt_date_dd_mm_yyyy(d)), header_style) for d, _ in dates_order]
+    header_row1 = [Paragraph('', header_style)] + [Paragraph(_escape(sess), header_style) for _, sess in dates_order]
     data = [header_row0, header_row1]
     for dept in depts_order:
         row = [Paragraph(_escape(dept), cell_style)]
@@ -382,22 +603,7 @@ def create_master_timetable_pdf(schedule_list, exam_name, academic_year, exam_ti
                 row.append(Paragraph('-', cell_style))
         data.append(row)
 
-    t = Table(data, colWidths=col_widths, repeatRows=2)
-    t.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 1), colors.HexColor('#2c3e50')),
-        ('TEXTCOLOR', (0, 0), (-1, 1), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('FONTNAME', (0, 0), (-1, 1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 7),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ('LEFTPADDING', (0, 0), (-1, -1), 3),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0, 2), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-    ]))
-    story.append(t)
+    story.append(Table(data, colWidths=col_widths, repeatRows=2, style=TABLE_STYLES['master']))
     doc.build(story)
     buffer.seek(0)
     return buffer
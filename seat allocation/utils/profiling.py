@@ -0,0 +1,189 @@
+"""Opt-in request profiling for admins.
+
+An admin adds ?_profile=1 (or the header X-Profile: 1) to any URL to run that request
+under cProfile; ?_profile=sample uses a low-overhead stack sampler instead. The stats
+file is written to PROFILE_DIR and its name returned in the X-Profile header; files are
+listed for download on the admin metrics page.
+
+Hard limits keep this safe to leave enabled in production:
+  - only users in ADMIN_USER_IDS can trigger it, and only while PROFILING_ENABLED;
+  - one profiled request at a time per process, and at most one every
+    PROFILE_MIN_INTERVAL seconds (other requests simply run unprofiled);
+  - the sampler stops after PROFILE_MAX_SECONDS;
+  - only the newest PROFILE_KEEP files are kept.
+"""
+import cProfile
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from flask import current_app, g, request
+from flask_login import current_user
+
+_profile_lock = threading.Lock()
+_last_started = [0.0]
+
+PROFILE_SUFFIXES = ('.prof', '.txt')
+
+
+class StackSampler:
+    """Samples one thread's Python stack every interval seconds, in a helper thread.
+
+    Output is one line per distinct stack in the "collapsed" format
+    (outer;inner;leaf count) that flamegraph tools and speedscope read.
+    """
+
+    def __init__(self, thread_id, interval=0.005, max_seconds=30.0):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_samples = max(int(max_seconds / interval), 1)
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval) and self.samples < self.max_samples:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f'{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(parts))] += 1
+            self.samples += 1
+
+    def dump(self, path):
+        lines = [f'{stack} {n}' for stack, n in self.stacks.most_common()]
+        Path(path).write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+
+def _profile_dir():
+    path = Path(current_app.config['PROFILE_DIR'])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _requested_mode():
+    value = request.args.get('_profile') or request.headers.get('X-Profile')
+    if not value:
+        return None
+    return 'sample' if value.lower() == 'sample' else 'cprofile'
+
+
+def _start_profiling():
+    config = current_app.config
+    if not config.get('PROFILING_ENABLED'):
+        return
+    mode = _requested_mode()
+    if mode is None:
+        return
+    from routes.auth import is_admin
+    if not is_admin(current_user):
+        return
+    if not _profile_lock.acquire(blocking=False):
+        current_app.logger.info('profiling skipped: another request is being profiled')
+        return
+    now = time.monotonic()
+    if now - _last_started[0] < config.get('PROFILE_MIN_INTERVAL', 10):
+        _profile_lock.release()
+        current_app.logger.info('profiling skipped: rate limited')
+        return
+    _last_started[0] = now
+
+    if mode == 'sample':
+        profiler = StackSampler(threading.get_ident(),
+                                interval=config.get('PROFILE_SAMPLE_INTERVAL', 0.005),
+                                max_seconds=config.get('PROFILE_MAX_SECONDS', 30))
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage) already owns the interpreter hook.
+            _profile_lock.release()
+            current_app.logger.info('profiling skipped: another profiler is active')
+            return
+    g.profile = (mode, profiler, time.perf_counter())
+
+
+def _stop_profiling():
+    """Stop the request's profiler, write its file and return the file name (or None)."""
+    state = g.pop('profile', None)
+    if state is None:
+        return None
+    mode, profiler, started = state
+    try:
+        if mode == 'sample':
+            profiler.stop()
+        else:
+            profiler.disable()
+        endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unknown')
+        name = (f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}"
+                f"{'.txt' if mode == 'sample' else '.prof'}")
+        directory = _profile_dir()
+        if mode == 'sample':
+            profiler.dump(directory / name)
+        else:
+            profiler.dump_stats(str(directory / name))
+        _prune(directory, current_app.config.get('PROFILE_KEEP', 20))
+        current_app.logger.info('profile %s written for %s (%.1f ms)', name, request.path,
+                                (time.perf_counter() - started) * 1000)
+        return name
+    finally:
+        _profile_lock.release()
+
+
+def _prune(directory, keep):
+    files = sorted((p for p in directory.iterdir() if p.suffix in PROFILE_SUFFIXES),
+                   key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in files[keep:]:
+        old.unlink(missing_ok=True)
+
+
+def _finish_request(response):
+    name = _stop_profiling()
+    if name:
+        response.headers['X-Profile'] = name
+    return response
+
+
+def _teardown_request(exc):
+    # after_request is skipped when the view raises; still stop and release the lock.
+    _stop_profiling()
+
+
+def init_profiling(app):
+    """Register the request hooks that start and stop profiling."""
+    app.before_request(_start_profiling)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
+
+
+def list_profiles():
+    """Stored profiles, newest first: [{'name', 'size_kb', 'created'}]."""
+    directory = Path(current_app.config['PROFILE_DIR'])
+    if not directory.is_dir():
+        return []
+    files = sorted((p for p in directory.iterdir() if p.suffix in PROFILE_SUFFIXES),
+                   key=lambda p: p.stat().st_mtime, reverse=True)
+    return [{
+        'name': p.name,
+        'size_kb': round(p.stat().st_size / 1024, 1),
+        'created': datetime.fromtimestamp(p.stat().st_mtime).isoformat(timespec='seconds'),
+    } for p in files]
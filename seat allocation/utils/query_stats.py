@@ -0,0 +1,132 @@
+"""Per-request SQL statement counting, slow-query logging and query budgets.
+
+init_query_stats(app) hooks SQLAlchemy cursor events and Flask request callbacks:
+every request gets a statement count and cumulative DB time (logged when over
+QUERY_COUNT_WARN, aggregated per endpoint for the admin metrics page), and any
+statement slower than SLOW_QUERY_MS is logged with its route.
+
+query_budget(n) is for tests: it fails when the block issues more than n statements.
+
+    with query_budget(5):
+        client.get('/students/')
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+_endpoint_stats = {}
+_stats_lock = threading.Lock()
+_budget_state = threading.local()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised by query_budget when a block issues more statements than allowed."""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the statement's execution context, not the (pooled) connection, so a
+    # statement that raises leaves nothing behind for the next one to pick up.
+    if context is not None:
+        context._query_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_query_stats_start', None)
+    elapsed = time.perf_counter() - start if start is not None else 0.0
+
+    budgets = getattr(_budget_state, 'stack', None)
+    if budgets:
+        for statements in budgets:
+            statements.append(statement)
+
+    if not has_request_context():
+        return
+    g.query_count = g.get('query_count', 0) + 1
+    g.query_time = g.get('query_time', 0.0) + elapsed
+    slow_ms = current_app.config.get('SLOW_QUERY_MS')
+    if slow_ms is not None and elapsed * 1000 >= slow_ms:
+        current_app.logger.warning(
+            'slow-query %.1fms endpoint=%s path=%s sql=%s',
+            elapsed * 1000, request.endpoint, request.path, ' '.join(statement.split())[:500],
+        )
+
+
+def _start_request():
+    g.query_count = 0
+    g.query_time = 0.0
+
+
+def _finish_request(response):
+    count = g.get('query_count', 0)
+    db_ms = g.get('query_time', 0.0) * 1000
+    endpoint = request.endpoint or request.path
+    with _stats_lock:
+        stats = _endpoint_stats.setdefault(endpoint, {
+            'requests': 0, 'queries': 0, 'db_ms': 0.0, 'max_queries': 0,
+        })
+        stats['requests'] += 1
+        stats['queries'] += count
+        stats['db_ms'] += db_ms
+        stats['max_queries'] = max(stats['max_queries'], count)
+
+    warn_at = current_app.config.get('QUERY_COUNT_WARN')
+    if warn_at is not None and count > warn_at:
+        current_app.logger.warning(
+            'query-count %d statements (%.1fms) endpoint=%s path=%s exceeds %d',
+            count, db_ms, endpoint, request.path, warn_at,
+        )
+    if current_app.config.get('QUERY_STATS_HEADERS'):
+        response.headers['X-Query-Count'] = str(count)
+        response.headers['X-Query-Time-Ms'] = f'{db_ms:.1f}'
+    return response
+
+
+def init_query_stats(app, engine):
+    """Attach statement counting to engine and request accounting to app."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def endpoint_stats():
+    """Per-endpoint totals since process start, busiest (most queries per request) first."""
+    with _stats_lock:
+        rows = []
+        for endpoint, s in _endpoint_stats.items():
+            rows.append({
+                'endpoint': endpoint,
+                'requests': s['requests'],
+                'avg_queries': round(s['queries'] / s['requests'], 1),
+                'max_queries': s['max_queries'],
+                'avg_db_ms': round(s['db_ms'] / s['requests'], 2),
+            })
+    rows.sort(key=lambda r: r['avg_queries'], reverse=True)
+    return rows
+
+
+@contextmanager
+def query_budget(max_queries):
+    """Fail with QueryBudgetExceeded if the block issues more than max_queries statements.
+
+    Counts statements from the current thread only (Flask's test client runs the
+    request in the calling thread). init_query_stats must have been called.
+    """
+    statements = []
+    stack = getattr(_budget_state, 'stack', None)
+    if stack is None:
+        stack = _budget_state.stack = []
+    stack.append(statements)
+    try:
+        yield statements
+    finally:
+        stack.remove(statements)
+    if len(statements) > max_queries:
+        sample = '\n'.join(' '.join(s.split())[:200] for s in statements[:10])
+        raise QueryBudgetExceeded(
+            f'{len(statements)} statements issued, budget is {max_queries}. First statements:\n{sample}'
+        )
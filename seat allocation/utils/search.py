@@ -0,0 +1,129 @@
+"""Prefix search over students (roll number, name, section) and subjects (code, name).
+
+On SQLite the lookups go through FTS5 indexes: students_fts and subjects_fts are
+external-content tables over students and subjects, kept in sync by triggers, so every
+insert, update and delete (ORM, bulk insert or raw SQL) reaches the index. Every query
+term must match the start of a word ("ash kum" finds Ashwin Kumar, "21cs" finds roll
+21CS0042) and results come back in bm25 order.
+
+Other databases, and SQLite builds without FTS5, fall back to LIKE: roll number / code
+and section by prefix, names by substring.
+"""
+import re
+
+from flask import current_app
+from sqlalchemy import and_, or_, text
+
+from models import db, Department, Student, Subject
+
+STUDENT_FIELDS = ['id', 'roll_number', 'name', 'section', 'department']
+SUBJECT_FIELDS = ['id', 'code', 'name']
+
+# table -> (content table, indexed columns)
+FTS_TABLES = {
+    'students_fts': ('students', ('roll_number', 'name', 'section')),
+    'subjects_fts': ('subjects', ('code', 'name')),
+}
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _fts_ddl(fts, content, columns):
+    cols = ', '.join(columns)
+    new = ', '.join(f'new.{c}' for c in columns)
+    old = ', '.join(f'old.{c}' for c in columns)
+    delete = (f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});")
+    insert = f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});'
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{content}', "
+        f"content_rowid='id', prefix='2 3')",
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {content} BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {content} BEGIN {delete} END',
+        f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {content} BEGIN {delete} {insert} END',
+    ]
+
+
+def init_search(app):
+    """Create the FTS5 tables and triggers if missing (SQLite only) and record whether FTS is used."""
+    app.extensions['search_fts'] = False
+    if db.engine.dialect.name != 'sqlite':
+        return
+    try:
+        existing = {name for (name,) in db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('students_fts', 'subjects_fts')"))}
+        for fts, (content, columns) in FTS_TABLES.items():
+            for statement in _fts_ddl(fts, content, columns):
+                db.session.execute(text(statement))
+            if fts not in existing:
+                # Index the rows that predate the table.
+                db.session.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+        db.session.commit()
+        app.extensions['search_fts'] = True
+    except Exception:
+        # No FTS5 in this SQLite build.
+        db.session.rollback()
+        app.logger.warning('FTS5 unavailable; search falls back to LIKE', exc_info=True)
+
+
+def search_terms(q):
+    """Word terms of a query string (punctuation is dropped, like the FTS tokenizer does)."""
+    return _TERM_RE.findall(q or '')
+
+
+def _match_expr(terms):
+    # Quoted so FTS operators (AND, NEAR, column:) in user input are taken literally.
+    return ' '.join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+
+
+def _like_prefix(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _use_fts():
+    # Known after init_search; otherwise (AUTO_INIT_DB off) look for the table once.
+    if 'search_fts' not in current_app.extensions:
+        current_app.extensions['search_fts'] = db.engine.dialect.name == 'sqlite' and db.session.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'")).first() is not None
+    return current_app.extensions['search_fts']
+
+
+def search_students(q, limit=10):
+    """Best matches as (id, roll_number, name, section, department code) tuples."""
+    terms = search_terms(q)
+    if not terms:
+        return []
+    if _use_fts():
+        return [tuple(r) for r in db.session.execute(text(
+            'SELECT s.id, s.roll_number, s.name, s.section, d.code FROM students_fts f '
+            'JOIN students s ON s.id = f.rowid JOIN departments d ON d.id = s.department_id '
+            'WHERE students_fts MATCH :match ORDER BY f.rank, s.roll_number LIMIT :limit'),
+            {'match': _match_expr(terms), 'limit': limit})]
+    criteria = []
+    for term in terms:
+        t = _like_prefix(term)
+        criteria.append(or_(Student.roll_number.ilike(f'{t}%', escape='\\'),
+                            Student.name.ilike(f'%{t}%', escape='\\'),
+                            Student.section.ilike(f'{t}%', escape='\\')))
+    rows = db.session.query(Student.id, Student.roll_number, Student.name, Student.section, Department.code
+                            ).join(Department, Department.id == Student.department_id
+                            ).filter(and_(*criteria)).order_by(Student.roll_number).limit(limit)
+    return [tuple(r) for r in rows]
+
+
+def search_subjects(q, limit=10):
+    """Best matches as (id, code, name) tuples."""
+    terms = search_terms(q)
+    if not terms:
+        return []
+    if _use_fts():
+        return [tuple(r) for r in db.session.execute(text(
+            'SELECT s.id, s.code, s.name FROM subjects_fts f JOIN subjects s ON s.id = f.rowid '
+            'WHERE subjects_fts MATCH :match ORDER BY f.rank, s.code LIMIT :limit'),
+            {'match': _match_expr(terms), 'limit': limit})]
+    criteria = []
+    for term in terms:
+        t = _like_prefix(term)
+        criteria.append(or_(Subject.code.ilike(f'{t}%', escape='\\'), Subject.name.ilike(f'%{t}%', escape='\\')))
+    rows = db.session.query(Subject.id, Subject.code, Subject.name).filter(and_(*criteria)
+                                                                           ).order_by(Subject.code).limit(limit)
+    return [tuple(r) for r in rows]
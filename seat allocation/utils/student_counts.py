@@ -0,0 +1,81 @@
+"""Department.total_students kept current by database triggers on the students table.
+
+Every insert adds one to the student's department, every delete subtracts one and a
+department change moves one across, as a single UPDATE ... SET total_students =
+total_students +/- 1 in the same transaction as the write. ORM writes, bulk inserts
+(executemany or COPY) and set-based deletes are all covered, so no route recounts.
+
+SQLite uses plain triggers, PostgreSQL one plpgsql trigger function. When the triggers
+are first installed every counter is recomputed once from the students table. Other
+databases get no triggers and a warning at startup.
+"""
+from sqlalchemy import text
+
+from models import db
+
+TRIGGER_NAMES = ('students_count_ai', 'students_count_ad', 'students_count_au')
+
+RECOUNT = ('UPDATE departments SET total_students = '
+           '(SELECT COUNT(*) FROM students WHERE students.department_id = departments.id)')
+
+_SQLITE_DDL = [
+    'CREATE TRIGGER IF NOT EXISTS students_count_ai AFTER INSERT ON students BEGIN '
+    'UPDATE departments SET total_students = COALESCE(total_students, 0) + 1 WHERE id = new.department_id; '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS students_count_ad AFTER DELETE ON students BEGIN '
+    'UPDATE departments SET total_students = COALESCE(total_students, 0) - 1 WHERE id = old.department_id; '
+    'END',
+    'CREATE TRIGGER IF NOT EXISTS students_count_au AFTER UPDATE OF department_id ON students '
+    'WHEN old.department_id IS NOT new.department_id BEGIN '
+    'UPDATE departments SET total_students = COALESCE(total_students, 0) - 1 WHERE id = old.department_id; '
+    'UPDATE departments SET total_students = COALESCE(total_students, 0) + 1 WHERE id = new.department_id; '
+    'END',
+]
+
+_POSTGRES_DDL = [
+    """CREATE OR REPLACE FUNCTION students_count_sync() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND OLD.department_id IS NOT DISTINCT FROM NEW.department_id THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE departments SET total_students = COALESCE(total_students, 0) - 1 WHERE id = OLD.department_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE departments SET total_students = COALESCE(total_students, 0) + 1 WHERE id = NEW.department_id;
+    END IF;
+    RETURN NULL;
+END
+$$""",
+    'DROP TRIGGER IF EXISTS students_count_sync ON students',
+    'CREATE TRIGGER students_count_sync AFTER INSERT OR DELETE OR UPDATE OF department_id ON students '
+    'FOR EACH ROW EXECUTE PROCEDURE students_count_sync()',
+]
+
+
+def _installed(dialect):
+    if dialect == 'sqlite':
+        names = {n for (n,) in db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'students_count_%'"))}
+        return set(TRIGGER_NAMES) <= names
+    return bool(db.session.execute(text(
+        "SELECT 1 FROM pg_trigger WHERE tgname = 'students_count_sync'")).first())
+
+
+def init_student_counts(app):
+    """Install the counter triggers if missing, recounting every department once when they are new."""
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        app.logger.warning('No student count triggers for %s; Department.total_students is not maintained',
+                           dialect)
+        return
+    try:
+        if _installed(dialect):
+            return
+        for statement in (_SQLITE_DDL if dialect == 'sqlite' else _POSTGRES_DDL):
+            db.session.execute(text(statement))
+        db.session.execute(text(RECOUNT))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        app.logger.warning('Could not install student count triggers', exc_info=True)
@@ -1,6 +1,27 @@
-"""Exam timetable generation: one exam per department per day, respect exclusions, max 2 depts per subject per day."""
+"""Exam timetable generation: one exam per department per slot, respect exclusions, max 2 depts per subject per slot.
+
+Two solvers:
+  greedy  fill each date in turn with whatever still fits (the original behaviour).
+  dsatur  treat exams as vertices of a graph (edges between exams of the same department)
+          and colour it with DSatur, where a colour is an exam slot and a subject may take a
+          colour at most twice; then try to empty the last slot. Usually reaches the lower
+          bound max(exams per department, ceil(departments per subject / 2)).
+
+Both solvers optionally take per-department head-counts and the total hall capacity and
+keep each date's head-count within it (a department larger than the whole capacity gets
+a date to itself; see dates_over_capacity).
+
+With sessions=('FN', 'AN') every date offers two slots, each with its own department,
+subject and capacity limits, so the solvers work on slots rather than dates and the
+calendar is roughly halved. Schedule entries are (date, dept_code, subject_code, session).
+"""
+import heapq
 from datetime import date, timedelta
-from collections import defaultdict
+from itertools import islice
+from collections import defaultdict, deque, Counter
+
+SOLVERS = ('dsatur', 'greedy')
+MAX_DEPTS_PER_SUBJECT = 2
 
 
 def _parse_dd_mm_yyyy(s):
@@ -14,14 +35,198 @@ def _parse_dd_mm_yyyy(s):
     return date(y, m, d)
 
 
-def generate_timetable(rows, start_date_str, excluded_dates_str_list):
+def _slots(start_date, excluded, sessions):
+    """Endless (date, session) slots from start_date, skipping excluded dates."""
+    current = start_date
+    while True:
+        if current not in excluded:
+            for session in sessions:
+                yield current, session
+        current += timedelta(days=1)
+
+
+def _fits_capacity(load, size, capacity):
+    """True if a department of size students can join a date already seating load."""
+    return capacity is None or load == 0 or load + size <= capacity
+
+
+def lower_bound_days(items, dept_sizes=None, capacity=None):
+    """No timetable for items can use fewer days than this."""
+    if not items:
+        return 0
+    per_dept = Counter(d for d, _ in items)
+    per_subj = Counter(s for _, s in items)
+    bound = max(max(per_dept.values()),
+                max(-(-n // MAX_DEPTS_PER_SUBJECT) for n in per_subj.values()))
+    if dept_sizes and capacity:
+        headcount = sum(dept_sizes.get(d, 0) for d, _ in items)
+        bound = max(bound, -(-headcount // capacity))
+    return bound
+
+
+def solve_dsatur(items, dept_sizes=None, capacity=None):
+    """
+    Assign each (dept, subject) in items a day index (0, 1, ...) so that a department has
+    at most one exam per day, a subject is written by at most two departments per day and,
+    if dept_sizes/capacity are given, a day seats at most capacity students.
+
+    Saturation counts department and subject conflicts only; capacity is enforced when a
+    day is chosen.
+
+    Returns a list of day indices parallel to items.
+    """
+    sizes = dept_sizes or {}
+    if not capacity:
+        capacity = None
+    n = len(items)
+    dept_days = defaultdict(set)      # dept -> days it already writes on
+    subj_full = defaultdict(set)      # subject -> days where it is at the limit
+    subj_count = defaultdict(Counter)  # subject -> Counter(day -> departments)
+    day_items = []                    # day -> [item index]
+    day_load = []                     # day -> students seated
+    slot = [None] * n
+
+    by_dept = defaultdict(list)
+    by_subj = defaultdict(list)
+    for i, (d, s) in enumerate(items):
+        by_dept[d].append(i)
+        by_subj[s].append(i)
+    dept_left = {d: len(v) for d, v in by_dept.items()}
+    subj_total = {s: len(v) for s, v in by_subj.items()}
+
+    def saturation(i):
+        d, s = items[i]
+        return len(dept_days[d] | subj_full[s])
+
+    def key(i):
+        d, s = items[i]
+        # Most constrained first; ties: busiest department, then most shared subject.
+        return (-saturation(i), -dept_left[d], -sizes.get(d, 0), -subj_total[s], i)
+
+    current = [key(i) for i in range(n)]
+    heap = list(current)
+    heapq.heapify(heap)
+
+    def refresh(indices):
+        for j in indices:
+            if slot[j] is None:
+                k = key(j)
+                if k != current[j]:
+                    current[j] = k
+                    heapq.heappush(heap, k)
+
+    while heap:
+        k = heapq.heappop(heap)
+        i = k[-1]
+        if slot[i] is not None or k != current[i]:
+            continue
+        d, s = items[i]
+        blocked = dept_days[d] | subj_full[s]
+        size = sizes.get(d, 0)
+        feasible = [t for t in range(len(day_items))
+                    if t not in blocked and _fits_capacity(day_load[t], size, capacity)]
+        # Without a capacity limit take the first free day; with one, the fullest day
+        # that still fits (best fit packs head-counts tighter).
+        day = (max(feasible, key=lambda t: (day_load[t], -t)) if capacity else feasible[0]) if feasible else None
+        if day is None:
+            day = len(day_items)
+            day_items.append([])
+            day_load.append(0)
+        slot[i] = day
+        day_items[day].append(i)
+        day_load[day] += size
+        dept_days[d].add(day)
+        dept_left[d] -= 1
+        subj_count[s][day] += 1
+        refresh(by_dept[d])
+        if subj_count[s][day] >= MAX_DEPTS_PER_SUBJECT:
+            subj_full[s].add(day)
+            refresh(by_subj[s])
+
+    bound = lower_bound_days(items, sizes, capacity)
+    _compact_days(items, slot, day_items, day_load, dept_days, subj_count, bound, sizes, capacity)
+    return slot
+
+
+def _compact_days(items, slot, day_items, day_load, dept_days, subj_count, bound, sizes, capacity):
+    """Try to empty the last day by moving its exams (or swapping them) into earlier days."""
+
+    def fits(i, day, ignore=None):
+        d, s = items[i]
+        if day in dept_days[d] and not (ignore is not None and items[ignore][0] == d and slot[ignore] == day):
+            return False
+        used = subj_count[s][day] - (1 if ignore is not None and items[ignore][1] == s and slot[ignore] == day else 0)
+        if used >= MAX_DEPTS_PER_SUBJECT:
+            return False
+        # A swap partner is from the same department, so it frees exactly the seats i needs.
+        load = day_load[day] - (sizes.get(d, 0) if ignore is not None and slot[ignore] == day else 0)
+        return _fits_capacity(load, sizes.get(d, 0), capacity)
+
+    def move(i, day):
+        d, s = items[i]
+        old = slot[i]
+        day_items[old].remove(i)
+        dept_days[d].discard(old)
+        subj_count[s][old] -= 1
+        day_load[old] -= sizes.get(d, 0)
+        slot[i] = day
+        day_items[day].append(i)
+        dept_days[d].add(day)
+        subj_count[s][day] += 1
+        day_load[day] += sizes.get(d, 0)
+
+    while len(day_items) > max(bound, 1):
+        last = len(day_items) - 1
+        moves = []
+        for i in list(day_items[last]):
+            target = next((t for t in range(last) if fits(i, t)), None)
+            if target is not None:
+                moves.append((i, last))
+                move(i, target)
+                continue
+            # Swap: put i on a day t where its department sits, moving that exam j elsewhere.
+            swapped = False
+            for t in sorted(dept_days[items[i][0]]):
+                if t == last:
+                    continue
+                j = next(x for x in day_items[t] if items[x][0] == items[i][0])
+                if not fits(i, t, ignore=j):
+                    continue
+                u = next((u for u in range(last) if u != t and fits(j, u)), None)
+                if u is None:
+                    continue
+                moves.append((j, t))
+                move(j, u)
+                moves.append((i, last))
+                move(i, t)
+                swapped = True
+                break
+            if not swapped:
+                break
+        if day_items[last]:
+            # Could not empty the day: undo this round's moves and keep the solution.
+            for i, day in reversed(moves):
+                move(i, day)
+            return
+        day_items.pop()
+        day_load.pop()
+
+
+def generate_timetable(rows, start_date_str, excluded_dates_str_list, solver='greedy',
+                       dept_sizes=None, capacity=None, sessions=None):
     """
     rows: list of dicts with keys department_code, subject_code (e.g. from parse_timetable_subjects_file).
     start_date_str: dd/mm/yyyy.
     excluded_dates_str_list: list of dd/mm/yyyy strings (can be empty).
-    Returns: (list of (date, dept_code, subject_code), subject_names_map)
+    solver: 'greedy' (date by date) or 'dsatur' (fewest exam days, see module docstring).
+    dept_sizes: optional {dept_code: students}; with capacity (total seats) each date's
+        head-count is kept within capacity.
+    sessions: session labels per date in order, e.g. ('FN', 'AN'); default one unnamed session.
+    Returns: (list of (date, dept_code, subject_code, session), subject_names_map)
     subject_names_map can be filled by caller from DB: { subject_code: name }.
     """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown timetable solver: {solver}")
     start_date = _parse_dd_mm_yyyy(start_date_str)
     excluded = set()
     for s in (excluded_dates_str_list or []):
@@ -39,45 +244,137 @@ def generate_timetable(rows, start_date_str, excluded_dates_str_list):
     if not items:
         return [], {}
 
-    # Unplaced: list of (dept, subj) still to assign
-    unplaced = list(items)
-    schedule = []  # (date, dept_code, subject_code)
+    sizes = {k.upper(): v for k, v in (dept_sizes or {}).items()}
+    if not capacity:
+        capacity = None
+    sessions = tuple(sessions) if sessions else (None,)
 
-    # Number of dates we might need: at least max subjects per dept
-    dept_counts = defaultdict(int)
-    for d, s in items:
-        dept_counts[d] += 1
-    max_per_dept = max(dept_counts.values()) if dept_counts else 1
-    max_dates = max_per_dept * 2 + 30  # safety
+    if solver == 'dsatur':
+        slots = solve_dsatur(items, sizes, capacity)
+        slot_list = list(islice(_slots(start_date, excluded, sessions), max(slots) + 1))
+        order = sorted(range(len(items)), key=lambda i: (slots[i], i))
+        schedule = [(slot_list[slots[i]][0], items[i][0], items[i][1], slot_list[slots[i]][1]) for i in order]
+        if capacity is not None:
+            # When head-counts bind, packing slots in order (greedy) sometimes beats
+            # colouring; both are cheap, so keep whichever uses fewer slots.
+            alternative = _greedy_schedule(items, _slots(start_date, excluded, sessions), sizes, capacity)
+            if len(alternative) == len(items) and _slots_used(alternative) < _slots_used(schedule):
+                schedule = alternative
+        return schedule, {}
+
+    return _greedy_schedule(items, _slots(start_date, excluded, sessions), sizes, capacity), {}
 
-    current = start_date
-    days_tried = 0
-    while unplaced and days_tried < max_dates:
-        days_tried += 1
-        if current in excluded:
-            current += timedelta(days=1)
-            continue
 
-        dept_assigned_this_date = set()
-        subject_count_this_date = defaultdict(int)
+def _slots_used(schedule):
+    return len({(d, session) for d, _dept, _subj, session in schedule})
 
-        # Try to assign as many (dept, subj) as possible to current date
+
+def _greedy_schedule(items, slots, sizes, capacity):
+    """
+    Fill each date in turn with every exam that still fits, in file order.
+
+    slots yields (date, session) pairs (excluded dates already skipped). Without a
+    capacity limit there are few dates and each takes a large share of the remaining
+    exams, so one pass over the remaining list per date is cheapest. When capacity binds
+    there are many sparsely filled dates, and _queued_schedule (same result) only touches
+    department queue heads.
+    """
+    if capacity is not None:
+        return _queued_schedule(items, slots, sizes, capacity)
+    unplaced = list(items)
+    schedule = []  # (date, dept_code, subject_code, session)
+    for current, session in slots:
+        if not unplaced:
+            break
+        depts = set()
+        subject_count = defaultdict(int)
         still_unplaced = []
-        for (dept, subj) in unplaced:
-            if dept in dept_assigned_this_date:
+        for dept, subj in unplaced:
+            if dept in depts or subject_count[subj] >= MAX_DEPTS_PER_SUBJECT:
                 still_unplaced.append((dept, subj))
                 continue
-            if subject_count_this_date[subj] >= 2:
-                still_unplaced.append((dept, subj))
-                continue
-            schedule.append((current, dept, subj))
-            dept_assigned_this_date.add(dept)
-            subject_count_this_date[subj] += 1
-
+            schedule.append((current, dept, subj, session))
+            depts.add(dept)
+            subject_count[subj] += 1
         unplaced = still_unplaced
-        current += timedelta(days=1)
+    return schedule
+
+
+def _queued_schedule(items, slots, sizes, capacity):
+    """
+    _greedy_schedule for a head-count limit.
+
+    Exams are kept in one queue per department, and a date walks the departments in
+    order of their queue head, so it is filled in the same order as a scan of the whole
+    remaining list while touching only queue heads: a department stops once it is placed,
+    and only a department whose head hits a full subject (or the capacity) looks further
+    down its queue, re-entering the walk at its next exam's file position. Every slot
+    places at least one exam.
+    """
+    queues = {}
+    for pos, (dept, subj) in enumerate(items):
+        queues.setdefault(dept, deque()).append((pos, subj))
+    remaining = Counter(subj for _, subj in items)  # subject -> exams not yet placed
+
+    schedule = []  # (date, dept_code, subject_code, session)
+    for current, session in slots:
+        if not queues:
+            break
+        subject_count = Counter()
+        load = 0
+        placed = []    # (file position, dept, index into the dept's queue, subject)
+        deferred = []  # heap of (file position, dept, index) for departments still looking
+        heads = sorted((q[0][0], dept, 0) for dept, q in queues.items())
+        open_subjects = len(remaining)  # subjects that can still take a department today
+        h = 0
+        while (h < len(heads) or deferred) and open_subjects:
+            if deferred and (h == len(heads) or deferred[0][0] < heads[h][0]):
+                pos, dept, k = heapq.heappop(deferred)
+            else:
+                pos, dept, k = heads[h]
+                h += 1
+            queue = queues[dept]
+            subj = queue[k][1]
+            size = sizes.get(dept, 0)
+            if not _fits_capacity(load, size, capacity):
+                continue  # no exam of this department fits today
+            if subject_count[subj] < MAX_DEPTS_PER_SUBJECT:
+                placed.append((pos, dept, k, subj))
+                subject_count[subj] += 1
+                load += size
+                if subject_count[subj] == min(MAX_DEPTS_PER_SUBJECT, remaining[subj]):
+                    open_subjects -= 1
+            else:
+                # Skip exams whose subject is already full today; they cannot fit later either.
+                k += 1
+                while k < len(queue) and subject_count[queue[k][1]] >= MAX_DEPTS_PER_SUBJECT:
+                    k += 1
+                if k < len(queue):
+                    heapq.heappush(deferred, (queue[k][0], dept, k))
+
+        for pos, dept, k, subj in sorted(placed):
+            schedule.append((current, dept, subj, session))
+            remaining[subj] -= 1
+            if not remaining[subj]:
+                del remaining[subj]
+            queue = queues[dept]
+            del queue[k]
+            if not queue:
+                del queues[dept]
+
+    return schedule
+
 
-    return schedule, {}
+def dates_over_capacity(schedule, dept_sizes, capacity):
+    """[(date, session, headcount)] for slots in schedule seating more than capacity students."""
+    if not dept_sizes or not capacity:
+        return []
+    sizes = {k.upper(): v for k, v in dept_sizes.items()}
+    load = defaultdict(int)
+    for d, dept, _subj, session in schedule:
+        load[(d, session)] += sizes.get(dept, 0)
+    return sorted(((d, session, n) for (d, session), n in load.items() if n > capacity),
+                  key=lambda x: (x[0], x[1] or ''))
 
 
 def subject_counts_per_department(rows):
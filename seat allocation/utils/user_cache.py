@@ -0,0 +1,78 @@
+"""Flask-Login user loader with a small per-process TTL cache.
+
+current_user is a CachedUser: a read-only snapshot of the users row (id, user_id, name)
+kept for USER_CACHE_TTL seconds, so authenticated requests normally cost no query for
+the login check. Any ORM update or delete of a User drops that user's entry right away
+(mapper events); changes made outside this process, or by bulk UPDATE statements, are
+picked up when the entry expires.
+
+The session id is "<id>:<password fingerprint>" (User.get_id, an HMAC of the password
+hash under SECRET_KEY), so a password change invalidates every existing session of that
+user instead of leaving them logged in.
+"""
+import threading
+import time
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+
+from models import db, User
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class CachedUser(UserMixin):
+    """Detached, read-only view of a User for current_user."""
+
+    def __init__(self, user):
+        self.id = user.id
+        self.user_id = user.user_id
+        self.name = user.name
+        self.fingerprint = user.password_fingerprint
+
+    def get_id(self):
+        return f'{self.id}:{self.fingerprint}'
+
+
+def forget_user(user_pk):
+    """Drop a user's cached entry (no-op if absent)."""
+    with _cache_lock:
+        _cache.pop(user_pk, None)
+
+
+def _user_changed(mapper, connection, target):
+    forget_user(target.id)
+
+
+def load_user(session_id):
+    """user_loader callback: the CachedUser for session_id, or None if unknown or stale."""
+    user_pk, _, fingerprint = session_id.partition(':')
+    if not user_pk.isdigit():
+        return None
+    user_pk = int(user_pk)
+    ttl = current_app.config.get('USER_CACHE_TTL', 60)
+    now = time.monotonic()
+    entry = _cache.get(user_pk)
+    if entry is not None and entry[0] > now:
+        user = entry[1]
+    else:
+        row = db.session.get(User, user_pk)
+        if row is None:
+            forget_user(user_pk)
+            return None
+        user = CachedUser(row)
+        if ttl > 0:
+            with _cache_lock:
+                _cache[user_pk] = (now + ttl, user)
+    # Sessions created before the last password change (or before fingerprints) are rejected.
+    return user if fingerprint == user.fingerprint else None
+
+
+def init_user_cache(login_manager):
+    """Register load_user with Flask-Login and the invalidation hooks on User."""
+    login_manager.user_loader(load_user)
+    for name in ('after_update', 'after_delete'):
+        if not event.contains(User, name, _user_changed):
+            event.listen(User, name, _user_changed)
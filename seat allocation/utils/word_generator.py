@@ -1,8 +1,12 @@
 """Word (DOCX) generation for seat allocation documents."""
 
 from io import BytesIO
+from xml.sax.saxutils import escape
 
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Emu
 
 
 def _add_header(document, exam_name: str, exam_date: str):
@@ -19,42 +23,12 @@ def _add_header(document, exam_name: str, exam_date: str):
     document.add_paragraph()  # blank line
 
 
-def _merge_cells(table, col, start_row, end_row):
-    """Merge cells in column col from start_row to end_row (inclusive).
-    Clear text in merged cells so the value appears only once in the merged range.
-    """
-    if start_row >= end_row:
-        return
-    # Clear text in rows that will be merged (except the first) so the merged cell shows the value once
-    for r in range(start_row + 1, end_row + 1):
-        table.rows[r].cells[col].text = ''
-    start_cell = table.rows[start_row].cells[col]
-    end_cell = table.rows[end_row].cells[col]
-    start_cell.merge(end_cell)
-
+OVERALL_COLUMNS = ("Hall Number", "Building Name", "Floor Name", "Department", "No. Students", "Roll Number Range")
+MERGED_COLUMNS = 3  # Hall Number, Building Name and Floor Name span all rows of a hall
 
-def create_overall_allocation_docx(allocations_by_hall, exam_name: str, exam_date: str) -> BytesIO:
-    """
-    Overall seating allocation in a single Word document.
-
-    The generated file is intentionally simple so that admins can
-    freely edit text, add institution name, invigilator name, etc.
-    """
-    document = Document()
-    _add_header(document, exam_name, exam_date)
-
-    table = document.add_table(rows=1, cols=6)
-    table.style = "Table Grid"
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = "Hall Number"
-    hdr_cells[1].text = "Building Name"
-    hdr_cells[2].text = "Floor Name"
-    hdr_cells[3].text = "Department"
-    hdr_cells[4].text = "No. Students"
-    hdr_cells[5].text = "Roll Number Range"
-
-    row_idx = 0
 
+def _overall_rows(allocations_by_hall):
+    """(hall key, [six cell strings]) per hall/department row of the overall sheet."""
     for hall_info in allocations_by_hall:
         hall_num = hall_info.get("hall_number", "")
         building = hall_info.get("building_name", "") or ""
@@ -72,34 +46,78 @@ def create_overall_allocation_docx(allocations_by_hall, exam_name: str, exam_dat
                     if len(roll_numbers) > 1
                     else str(roll_numbers[0])
                 )
+            yield str(hall_num), [str(hall_num), str(building), str(floor), str(dept), str(count), str(rolls)]
 
-            row_idx += 1
-            row_cells = table.add_row().cells
-            row_cells[0].text = str(hall_num)
-            row_cells[1].text = str(building)
-            row_cells[2].text = str(floor)
-            row_cells[3].text = str(dept)
-            row_cells[4].text = str(count)
-            row_cells[5].text = str(rolls)
-
-    # Merge Hall Number, Building Name, Floor Name for consecutive rows of same hall
-    if row_idx >= 1:
-        current_hall = None
-        start_row = 1
-        for r in range(1, row_idx + 1):
-            hall_val = table.rows[r].cells[0].text
-            if hall_val != current_hall:
-                if current_hall is not None and r - 1 > start_row:
-                    for col in (0, 1, 2):
-                        _merge_cells(table, col, start_row, r - 1)
-                current_hall = hall_val
-                start_row = r
-        if row_idx > start_row:
-            for col in (0, 1, 2):
-                _merge_cells(table, col, start_row, row_idx)
+
+def _cell_xml(text, width, merge=None):
+    """One w:tc; merge is 'restart' for the top of a vertical merge, 'continue' below it."""
+    props = f'<w:tcW w:type="dxa" w:w="{width}"/>'
+    if merge == "restart":
+        props += '<w:vMerge w:val="restart"/>'
+    elif merge == "continue":
+        # Continuation cells carry no text; Word shows the restart cell's content.
+        return f'<w:tc><w:tcPr>{props}<w:vMerge/></w:tcPr><w:p/></w:tc>'
+    if not text:
+        return f'<w:tc><w:tcPr>{props}</w:tcPr><w:p/></w:tc>'
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<w:tc><w:tcPr>{props}</w:tcPr><w:p><w:r><w:t{space}>{escape(text)}</w:t></w:r></w:p></w:tc>'
+
+
+def _overall_table_xml(rows, style_id, col_width):
+    """The whole overall table as one w:tbl string, hall columns merged with vMerge.
+
+    rows are (hall key, cells) in output order; consecutive rows with the same key are
+    one hall.
+    """
+    parts = [
+        f'<w:tbl {nsdecls("w")}><w:tblPr><w:tblStyle w:val="{style_id}"/><w:tblW w:type="auto" w:w="0"/>'
+        '<w:tblLook w:firstColumn="1" w:firstRow="1" w:lastColumn="0" w:lastRow="0" w:noHBand="0" '
+        'w:noVBand="1" w:val="04A0"/></w:tblPr><w:tblGrid>',
+        f'<w:gridCol w:w="{col_width}"/>' * len(OVERALL_COLUMNS),
+        '</w:tblGrid><w:tr>',
+        ''.join(_cell_xml(h, col_width) for h in OVERALL_COLUMNS),
+        '</w:tr>',
+    ]
+    for i, (key, cells) in enumerate(rows):
+        if i > 0 and rows[i - 1][0] == key:
+            merge = "continue"
+        elif i + 1 < len(rows) and rows[i + 1][0] == key:
+            merge = "restart"
+        else:
+            merge = None
+        parts.append('<w:tr>')
+        for col, text in enumerate(cells):
+            parts.append(_cell_xml(text, col_width, merge if col < MERGED_COLUMNS else None))
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+
+def create_overall_allocation_docx(allocations_by_hall, exam_name: str, exam_date: str) -> BytesIO:
+    """
+    Overall seating allocation in a single Word document.
+
+    The generated file is intentionally simple so that admins can
+    freely edit text, add institution name, invigilator name, etc.
+
+    The table is generated as XML in one pass rather than through python-docx's
+    cell API (adding rows and merging cells there gets quadratic on big days).
+    """
+    document = Document()
+    _add_header(document, exam_name, exam_date)
+
+    section = document.sections[-1]
+    col_width = Emu((section.page_width - section.left_margin - section.right_margin) // len(OVERALL_COLUMNS)).twips
+    style_id = document.styles["Table Grid"].style_id
+    table = parse_xml(_overall_table_xml(list(_overall_rows(allocations_by_hall)), style_id, col_width))
+
+    body = document.element.body
+    if body.sectPr is not None:
+        body.sectPr.addprevious(table)
+    else:
+        body.append(table)
 
     buffer = BytesIO()
     document.save(buffer)
     buffer.seek(0)
     return buffer
-